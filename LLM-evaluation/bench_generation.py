@@ -0,0 +1,81 @@
+"""Compare generation throughput of the old per-test call with the resident model server.
+
+    python model_server.py --port 8765 &
+    python bench_generation.py --server http://127.0.0.1:8765 --prompts 40 --batch-size 8
+    python bench_generation.py --stub ...      # both sides on the stub model
+
+per-test: what test_evaluation.py used to do in every pytest process: load the model, then
+          one call per prompt.
+server:   the same prompts sent to model_server.py in batches; the model is already loaded
+          and shared by every client.
+"""
+import argparse
+import json
+import time
+
+from eval_config import MODEL_PATH, load_dataset, prompt_template
+from model_server import GenerationClient, load_generator
+
+
+def prompts_for(dataset_path, count):
+    inputs = [case.get("input") for case in load_dataset(dataset_path)["test_cases"]]
+    # Repeat the dataset with a suffix so every prompt is distinct, as in a larger dataset
+    return [prompt_template.format(input=f"{inputs[i % len(inputs)]} ({i})") for i in range(count)]
+
+
+def summarize(name, results, seconds, load_seconds=0.0):
+    tokens = sum(result["completion_tokens"] for result in results)
+    return {
+        "mode": name,
+        "prompts": sum(len(result["outputs"]) for result in results),
+        "completion_tokens": tokens,
+        "reused_prefix_tokens": sum(result["reused_prefix_tokens"] for result in results),
+        "load_seconds": round(load_seconds, 2),
+        "generation_seconds": round(seconds, 2),
+        "tokens_per_second": round(tokens / seconds, 1) if seconds else 0.0,
+        "tokens_per_second_with_load": round(tokens / (seconds + load_seconds), 1) if seconds + load_seconds else 0.0,
+    }
+
+
+def run_per_test(args, prompts):
+    generator = load_generator(args.model_path, args.stub, args.stub_latency_ms)
+    start = time.perf_counter()
+    results = [generator.generate([prompt]) for prompt in prompts]
+    return summarize("per-test", results, time.perf_counter() - start, generator.load_seconds)
+
+
+def run_server(args, prompts):
+    client = GenerationClient(args.server)
+    start = time.perf_counter()
+    results = [client.generate(prompts[i:i + args.batch_size]) for i in range(0, len(prompts), args.batch_size)]
+    return summarize("server", results, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens/sec of the per-test call vs the model server")
+    parser.add_argument("--server", help="URL of a running model_server.py (omit to only run per-test)")
+    parser.add_argument("--dataset", default="dataset/dataset.yaml")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--prompts", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--stub", action="store_true", help="Stub model for the per-test side")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    prompts = prompts_for(args.dataset, args.prompts)
+    results = [run_per_test(args, prompts)]
+    if args.server:
+        results.append(run_server(args, prompts))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(f"{r['mode']:<9} {r['tokens_per_second']:>8} tokens/s   {r['tokens_per_second_with_load']:>8} tokens/s incl. load "
+              f"({r['load_seconds']}s)   {r['completion_tokens']} tokens for {r['prompts']} prompts   "
+              f"{r['reused_prefix_tokens']} prompt tokens reused from the KV cache")
+
+
+if __name__ == "__main__":
+    main()
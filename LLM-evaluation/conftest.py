@@ -0,0 +1,79 @@
+"""Session fixtures that keep the model loaded for the whole test run.
+
+    pytest test_evaluation.py            # model loaded once, in this process
+    pytest test_evaluation.py -n 4       # one model_server.py started for all xdist workers
+    EVAL_MODEL_SERVER_URL=http://127.0.0.1:8765 pytest -n 4   # use a server that is already running
+    EVAL_STUB=1 pytest -n 4              # stub model and judge (no model file or API key)
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+
+import pytest
+
+from model_server import GenerationClient, load_generator
+
+SERVER_URL_ENV = "EVAL_MODEL_SERVER_URL"
+STUB = os.environ.get("EVAL_STUB", "").lower() in ("1", "true", "yes")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pytest_configure(config):
+    # Only the xdist controller starts the server; workers inherit its URL through the environment
+    if hasattr(config, "workerinput") or os.environ.get(SERVER_URL_ENV):
+        return
+    if not config.getoption("numprocesses", default=None):
+        return
+
+    port = _free_port()
+    command = [sys.executable, os.path.join(os.path.dirname(__file__), "model_server.py"), "--port", str(port)]
+    if STUB:
+        command.append("--stub")
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+    client = GenerationClient(f"http://127.0.0.1:{port}")
+    deadline = time.monotonic() + float(os.environ.get("EVAL_MODEL_SERVER_START_TIMEOUT", "300"))
+    while True:
+        try:
+            client.health()
+            break
+        except (urllib.error.URLError, ConnectionError):
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise pytest.UsageError("model_server.py did not start")
+            time.sleep(0.5)
+    os.environ[SERVER_URL_ENV] = client.url
+    config._eval_model_server = process
+
+
+def pytest_unconfigure(config):
+    process = getattr(config, "_eval_model_server", None)
+    if process is not None:
+        process.terminate()
+        process.wait(timeout=30)
+        os.environ.pop(SERVER_URL_ENV, None)
+
+
+@pytest.fixture(scope="session")
+def generator():
+    url = os.environ.get(SERVER_URL_ENV)
+    if url:
+        return GenerationClient(url)
+    return load_generator(stub=STUB)
+
+
+@pytest.fixture(scope="session")
+def judge():
+    # None lets deepeval use its default evaluation model
+    if STUB:
+        from stubs import StubJudge
+
+        return StubJudge()
+    return None
@@ -0,0 +1,247 @@
+"""Evaluate dataset/dataset.yaml with cached generations and concurrent metric evaluation.
+
+Same prompt, model, metrics and thresholds as test_evaluation.py, run in two stages:
+
+1. generate: outputs come from the generation cache (keyed by model path, parameters and
+   prompt hash); only misses go to the model, in batches (--server: a running
+   model_server.py, otherwise the model loaded in this process).
+2. evaluate: every (test case, metric) pair is measured on a bounded thread pool, so judge
+   calls overlap instead of running back to back.
+
+    python eval_runner.py                         # LlamaCpp model, deepeval's default judge
+    python eval_runner.py --workers 16            # more judge calls in flight
+    python eval_runner.py --server http://127.0.0.1:8765   # generate on an already loaded model
+    python eval_runner.py --stub --stub-latency-ms 200   # no model file or API key needed
+
+With --incremental, each dataset entry is content-hashed together with the model, prompt and
+metric configuration (see incremental.py). Entries whose scores are already stored under the
+same hashes are not regenerated or re-scored; their stored scores are merged into the report,
+so a CI run only pays for the entries that changed:
+
+    python eval_runner.py --incremental
+
+Prints the time spent in each stage, writes per-case scores to --report, and exits with
+status 1 if any metric failed.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from deepeval.test_case import LLMTestCase
+
+from eval_config import LLM_PARAMS, MODEL_PATH, build_metrics, load_dataset, metric_config, prompt_template
+from generation_cache import GenerationCache
+from incremental import ScoreStore, case_hash, config_hash
+from model_server import GenerationClient, load_generator
+
+
+def load_judge(args):
+    # None means deepeval's default evaluation model
+    if args.stub:
+        from stubs import StubJudge
+
+        return StubJudge(args.stub_latency_ms)
+    return None
+
+
+def judge_name(judge):
+    # The model the metrics actually use: with judge=None that is deepeval's configured default
+    # (`deepeval set-openai --model ...`), so switching it invalidates stored scores
+    return build_metrics(None, model=judge, async_mode=False)[0].evaluation_model
+
+
+def load_generator_for(args):
+    if args.server:
+        return GenerationClient(args.server)
+    return load_generator(args.model_path, args.stub, args.stub_latency_ms)
+
+
+def generate_outputs(get_generator, model_key, cases, cache, batch_size):
+    prompts = [prompt_template.format(input=case.get("input")) for case in cases]
+    outputs = [cache.get(model_key, LLM_PARAMS, prompt) if cache is not None else None for prompt in prompts]
+    missing = [index for index, output in enumerate(outputs) if output is None]
+    generation = {"generated": len(missing), "seconds": 0.0, "completion_tokens": 0, "reused_prefix_tokens": 0}
+    # The model is only loaded if something actually has to be generated
+    generator = get_generator() if missing else None
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        result = generator.generate([prompts[index] for index in batch])
+        per_prompt_seconds = result["seconds"] / len(batch)
+        for index, output in zip(batch, result["outputs"]):
+            outputs[index] = output
+            if cache is not None:
+                cache.put(model_key, LLM_PARAMS, prompts[index], output, per_prompt_seconds)
+        generation["seconds"] += result["seconds"]
+        generation["completion_tokens"] += result["completion_tokens"]
+        generation["reused_prefix_tokens"] += result["reused_prefix_tokens"]
+    return outputs, generation
+
+
+def measure(metric, test_case):
+    start = time.perf_counter()
+    error = None
+    try:
+        metric.measure(test_case)
+    except Exception as e:
+        error = str(e)
+    return {
+        "metric": metric.__name__,
+        "score": metric.score if error is None else None,
+        "threshold": metric.threshold,
+        "success": error is None and metric.is_successful(),
+        "reason": metric.reason if error is None else None,
+        "error": error,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def evaluate(cases, outputs, judge, workers):
+    jobs = []
+    for index, (case, output) in enumerate(zip(cases, outputs)):
+        test_case = LLMTestCase(
+            input=case.get("input"),
+            actual_output=output,
+            expected_output=case.get("expected_output"),
+            context=case.get("context"),
+        )
+        # async_mode=False: each metric call blocks its pool thread instead of starting an event loop
+        for metric in build_metrics(case.get("input"), model=judge, async_mode=False):
+            jobs.append((index, metric, test_case))
+
+    results = [[] for _ in cases]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(index, pool.submit(measure, metric, test_case)) for index, metric, test_case in jobs]
+        for index, future in futures:
+            results[index].append(future.result())
+    return results
+
+
+def run(args):
+    timings = {}
+    start = time.perf_counter()
+    cases = load_dataset(args.dataset)["test_cases"]
+    model_key = "stub" if args.stub else args.model_path
+    judge = load_judge(args)
+    cache = None if args.no_cache else GenerationCache(args.cache_path)
+
+    # Incremental: reuse stored results of entries whose content and configuration are unchanged
+    stored = [None] * len(cases)
+    incremental = None
+    if args.incremental:
+        store = ScoreStore(args.score_path)
+        config_key = config_hash(model_key, LLM_PARAMS, prompt_template, metric_config(), judge_name(judge))
+        case_keys = [case_hash(case) for case in cases]
+        incremental = {"config_hash": config_key, "dataset_changes": store.diff_manifest(cases, case_keys)}
+        stored = [store.get(key, config_key) for key in case_keys]
+    pending = [index for index, result in enumerate(stored) if result is None]
+    pending_cases = [cases[index] for index in pending]
+    timings["load"] = time.perf_counter() - start
+
+    stage = time.perf_counter()
+    pending_outputs, generation = generate_outputs(lambda: load_generator_for(args), model_key, pending_cases, cache,
+                                                   args.batch_size)
+    timings["generate"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    pending_results = evaluate(pending_cases, pending_outputs, judge, args.workers)
+    timings["evaluate"] = time.perf_counter() - stage
+    if cache is not None:
+        cache.close()
+
+    outputs = [result["actual_output"] if result is not None else None for result in stored]
+    metric_results = [result["metrics"] if result is not None else None for result in stored]
+    for index, output, results in zip(pending, pending_outputs, pending_results):
+        outputs[index], metric_results[index] = output, results
+    if args.incremental:
+        for index, output, results in zip(pending, pending_outputs, pending_results):
+            # A metric that errored (judge timeout, API error) is retried next run, not stored
+            if all(r["error"] is None for r in results):
+                store.put(case_keys[index], config_key, cases[index].get("input"), output, results)
+        store.save_manifest(cases, case_keys)
+        store.close()
+        incremental.update({"rescored": len(pending), "reused": len(cases) - len(pending)})
+    timings["total"] = time.perf_counter() - start
+
+    per_metric = {}
+    for results in pending_results:
+        for result in results:
+            per_metric.setdefault(result["metric"], []).append(result["seconds"])
+    return {
+        "model": model_key,
+        "cases": len(cases),
+        "passed": sum(1 for results in metric_results if all(r["success"] for r in results)),
+        "stages_seconds": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "incremental": incremental,
+        "generation": {
+            "cached": len(pending_cases) - generation["generated"],
+            "generated": generation["generated"],
+            "completion_tokens": generation["completion_tokens"],
+            "reused_prefix_tokens": generation["reused_prefix_tokens"],
+            "tokens_per_second": round(generation["completion_tokens"] / generation["seconds"], 1)
+            if generation["seconds"] else 0.0,
+        },
+        "evaluation": {
+            "workers": args.workers,
+            "metric_calls": sum(len(seconds) for seconds in per_metric.values()),
+            "mean_seconds_per_metric": {name: round(statistics.mean(s), 3) for name, s in per_metric.items()},
+        },
+        "results": [
+            {"input": case.get("input"), "actual_output": output, "metrics": results, "stored": result is not None}
+            for case, output, results, result in zip(cases, outputs, metric_results, stored)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the deepeval metrics over the dataset with cached generations")
+    parser.add_argument("--dataset", default="dataset/dataset.yaml")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--server", help="URL of a running model_server.py (default: load the model here)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Prompts per generation request")
+    parser.add_argument("--workers", type=int, default=8, help="Metric evaluations in flight at once")
+    parser.add_argument("--cache-path", default=".eval-cache/generations.sqlite")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate every output")
+    parser.add_argument("--report", default=".eval-cache/report.json")
+    parser.add_argument("--incremental", action="store_true", help="Only regenerate and re-score changed entries")
+    parser.add_argument("--score-path", default=".eval-cache/scores.sqlite")
+    parser.add_argument("--stub", action="store_true", help="Stub model and judge instead of LlamaCpp and deepeval's default")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0, help="Delay of every stub model/judge call")
+    args = parser.parse_args()
+
+    report = run(args)
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    stages = report["stages_seconds"]
+    generation = report["generation"]
+    evaluation = report["evaluation"]
+    print(f"{report['passed']}/{report['cases']} test cases passed ({report['model']})")
+    incremental = report["incremental"]
+    if incremental is not None:
+        changes = incremental["dataset_changes"]
+        print(f"  incremental: {incremental['rescored']} re-scored, {incremental['reused']} reused   "
+              f"dataset since last run: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+              f"{len(changes['removed'])} removed, {changes['unchanged']} unchanged")
+        for label in ("added", "changed", "removed"):
+            for input_text in changes[label]:
+                print(f"    {label:<8} {input_text!r}")
+    print(f"  load      {stages['load']:>8.2f}s")
+    print(f"  generate  {stages['generate']:>8.2f}s   {generation['generated']} generated "
+          f"({generation['tokens_per_second']} tokens/s), {generation['cached']} from cache")
+    print(f"  evaluate  {stages['evaluate']:>8.2f}s   {evaluation['metric_calls']} metric calls on {evaluation['workers']} workers")
+    print(f"  total     {stages['total']:>8.2f}s   report: {args.report}")
+    for result in report["results"]:
+        for metric in result["metrics"]:
+            if not metric["success"]:
+                print(f"  FAILED {metric['metric']} for {result['input']!r}: {metric['error'] or metric['reason']}")
+    if report["passed"] != report["cases"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
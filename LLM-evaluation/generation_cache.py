@@ -0,0 +1,64 @@
+"""On-disk cache of model generations for the evaluation runner.
+
+An entry is keyed by the model path, the generation parameters and the SHA-256 of the
+prompt. Changing the metrics (or the judge) reuses every stored output, while changing the
+model, a parameter or the prompt template regenerates only what is affected.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def generation_key(model_path, params, prompt):
+    payload = json.dumps(
+        {"model": model_path, "params": params, "prompt_sha256": prompt_hash(prompt)},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    def __init__(self, path=".eval-cache/generations.sqlite"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "key TEXT PRIMARY KEY, model TEXT, params TEXT, prompt_sha256 TEXT, "
+            "output TEXT, generation_seconds REAL, created_at REAL)"
+        )
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_path, params, prompt):
+        key = generation_key(model_path, params, prompt)
+        with self._lock:
+            row = self._db.execute("SELECT output FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, model_path, params, prompt, output, generation_seconds=None):
+        key = generation_key(model_path, params, prompt)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model_path, json.dumps(params, sort_keys=True), prompt_hash(prompt), output,
+                 generation_seconds, time.time()),
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,101 @@
+"""Content hashes and stored scores for incremental evaluation (eval_runner.py --incremental).
+
+Every dataset entry is hashed from its full content; the run configuration (model, generation
+parameters, prompt template, metrics and judge) gets a hash of its own. A stored result is
+reused only when both hashes match, so editing one entry re-scores that entry, and changing
+the model or a metric re-scores everything.
+
+Unlike deepeval's .deepeval-cache.json, whose key includes the generated output (different on
+every sampled run), the key here only depends on inputs we control.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import deepeval
+
+
+def _sha256(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def case_hash(case):
+    return _sha256(case)
+
+
+def config_hash(model_key, params, prompt_template, metric_config, judge_name):
+    return _sha256({
+        "model": model_key,
+        "params": params,
+        "prompt_template": prompt_template,
+        "metrics": metric_config,
+        "judge": judge_name,
+        "deepeval": deepeval.__version__,
+    })
+
+
+class ScoreStore:
+    def __init__(self, path=".eval-cache/scores.sqlite"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "case_hash TEXT, config_hash TEXT, input TEXT, actual_output TEXT, metrics TEXT, created_at REAL, "
+            "PRIMARY KEY (case_hash, config_hash))"
+        )
+        # The dataset as of the last incremental run, to report what changed since
+        self._db.execute("CREATE TABLE IF NOT EXISTS manifest (case_hash TEXT PRIMARY KEY, input TEXT)")
+        self._db.commit()
+
+    def get(self, case_key, config_key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT actual_output, metrics FROM results WHERE case_hash = ? AND config_hash = ?",
+                (case_key, config_key),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"actual_output": row[0], "metrics": json.loads(row[1])}
+
+    def put(self, case_key, config_key, input_text, actual_output, metrics):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (case_key, config_key, input_text, actual_output, json.dumps(metrics), time.time()),
+            )
+            self._db.commit()
+
+    def diff_manifest(self, cases, case_keys):
+        # Compare this dataset with the previous run's: entries are matched by input text,
+        # so an edited expected_output or context shows up as "changed" rather than added + removed
+        with self._lock:
+            previous = dict(self._db.execute("SELECT case_hash, input FROM manifest").fetchall())
+        previous_inputs = set(previous.values())
+        current_keys = set(case_keys)
+        current_inputs = {case.get("input") for case in cases}
+        diff = {"added": [], "changed": [], "unchanged": 0,
+                "removed": [text for key, text in previous.items() if key not in current_keys and text not in current_inputs]}
+        for case, key in zip(cases, case_keys):
+            if key in previous:
+                diff["unchanged"] += 1
+            elif case.get("input") in previous_inputs:
+                diff["changed"].append(case.get("input"))
+            else:
+                diff["added"].append(case.get("input"))
+        return diff
+
+    def save_manifest(self, cases, case_keys):
+        with self._lock:
+            self._db.execute("DELETE FROM manifest")
+            self._db.executemany("INSERT OR REPLACE INTO manifest VALUES (?, ?)",
+                                 [(key, case.get("input")) for case, key in zip(cases, case_keys)])
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
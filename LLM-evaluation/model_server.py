@@ -0,0 +1,182 @@
+"""Long-lived generation service: loads the GGUF model once and answers batches of prompts.
+
+    python model_server.py --port 8765             # models/mistral-7b-v0.1.Q3_K_S.gguf
+    python model_server.py --port 8765 --stub      # stub model, no model file needed
+
+    POST /generate {"prompts": ["...", ...]}
+      -> {"outputs": [...], "prompt_tokens": n, "reused_prefix_tokens": n, "completion_tokens": n, "seconds": s}
+    GET /stats     totals and tokens/sec since start
+    GET /health
+
+Prompts run one after another on the single resident model. llama.cpp keeps the previous
+prompt's tokens in its KV cache and only evaluates what differs, so the shared
+"[INST] You are a helpful AI assistant..." prefix of prompt_template is evaluated once
+instead of once per prompt (reused_prefix_tokens counts those tokens).
+
+pytest-xdist workers share one server through conftest.py; eval_runner.py --server sends its
+cache misses here in batches.
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eval_config import LLM_PARAMS, MODEL_PATH
+
+
+def common_prefix_length(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+class Generator:
+    """One resident model; generate() runs a batch of prompts through it in order."""
+
+    def __init__(self, llm, tokenize, name):
+        self.llm = llm
+        self.tokenize = tokenize
+        self.name = name
+        self.load_seconds = 0.0
+        self._lock = threading.Lock()  # a llama.cpp context handles one sequence at a time
+        self._previous_prompt = []
+        self.stats = {"prompts": 0, "prompt_tokens": 0, "reused_prefix_tokens": 0, "completion_tokens": 0,
+                      "generation_seconds": 0.0}
+
+    def generate(self, prompts):
+        outputs = []
+        batch = {"prompt_tokens": 0, "reused_prefix_tokens": 0, "completion_tokens": 0}
+        start = time.perf_counter()
+        with self._lock:
+            for prompt in prompts:
+                tokens = self.tokenize(prompt)
+                # The part llama.cpp finds already in its KV cache from the previous prompt
+                batch["reused_prefix_tokens"] += common_prefix_length(self._previous_prompt, tokens)
+                batch["prompt_tokens"] += len(tokens)
+                output = self.llm.invoke(prompt)
+                batch["completion_tokens"] += len(self.tokenize(output))
+                self._previous_prompt = tokens
+                outputs.append(output)
+            seconds = time.perf_counter() - start
+            self.stats["prompts"] += len(prompts)
+            self.stats["generation_seconds"] += seconds
+            for key, value in batch.items():
+                self.stats[key] += value
+        return {"outputs": outputs, **batch, "seconds": round(seconds, 3)}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        seconds = stats["generation_seconds"]
+        stats["tokens_per_second"] = round(stats["completion_tokens"] / seconds, 1) if seconds else 0.0
+        stats["generation_seconds"] = round(seconds, 3)
+        return {"model": self.name, "load_seconds": round(self.load_seconds, 2), **stats}
+
+
+def load_generator(model_path=MODEL_PATH, stub=False, stub_latency_ms=50.0):
+    start = time.perf_counter()
+    if stub:
+        from stubs import StubLLM
+
+        generator = Generator(StubLLM(stub_latency_ms), str.split, "stub")
+    else:
+        from langchain_community.llms import LlamaCpp
+
+        LlamaCpp.model_rebuild()
+        # Same wrapper and parameters as before, so sampling behaves exactly like the old per-test call
+        llm = LlamaCpp(model_path=model_path, verbose=False, **LLM_PARAMS)
+        generator = Generator(llm, lambda text: llm.client.tokenize(text.encode("utf-8"), add_bos=False), model_path)
+    generator.load_seconds = time.perf_counter() - start
+    return generator
+
+
+class GenerationClient:
+    """Talks to a running model_server.py; same generate() result as Generator."""
+
+    def __init__(self, url, timeout=600):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def generate(self, prompts):
+        return self._request("/generate", {"prompts": list(prompts)})
+
+    def get_stats(self):
+        return self._request("/stats")
+
+    def health(self):
+        return self._request("/health")
+
+
+def make_handler(generator):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "model": generator.name})
+            elif self.path == "/stats":
+                self._send(200, generator.get_stats())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                prompts = body["prompts"]
+            except (ValueError, KeyError):
+                self._send(400, {"error": "expected a JSON body with a prompts list"})
+                return
+            try:
+                self._send(200, generator.generate(prompts))
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the evaluation model to several test processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--stub", action="store_true", help="Stub model instead of LlamaCpp")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    generator = load_generator(args.model_path, args.stub, args.stub_latency_ms)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(generator))
+    print(f"Serving {generator.name} on http://{args.host}:{args.port} (loaded in {generator.load_seconds:.1f}s)",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Stand-ins for the local model and the deepeval judge, so the evaluation pipeline can run
+without the GGUF model or an API key (python eval_runner.py --stub)."""
+import time
+import typing
+
+from deepeval.models import DeepEvalBaseLLM
+from pydantic import BaseModel
+
+
+class StubLLM:
+    """Answers every prompt with a deterministic string after a fixed delay."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        question = prompt.split("question:", 1)[-1].split("[/INST]", 1)[0].strip()
+        return f"Stub answer to: {question}"
+
+
+def stub_value(annotation):
+    # The emptiest valid value for a pydantic field: no opinions, no verdicts, "stub" reasons
+    origin = typing.get_origin(annotation)
+    if origin is list:
+        return []
+    if origin is typing.Literal:
+        return typing.get_args(annotation)[0]
+    if origin is not None:  # Optional[...] / Union[...]
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return stub_value(args[0]) if args else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {name: stub_value(field.annotation) for name, field in annotation.model_fields.items()}
+    return {str: "stub", int: 0, float: 0.0, bool: False}.get(annotation)
+
+
+class StubJudge(DeepEvalBaseLLM):
+    """deepeval judge that returns schema-valid, empty verdicts after a fixed delay.
+
+    The delay stands in for a judge API round trip, which is what the runner's worker pool
+    overlaps.
+    """
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+        super().__init__("stub-judge")
+
+    def load_model(self):
+        return self
+
+    def generate(self, prompt, schema=None):
+        time.sleep(self.latency)
+        if schema is None:
+            return "{}"
+        return schema.model_validate(stub_value(schema))
+
+    async def a_generate(self, prompt, schema=None):
+        return self.generate(prompt, schema)
+
+    def get_model_name(self):
+        return "stub-judge"
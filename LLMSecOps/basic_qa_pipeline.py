@@ -1,10 +1,14 @@
-from transformers import pipeline
+import os
+
+from qa_backends import load_qa_pipeline
 
 # references
 # https://huggingface.co/docs/transformers/en/main_classes/pipelines
 
 # initialize a question-answering pipeline with a pre-trained model
-qa_pipeline = pipeline("question-answering", model="distilbert-base-uncased-distilled-squad")
+# (QA_BACKEND=torch-int8 or onnx runs the same model quantized or through ONNX Runtime)
+qa_pipeline = load_qa_pipeline(os.environ.get("QA_BACKEND", "torch"), "distilbert-base-uncased-distilled-squad",
+                               int(os.environ.get("QA_NUM_THREADS", "0")))
 
 # define your context and question
 context = "Hugging Face is a technology company that provides open-source NLP libraries and tools for natural language processing. They have created the transformers library which is widely used for machine learning models. The company focuses on democratizing AI through open source contributions."
@@ -0,0 +1,110 @@
+# Dynamic micro-batching for model inference behind an async web server.
+#
+# Concurrent requests are collected for at most `max_wait_ms` (or until `max_batch_size`
+# requests are waiting), run as one batch on a worker thread, and each caller's future is
+# resolved with its own result. While a batch runs, the next one fills up, so batches grow
+# with load and a lone request only waits `max_wait_ms`.
+#
+# One bad request must not fail the requests batched with it: items are checked with
+# `validate_item` before they join a batch, and if a batch still fails its items are run
+# one by one so only the failing ones get the exception.
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    def __init__(self, process_batch, max_batch_size=16, max_wait_ms=5.0, validate_item=None):
+        # process_batch(items) -> list of results, one per item, in the same order
+        # validate_item(item) raises for an item process_batch would reject
+        self.process_batch = process_batch
+        self.validate_item = validate_item
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # One inference thread: batches run one after another and use all intra-op threads
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batcher")
+        self.queue = None
+        self.task = None
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    async def submit(self, item):
+        if self.validate_item is not None:
+            self.validate_item(item)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that went away (client disconnect) don't need an answer
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.process_batch, items)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._resolve(batch[0][1], exception=e)
+                    continue
+                # Find the item(s) that broke the batch: run each on its own
+                self.fallbacks += 1
+                for item, future in batch:
+                    try:
+                        result = (await loop.run_in_executor(self.executor, self.process_batch, [item]))[0]
+                    except Exception as item_error:
+                        self._resolve(future, exception=item_error)
+                    else:
+                        self._resolve(future, result)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                self._resolve(future, result)
+
+    @staticmethod
+    def _resolve(future, result=None, exception=None):
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
@@ -0,0 +1,126 @@
+# Validate and benchmark the QA backends in qa_backends.py on the regression set.
+#
+# Every backend runs in its own process (so memory numbers don't mix), answers each
+# question in qa_regression.json, and is compared with the first backend in --backends:
+# an answer counts as the same only if its character span (start, end) is identical.
+# Exits with status 1 if any backend changed an answer.
+#
+#   python bench_backends.py --backends torch,torch-int8,onnx --threads 1 --repeat 5
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from qa_backends import BACKENDS, load_qa_pipeline
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_backend(args):
+    # Child process: load one backend, answer the regression set, report timings and memory
+    with open(args.dataset) as f:
+        cases = json.load(f)
+
+    start = time.perf_counter()
+    qa = load_qa_pipeline(args.child, args.model, args.threads, args.onnx_dir)
+    load_seconds = time.perf_counter() - start
+    rss_after_load = rss_mb()
+
+    qa(question=cases[0]["question"], context=cases[0]["context"])  # warm-up
+    latencies, answers = [], []
+    for repeat in range(args.repeat):
+        for case in cases:
+            start = time.perf_counter()
+            result = qa(question=case["question"], context=case["context"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            if repeat == 0:
+                answers.append({"start": result["start"], "end": result["end"], "answer": result["answer"]})
+
+    latencies.sort()
+    return {
+        "backend": args.child,
+        "threads": args.threads,
+        "load_seconds": round(load_seconds, 2),
+        "rss_after_load_mb": round(rss_after_load, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 1),
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+        },
+        "answers": answers,
+    }
+
+
+def compare(baseline, result, cases):
+    mismatches = []
+    for case, expected, actual in zip(cases, baseline["answers"], result["answers"]):
+        if (expected["start"], expected["end"]) != (actual["start"], actual["end"]):
+            mismatches.append({"question": case["question"], "expected": expected["answer"], "got": actual["answer"]})
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and benchmark QA backends against the regression set")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated; the first one is the baseline")
+    parser.add_argument("--model", default="distilbert-base-uncased-distilled-squad")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads per backend (0 = library default)")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the regression set for the latency numbers")
+    parser.add_argument("--dataset", default="qa_regression.json")
+    parser.add_argument("--onnx-dir", default=None, help="Where the exported ONNX model is kept")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(args)))
+        return
+
+    with open(args.dataset) as f:
+        cases = json.load(f)
+    results = []
+    for backend in args.backends.split(","):
+        command = [sys.executable, __file__, "--child", backend, "--model", args.model, "--threads", str(args.threads),
+                   "--repeat", str(args.repeat), "--dataset", args.dataset]
+        if args.onnx_dir:
+            command += ["--onnx-dir", args.onnx_dir]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    baseline = results[0]
+    for result in results:
+        result["mismatches"] = compare(baseline, result, cases)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{len(cases)} regression questions, baseline {baseline['backend']}, threads {args.threads or 'default'}")
+        for r in results:
+            latency = r["latency_ms"]
+            print(f"  {r['backend']:<11} mean {latency['mean']:>7}ms   p50 {latency['p50']:>7}ms   p95 {latency['p95']:>7}ms   "
+                  f"rss {r['rss_after_load_mb']:>6}MB   peak {r['peak_rss_mb']:>6}MB   "
+                  f"same answers {len(cases) - len(r['mismatches'])}/{len(cases)}")
+            for m in r["mismatches"]:
+                print(f"      {m['question']!r}: {m['expected']!r} -> {m['got']!r}")
+    if any(r["mismatches"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Benchmark the /chat endpoint of day02.py under concurrent load.
+#
+# Run it against the server started with BATCHING_ENABLED=true and again with
+# BATCHING_ENABLED=false to compare throughput and latency at each concurrency level:
+#
+#   python bench_batching.py --url http://localhost:8000 --concurrency 1,8,32 --duration 20
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+CONTEXT = (
+    "Hugging Face is a company that provides tools for building applications using machine learning. "
+    "It is known for its transformers library, which provides pre-trained models for natural language "
+    "processing tasks such as question answering, text classification and summarization."
+)
+QUESTIONS = [
+    "What is Hugging Face?",
+    "What is Hugging Face known for?",
+    "What does the transformers library provide?",
+    "Which tasks are the models for?",
+]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def client_loop(client, url, deadline, worker, latencies, errors):
+    i = worker
+    while time.perf_counter() < deadline:
+        payload = {"question": QUESTIONS[i % len(QUESTIONS)], "context": CONTEXT}
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/chat", json=payload)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        (latencies if ok else errors).append((time.perf_counter() - start) * 1000)
+
+
+async def run_level(url, concurrency, duration, timeout):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        before = (await client.get(f"{url}/batching/stats")).json()
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            client_loop(client, url, deadline, worker, latencies, errors) for worker in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        after = (await client.get(f"{url}/batching/stats")).json()
+
+    latencies.sort()
+    result = {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+        },
+        "batching": after.get("enabled", False),
+    }
+    if after.get("enabled"):
+        batches = after["batches"] - before["batches"]
+        items = after["items"] - before["items"]
+        result["avg_batch_size"] = round(items / batches, 2) if batches else 0.0
+    return result
+
+
+async def run(args):
+    levels = [int(level) for level in args.concurrency.split(",")]
+    return [await run_level(args.url, level, args.duration, args.timeout) for level in levels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /chat throughput of the QA API at several concurrency levels")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrent client counts")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per concurrency level")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        latency = r["latency_ms"]
+        batch = f"   avg batch {r['avg_batch_size']}" if "avg_batch_size" in r else ""
+        print(f"concurrency {r['concurrency']:>4}: {r['requests_per_sec']:>7} req/s   p50 {latency['p50']}ms   "
+              f"p95 {latency['p95']}ms   p99 {latency['p99']}ms   errors {r['errors']}{batch}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
 # Importing Necessary Libraries
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from transformers import pipeline
+import asyncio
+import os
 import uvicorn
 
+from batching import MicroBatcher
+from qa_backends import default_onnx_dir, export_onnx_model, load_qa_pipeline
+
+MODEL_NAME = os.environ.get("QA_MODEL", "distilbert-base-uncased-distilled-squad")
+# Inference backend: torch, torch-int8 or onnx (see qa_backends.py)
+QA_BACKEND = os.environ.get("QA_BACKEND", "torch")
+QA_NUM_THREADS = int(os.environ.get("QA_NUM_THREADS", "0"))  # 0 = one thread per core
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR") or None
+
+# Dynamic batching: concurrent /chat requests are run through the model together
+BATCHING_ENABLED = os.environ.get("BATCHING_ENABLED", "true").lower() == "true"
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "5"))
+
 # Defining Data Models
 class ChatRequest(BaseModel):
     question: str
@@ -15,31 +31,118 @@ class ChatResponse(BaseModel):
 # Creating the FastAPI Application
 app = FastAPI(title="Question Answering API", description="A simple QA API using transformers")
 
-# Initialize the pipeline once at startup
+# Initialize the pipeline once per process (or once in the gunicorn master, see gunicorn.conf.py)
 qa_pipeline = None
+batcher = None
+warmup_task = None
+model_ready = False  # weights loaded and a warm-up inference has run in this worker
+model_error = None
+
+WARMUP_QUESTION = "What does Hugging Face provide?"
+WARMUP_CONTEXT = "Hugging Face is a technology company that provides open-source NLP libraries and tools."
+
+def load_model():
+    # Called in the gunicorn master before workers fork, so they share the weights copy-on-write
+    global qa_pipeline
+    if qa_pipeline is None:
+        qa_pipeline = load_qa_pipeline(QA_BACKEND, MODEL_NAME, QA_NUM_THREADS, ONNX_MODEL_DIR)
+    return qa_pipeline
+
+def preload_model():
+    # Called by gunicorn.conf.py in the master before workers fork
+    if QA_BACKEND == "onnx":
+        # ONNX Runtime's thread pools don't survive fork: export the graph once here and
+        # let every worker open its own session on it
+        export_onnx_model(MODEL_NAME, ONNX_MODEL_DIR or default_onnx_dir(MODEL_NAME))
+        return
+    load_model()
+
+def answer_batch(items):
+    # One padded forward pass for all (question, context) pairs; runs on the batcher's thread
+    results = qa_pipeline(
+        question=[question for question, _ in items],
+        context=[context for _, context in items],
+        batch_size=len(items),
+    )
+    # The pipeline returns a bare dict for a single pair
+    return [results] if isinstance(results, dict) else results
+
+def validate_item(item):
+    # The checks the pipeline makes per pair, run before the pair joins a batch
+    for name, value in zip(("question", "context"), item):
+        if not value:
+            raise ValueError(f"`{name}` cannot be empty")
+
+async def answer(question, context):
+    if batcher is not None:
+        return await batcher.submit((question, context))
+    # Unbatched: still keep the forward pass off the event loop
+    return (await asyncio.to_thread(answer_batch, [(question, context)]))[0]
+
+async def prepare_model():
+    global model_ready, model_error
+    try:
+        await asyncio.to_thread(load_model)
+        # The first forward pass is much slower than the rest (allocations, kernel selection),
+        # so run one through the request path before the readiness probe lets traffic in
+        await answer(WARMUP_QUESTION, WARMUP_CONTEXT)
+        model_ready = True
+    except Exception as e:
+        model_error = str(e)
 
 @app.on_event("startup")
 async def startup_event():
-    global qa_pipeline
-    # Initializing the Question-Answering Pipeline
-    qa_pipeline = pipeline("question-answering", model="distilbert-base-uncased-distilled-squad")
+    global batcher, warmup_task
+    if BATCHING_ENABLED:
+        batcher = MicroBatcher(
+            answer_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS, validate_item=validate_item
+        )
+        await batcher.start()
+    # Loading (unless preloaded) and warming up the Question-Answering Pipeline in the
+    # background, so /health answers while /ready keeps traffic away until it is done
+    warmup_task = asyncio.create_task(prepare_model())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if batcher is not None:
+        await batcher.stop()
 
 # Creating the /chat endpoint
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     try:
-        if qa_pipeline is None:
+        if not model_ready:
             raise HTTPException(status_code=503, detail="Model not loaded")
         
-        result = qa_pipeline(question=request.question, context=request.context)
+        result = await answer(request.question, request.context)
         return ChatResponse(answer=result['answer'])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model_loaded": qa_pipeline is not None}
+    if model_error is not None:
+        # Loading failed for good; let the liveness probe restart the container
+        return JSONResponse({"status": "unhealthy", "error": model_error}, status_code=503)
+    return {"status": "healthy", "model_loaded": qa_pipeline is not None, "ready": model_ready, "backend": QA_BACKEND}
+
+# Readiness endpoint: 200 only once this worker has loaded the model and run a warm-up inference
+@app.get("/ready")
+async def readiness_check():
+    if not model_ready:
+        status = "failed" if model_error is not None else "warming_up"
+        return JSONResponse({"status": status}, status_code=503)
+    return {"status": "ready"}
+
+# Batching statistics (average batch size shows how much requests are being grouped)
+@app.get("/batching/stats")
+async def batching_stats():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, "max_batch_size": BATCH_MAX_SIZE, "max_wait_ms": BATCH_MAX_WAIT_MS, **batcher.stats()}
 
 # Root endpoint
 @app.get("/")
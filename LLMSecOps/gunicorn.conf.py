@@ -0,0 +1,27 @@
+# gunicorn.conf.py
+# Serve day02:app with several uvicorn workers that share one copy of the model weights:
+#
+#   gunicorn -c gunicorn.conf.py day02:app
+#
+# With preload_app the master imports day02 and loads the pipeline before forking, so the
+# weights are inherited copy-on-write instead of being loaded (and held) once per worker.
+# Each worker still runs its own warm-up inference before /ready reports 200.
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    # Runs in the master after day02 was imported and before any worker is forked
+    import day02
+
+    server.log.info("Loading %s (%s backend) in the master", day02.MODEL_NAME, day02.QA_BACKEND)
+    day02.preload_model()
+    # Objects created so far move to a permanent generation: the workers' garbage collections
+    # never write to them, so their pages stay shared instead of being copied per worker
+    gc.freeze()
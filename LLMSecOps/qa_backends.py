@@ -0,0 +1,73 @@
+# Selectable inference backends for the question-answering pipeline on CPU.
+#
+#   torch       the stock PyTorch model (default)
+#   torch-int8  PyTorch with dynamic int8 quantization of every Linear layer
+#   onnx        the model exported to ONNX and run by ONNX Runtime (graph optimizations on)
+#
+# All three return a regular transformers question-answering pipeline, so tokenization,
+# batching and answer-span decoding are identical and only the forward pass changes.
+# Check that a backend still gives the same answers with `python bench_backends.py`.
+import os
+
+from transformers import AutoModelForQuestionAnswering, AutoTokenizer, pipeline
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+def set_torch_threads(num_threads):
+    import torch
+
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+
+def default_onnx_dir(model_name):
+    return os.path.join("onnx-models", model_name.strip("/").replace("/", "--"))
+
+
+def export_onnx_model(model_name, onnx_dir):
+    # Export once and reuse the graph on later starts
+    if os.path.exists(os.path.join(onnx_dir, "model.onnx")):
+        return
+    try:
+        from optimum.exporters.onnx import main_export
+    except ImportError as e:
+        raise ImportError("The onnx backend needs: pip install 'optimum-onnx[onnxruntime]'") from e
+    main_export(model_name, output=onnx_dir, task="question-answering")
+
+
+def load_onnx_model(model_name, num_threads, onnx_dir):
+    export_onnx_model(model_name, onnx_dir)
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForQuestionAnswering
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads > 0:
+        session_options.intra_op_num_threads = num_threads
+        session_options.inter_op_num_threads = 1
+    return ORTModelForQuestionAnswering.from_pretrained(onnx_dir, session_options=session_options)
+
+
+def load_qa_pipeline(backend="torch", model_name="distilbert-base-uncased-distilled-squad", num_threads=0,
+                     onnx_dir=None):
+    # num_threads=0 keeps the library default (one thread per core)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown QA backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+    set_torch_threads(num_threads)
+    if backend == "torch":
+        return pipeline("question-answering", model=model_name)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    onnx_dir = onnx_dir or default_onnx_dir(model_name)
+    if backend == "torch-int8":
+        import torch
+        from torch.ao.quantization import quantize_dynamic
+
+        model = AutoModelForQuestionAnswering.from_pretrained(model_name)
+        # Weights stored as int8, activations quantized on the fly: no calibration data needed
+        model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    else:
+        model = load_onnx_model(model_name, num_threads, onnx_dir)
+    return pipeline("question-answering", model=model, tokenizer=tokenizer)
@@ -0,0 +1,143 @@
+"""
+Microbenchmark of the per-entry work in LLMLogger.log_interaction (no file I/O).
+
+  legacy       dict literal + None-filtering comprehension + datetime.utcnow().isoformat()
+               + json.dumps(..., ensure_ascii=False), as the logger did originally
+  record+<enc> InteractionRecord + cached timestamp, then as_dict() + the given encoder
+
+For each path it reports ns/entry and the bytes allocated per entry (tracemalloc),
+split into building the entry and serializing it.
+
+    python bench_encoding.py --entries 200000
+    python bench_encoding.py --json
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from llm_logger import ENCODERS, InteractionRecord, TimestampCache, get_encoder
+
+FIELDS = dict(
+    prompt="What is the capital of Japan?",
+    response="The capital mentioned in your question relates to geographic or political centers.",
+    model="mock-gpt-3.5",
+    user_id="demo_user",
+    session_id="3001f1b0-5040-4fc8-bfb2-57fbb678dc51",
+    tokens_used=32,
+    latency_ms=244.39,
+)
+EXTRA = dict(success=True, prompt_category="geography")
+
+
+def legacy_build(prompt, response, model=None, user_id=None, session_id=None,
+                 tokens_used=None, latency_ms=None, **additional_metadata):
+    log_entry = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "prompt": prompt,
+        "response": response,
+        "model": model,
+        "user_id": user_id,
+        "session_id": session_id,
+        "tokens_used": tokens_used,
+        "latency_ms": latency_ms,
+        **additional_metadata
+    }
+    return {k: v for k, v in log_entry.items() if v is not None}
+
+
+def legacy_encode(entry):
+    return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def make_record_builder():
+    clock = TimestampCache()
+
+    def build(prompt, response, model=None, user_id=None, session_id=None,
+              tokens_used=None, latency_ms=None, **additional_metadata):
+        return InteractionRecord(
+            clock.now(), prompt, response, model, user_id, session_id,
+            tokens_used, latency_ms, additional_metadata
+        )
+    return build
+
+
+def make_record_encoder(name):
+    encode = get_encoder(name)
+    return lambda record: encode(record.as_dict()) + b"\n"
+
+
+def time_per_entry(fn, inputs) -> float:
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        for item in inputs:
+            fn(item)
+        return (time.perf_counter_ns() - start) / len(inputs)
+    finally:
+        gc.enable()
+
+
+def bytes_per_entry(fn, inputs) -> float:
+    """Average bytes still allocated per entry when every result is kept alive."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [fn(item) for item in inputs]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Subtract the list holding the results
+    return (after - before) / len(kept) - 8
+
+
+def bench_path(name, build, encode, entries: int) -> dict:
+    calls = range(entries)
+    build_call = lambda _: build(**FIELDS, **EXTRA)
+    built = [build(**FIELDS, **EXTRA) for _ in calls]
+
+    build_ns = time_per_entry(build_call, calls)
+    encode_ns = time_per_entry(encode, built)
+    sample = min(entries, 20000)
+    return {
+        "path": name,
+        "entries": entries,
+        "build_ns": round(build_ns, 1),
+        "encode_ns": round(encode_ns, 1),
+        "total_ns": round(build_ns + encode_ns, 1),
+        "build_bytes": round(bytes_per_entry(build_call, range(sample)), 1),
+        "encode_bytes": round(bytes_per_entry(encode, built[:sample]), 1),
+        "line_bytes": len(encode(built[0])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark LLMLogger entry building and encoding")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = [bench_path("legacy", legacy_build, legacy_encode, args.entries)]
+    record_build = make_record_builder()
+    for name in ENCODERS[1:]:
+        try:
+            encode = make_record_encoder(name)
+        except ImportError:
+            continue
+        results.append(bench_path(f"record+{name}", record_build, encode, args.entries))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"⏱️ {args.entries} entries per path")
+    print(f"  {'path':<16}{'build ns':>10}{'encode ns':>11}{'total ns':>10}{'build B':>9}{'encode B':>10}{'line B':>8}")
+    for r in results:
+        print(
+            f"  {r['path']:<16}{r['build_ns']:>10.0f}{r['encode_ns']:>11.0f}{r['total_ns']:>10.0f}"
+            f"{r['build_bytes']:>9.0f}{r['encode_bytes']:>10.0f}{r['line_bytes']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
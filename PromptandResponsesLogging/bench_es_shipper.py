@@ -0,0 +1,197 @@
+"""
+Throughput benchmark: direct _bulk shipping vs. writing the file for Logstash to tail.
+
+Runs against a local stub Elasticsearch (no Docker needed), so it also serves as a
+quick check of ElasticsearchSink's retry and spool behaviour (--fail-rate).
+
+    python bench_es_shipper.py --entries 50000
+    python bench_es_shipper.py --entries 5000 --fail-rate 0.3 --json
+
+Paths compared:
+  file+tail   LLMLogger writes llm_logs.json, then the file is re-read, parsed and
+              enriched line by line the way the Logstash pipeline does before
+              indexing (output to Elasticsearch is not included, so this is a lower bound)
+  es-bulk     LLMLogger(async_mode=True, write_file=False) with ElasticsearchSink
+              shipping to the stub until every document is acknowledged
+"""
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from es_shipper import ElasticsearchSink, enrich
+from llm_logger import LLMLogger
+
+
+class StubElasticsearch:
+    """
+    Minimal HTTP/1.1 keep-alive server answering POST /_bulk like Elasticsearch.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0):
+        """
+        Args:
+            latency: Seconds to sleep per bulk request
+            fail_rate: Probability of answering a bulk request with 503
+        """
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.documents = 0
+        self.requests = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.connections.add(self.client_address)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if random.random() < stub.fail_rate:
+                    self._reply(503, {"error": "unavailable"})
+                    return
+                docs = body.count(b"\n") // 2
+                with stub._lock:
+                    stub.documents += docs
+                items = [{"index": {"status": 201}}] * docs
+                self._reply(200, {"took": 1, "errors": False, "items": items})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_entries(count: int):
+    models = ["gpt-3.5-turbo", "gpt-4", "mock-gpt-3.5"]
+    categories = ["coding", "weather", "geography", "question", "general"]
+    for i in range(count):
+        yield dict(
+            prompt=f"What is the capital of country number {i}?",
+            response="The capital mentioned in your question relates to geographic or political centers.",
+            model=random.choice(models),
+            user_id=f"user{i % 50}",
+            session_id=f"session{i % 500}",
+            tokens_used=random.randint(20, 400),
+            latency_ms=random.uniform(100, 900),
+            success=True,
+            prompt_category=random.choice(categories),
+        )
+
+
+def bench_file_tail(entries, workdir: Path) -> dict:
+    logger = LLMLogger(log_dir=str(workdir / "file"), async_mode=True)
+    start = time.perf_counter()
+    for entry in entries:
+        logger.log_interaction(**entry)
+    logger.close()
+    written = time.perf_counter()
+
+    # What Logstash does per event before indexing: parse JSON, compute fields, re-serialize
+    with open(logger.log_file, "r", encoding="utf-8") as f:
+        for line in f:
+            json.dumps(enrich(json.loads(line)))
+    end = time.perf_counter()
+    return {
+        "path": "file+tail",
+        "entries": len(entries),
+        "app_seconds": written - start,
+        "total_seconds": end - start,
+        "entries_per_sec": len(entries) / (end - start),
+    }
+
+
+def bench_es_bulk(entries, workdir: Path, stub: StubElasticsearch, batch_size: int) -> dict:
+    sink = ElasticsearchSink(stub.url, spool_file=str(workdir / "spool.jsonl"), backoff=0.05, max_retries=8)
+    logger = LLMLogger(
+        log_dir=str(workdir / "es"),
+        async_mode=True,
+        batch_size=batch_size,
+        write_file=False,
+        sinks=[sink],
+    )
+    start = time.perf_counter()
+    for entry in entries:
+        logger.log_interaction(**entry)
+    queued = time.perf_counter()
+    logger.flush()
+    sink._replay_spool()
+    end = time.perf_counter()
+    logger.close()
+    return {
+        "path": "es-bulk",
+        "entries": len(entries),
+        "app_seconds": queued - start,
+        "total_seconds": end - start,
+        "entries_per_sec": len(entries) / (end - start),
+        "indexed": stub.documents,
+        "bulk_requests": stub.requests,
+        "connections": len(stub.connections),
+        **{f"sink_{k}": v for k, v in sink.stats().items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ElasticsearchSink against the file+Logstash path")
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--stub-latency", type=float, default=0.002, help="Seconds per bulk request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of bulk requests answered with 503")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    entries = list(make_entries(args.entries))
+    workdir = Path(tempfile.mkdtemp(prefix="bench_es_"))
+    stub = StubElasticsearch(latency=args.stub_latency, fail_rate=args.fail_rate)
+    try:
+        results = [
+            bench_file_tail(entries, workdir),
+            bench_es_bulk(entries, workdir, stub, args.batch_size),
+        ]
+    finally:
+        stub.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"📊 {args.entries} entries, batch size {args.batch_size}, stub latency {args.stub_latency * 1000:.1f}ms")
+    for result in results:
+        print(
+            f"  {result['path']:<10} app {result['app_seconds'] * 1000:8.1f}ms   "
+            f"end-to-end {result['total_seconds'] * 1000:8.1f}ms   {result['entries_per_sec']:10.0f} entries/s"
+        )
+    es = results[1]
+    print(f"  es-bulk: {es['indexed']} indexed in {es['bulk_requests']} requests over {es['connections']} connection(s), "
+          f"{es['sink_retries']} retries, {es['sink_spooled']} still spooled")
+
+
+if __name__ == "__main__":
+    main()
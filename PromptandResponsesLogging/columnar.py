@@ -0,0 +1,353 @@
+"""
+Columnar (Parquet) compaction of closed log segments.
+
+Rotated JSONL segments repeat every key on every line. The compaction job rewrites each
+closed segment as a Parquet file with dictionary-encoded string columns (model, user_id,
+session_id, prompt_category, ...), typed numeric/timestamp columns and the derived fields
+Logstash computes per event (prompt_length, response_length, total_length, hour_of_day).
+Keys outside the fixed schema are kept in a JSON "extra" column, so nothing is lost.
+
+Requires: pip install pyarrow numpy
+
+Example:
+    python columnar.py compact --log-dir logs
+
+    from columnar import ColumnarLogs
+    logs = ColumnarLogs("logs/columnar")
+    latency = logs.column("latency_ms")             # float64, NaN where missing
+    codes, models = logs.categorical("model")       # int32 codes (-1 = missing), labels
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from log_rotation import mark_compacted, open_segment, read_manifest
+from multiprocess_logs import worker_files
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependencies, only needed for compaction and reading
+    np = pa = pc = pq = None
+
+
+DICTIONARY_COLUMNS = ("model", "user_id", "session_id", "prompt_category", "event_type", "error_type")
+TEXT_COLUMNS = ("prompt", "response", "error_message")
+DERIVED_COLUMNS = ("prompt_length", "response_length", "total_length", "hour_of_day")
+
+ROW_GROUP_SIZE = 100_000
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Columnar export requires: pip install pyarrow numpy")
+
+
+def schema():
+    """Arrow schema of the compacted files."""
+    _require_pyarrow()
+    fields = [pa.field("timestamp", pa.timestamp("us"))]
+    fields += [pa.field(name, pa.dictionary(pa.int32(), pa.string())) for name in DICTIONARY_COLUMNS]
+    fields += [pa.field(name, pa.string()) for name in TEXT_COLUMNS]
+    fields += [
+        pa.field("tokens_used", pa.int64()),
+        pa.field("latency_ms", pa.float64()),
+        pa.field("success", pa.bool_()),
+        pa.field("prompt_length", pa.int32()),
+        pa.field("response_length", pa.int32()),
+        pa.field("total_length", pa.int32()),
+        pa.field("hour_of_day", pa.int8()),
+        pa.field("extra", pa.string()),
+    ]
+    return pa.schema(fields)
+
+
+FIXED_KEYS = {"timestamp", "tokens_used", "latency_ms", "success", *DICTIONARY_COLUMNS, *TEXT_COLUMNS}
+
+
+def _iter_entries(segment: Path) -> Iterator[Dict[str, Any]]:
+    with open_segment(segment) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                yield entry
+
+
+def _to_batch(entries: List[Dict[str, Any]]):
+    columns: Dict[str, list] = {name: [] for name in FIXED_KEYS}
+    columns["extra"] = []
+    for entry in entries:
+        for name in FIXED_KEYS:
+            columns[name].append(entry.get(name))
+        extra = {k: v for k, v in entry.items() if k not in FIXED_KEYS}
+        columns["extra"].append(json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    timestamps = []
+    for value in columns["timestamp"]:
+        try:
+            timestamps.append(datetime.fromisoformat(value) if value else None)
+        except (TypeError, ValueError):
+            timestamps.append(None)
+    tokens = [int(v) if isinstance(v, (int, float)) else None for v in columns["tokens_used"]]
+    latency = [float(v) if isinstance(v, (int, float)) else None for v in columns["latency_ms"]]
+    success = [v if isinstance(v, bool) else None for v in columns["success"]]
+
+    arrays = {
+        "timestamp": pa.array(timestamps, type=pa.timestamp("us")),
+        "tokens_used": pa.array(tokens, type=pa.int64()),
+        "latency_ms": pa.array(latency, type=pa.float64()),
+        "success": pa.array(success, type=pa.bool_()),
+        "extra": pa.array(columns["extra"], type=pa.string()),
+    }
+    for name in DICTIONARY_COLUMNS:
+        values = [None if v is None else str(v) for v in columns[name]]
+        arrays[name] = pa.array(values, type=pa.string()).dictionary_encode()
+    for name in TEXT_COLUMNS:
+        arrays[name] = pa.array([None if v is None else str(v) for v in columns[name]], type=pa.string())
+
+    # Same derived fields as the Logstash ruby filters, computed once per segment
+    # Texts removed or cut by a LogPolicy carry their real length in <field>_original_length
+    lengths = {}
+    for field in ("prompt", "response"):
+        original = [e.get(f"{field}_original_length") for e in entries]
+        original = pa.array([v if isinstance(v, int) else None for v in original], type=pa.int64())
+        lengths[field] = pc.fill_null(pc.coalesce(original, pc.utf8_length(arrays[field]).cast(pa.int64())), 0)
+    prompt_length, response_length = lengths["prompt"], lengths["response"]
+    arrays["prompt_length"] = prompt_length.cast(pa.int32())
+    arrays["response_length"] = response_length.cast(pa.int32())
+    arrays["total_length"] = pc.add(prompt_length, response_length).cast(pa.int32())
+    arrays["hour_of_day"] = pc.hour(arrays["timestamp"]).cast(pa.int8())
+
+    target = schema()
+    return pa.RecordBatch.from_arrays([arrays[field.name] for field in target], schema=target)
+
+
+def compact_segment(segment: Path, output: Path, compression: str = "zstd") -> Dict[str, Any]:
+    """
+    Rewrite one closed JSONL segment as a Parquet file.
+
+    Args:
+        segment: Plain, .gz or .zst JSONL segment
+        output: Parquet file to write (replaced atomically)
+        compression: Parquet codec ("zstd", "snappy", "gzip" or "none")
+
+    Returns:
+        dict: {"segment", "output", "rows", "input_bytes", "output_bytes"}
+    """
+    _require_pyarrow()
+    segment, output = Path(segment), Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".tmp")
+
+    rows = 0
+    with pq.ParquetWriter(
+        tmp,
+        schema(),
+        compression=compression,
+        use_dictionary=list(DICTIONARY_COLUMNS),
+    ) as writer:
+        batch: List[Dict[str, Any]] = []
+        for entry in _iter_entries(segment):
+            batch.append(entry)
+            if len(batch) == ROW_GROUP_SIZE:
+                writer.write_batch(_to_batch(batch))
+                rows += len(batch)
+                batch = []
+        if batch or rows == 0:
+            writer.write_batch(_to_batch(batch))
+            rows += len(batch)
+    tmp.replace(output)
+
+    return {
+        "segment": segment.name,
+        "output": output.name,
+        "rows": rows,
+        "input_bytes": segment.stat().st_size,
+        "output_bytes": output.stat().st_size,
+    }
+
+
+def closed_segments(log_dir: Path, log_file: str = "llm_logs.json") -> List[Path]:
+    """Return the rotated segments (of the shared and per-worker files) that are no longer being written or compressed."""
+    log_dir = Path(log_dir)
+    return [
+        log_dir / segment["segment"]
+        for writer in [log_dir / log_file] + worker_files(log_dir, log_file)
+        for segment in read_manifest(writer)
+        if segment.get("status") not in ("pending", "compacted") and (log_dir / segment["segment"]).exists()
+    ]
+
+
+def output_path(segment: Path, output_dir: Path) -> Path:
+    """Parquet path for a segment: llm_logs.<time>.json.gz -> <output_dir>/llm_logs.<time>.parquet"""
+    name = Path(segment).name
+    for suffix in (".gz", ".zst", ".json"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return Path(output_dir) / f"{name}.parquet"
+
+
+def compact(
+    log_dir: str = "logs",
+    log_file: str = "llm_logs.json",
+    output_dir: Optional[str] = None,
+    segments: Optional[Iterable[Path]] = None,
+    delete_source: bool = False,
+    compression: str = "zstd"
+) -> List[Dict[str, Any]]:
+    """
+    Compact every closed segment that has no Parquet file yet.
+
+    Args:
+        log_dir: Directory with the log file, its manifest and segments
+        log_file: Name of the hot log file
+        output_dir: Where Parquet files go (defaults to <log_dir>/columnar)
+        segments: Explicit segment paths instead of the manifest's closed segments
+        delete_source: Remove each JSONL segment once its Parquet file is written (and mark it
+            "compacted" in its manifest, so LogIndex, multiprocess_logs and replay skip it)
+        compression: Parquet codec
+
+    Returns:
+        list: One compact_segment() report per newly compacted segment
+    """
+    output_dir = Path(output_dir) if output_dir else Path(log_dir) / "columnar"
+    todo = list(segments) if segments is not None else closed_segments(Path(log_dir), log_file)
+
+    writers = {}
+    if delete_source:
+        log_dir = Path(log_dir)
+        for writer in [log_dir / log_file] + worker_files(log_dir, log_file):
+            for record in read_manifest(writer):
+                writers[record["segment"]] = writer
+
+    reports = []
+    for segment in todo:
+        target = output_path(segment, output_dir)
+        if target.exists():
+            continue
+        reports.append(compact_segment(segment, target, compression=compression))
+        if delete_source:
+            segment = Path(segment)
+            if segment.name in writers:
+                writer = writers[segment.name]
+                mark_compacted(writer, segment.name, os.path.relpath(target, writer.parent))
+            segment.unlink()
+    return reports
+
+
+class ColumnarLogs:
+    """
+    Reads compacted Parquet files into NumPy arrays.
+    """
+
+    def __init__(self, path: str = "logs/columnar", columns: Optional[Sequence[str]] = None):
+        """
+        Load one Parquet file or every *.parquet file in a directory.
+
+        Args:
+            path: Parquet file or directory
+            columns: Restrict loading to these columns (default: everything but the text columns)
+        """
+        _require_pyarrow()
+        path = Path(path)
+        files = sorted(path.glob("*.parquet")) if path.is_dir() else [path]
+        if columns is None:
+            columns = [name for name in schema().names if name not in TEXT_COLUMNS]
+
+        tables = [pq.read_table(file, columns=list(columns)) for file in files]
+        if tables:
+            self.table = pa.concat_tables(tables).unify_dictionaries().combine_chunks()
+        else:
+            self.table = schema().empty_table().select(list(columns))
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def column(self, name: str):
+        """
+        Return a numeric or timestamp column as a NumPy array.
+
+        Missing values become NaN (floats), -1 (integers, lengths) or NaT (timestamps).
+        """
+        column = self.table.column(name)
+        if pa.types.is_dictionary(column.type):
+            raise TypeError(f"{name} is dictionary-encoded, use categorical()")
+        if pa.types.is_timestamp(column.type):
+            return column.to_numpy()
+        if pa.types.is_floating(column.type):
+            return pc.fill_null(column, float("nan")).to_numpy()
+        if pa.types.is_integer(column.type):
+            return pc.fill_null(column, -1).to_numpy()
+        return column.to_numpy(zero_copy_only=False)
+
+    def categorical(self, name: str) -> Tuple[Any, List[str]]:
+        """
+        Return a dictionary-encoded column as (int32 codes, labels); missing values are -1.
+        """
+        column = self.table.column(name)
+        chunk = column.chunk(0) if column.num_chunks else pa.array([], type=column.type)
+        codes = pc.fill_null(chunk.indices, -1).to_numpy().astype(np.int32)
+        return codes, chunk.dictionary.to_pylist()
+
+    def to_numpy(self, columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Return several columns at once; dictionary columns map to their int32 codes.
+        """
+        result = {}
+        for name in columns or self.table.column_names:
+            if pa.types.is_dictionary(self.table.column(name).type):
+                result[name], _ = self.categorical(name)
+            else:
+                result[name] = self.column(name)
+        return result
+
+    def group_mean(self, value: str, by: str) -> Dict[str, float]:
+        """Vectorized mean of a numeric column per label of a dictionary column."""
+        codes, labels = self.categorical(by)
+        values = self.column(value).astype(np.float64)
+        keep = (codes >= 0) & ~np.isnan(values)
+        sums = np.bincount(codes[keep], weights=values[keep], minlength=len(labels))
+        counts = np.bincount(codes[keep], minlength=len(labels))
+        return {label: float(sums[i] / counts[i]) for i, label in enumerate(labels) if counts[i]}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact closed LLM log segments into Parquet")
+    parser.add_argument("command", choices=["compact", "summary"])
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--log-file", default="llm_logs.json")
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--segment", action="append", help="Compact this file instead of the manifest's closed segments")
+    parser.add_argument("--delete-source", action="store_true")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or str(Path(args.log_dir) / "columnar")
+    if args.command == "compact":
+        reports = compact(
+            args.log_dir,
+            args.log_file,
+            output_dir=output_dir,
+            segments=[Path(s) for s in args.segment] if args.segment else None,
+            delete_source=args.delete_source,
+        )
+        for report in reports:
+            ratio = report["input_bytes"] / max(report["output_bytes"], 1)
+            print(f"🗜️ {report['segment']} -> {report['output']}: {report['rows']} rows, {ratio:.1f}x smaller")
+        print(f"✅ Compacted {len(reports)} segment(s)")
+    else:
+        logs = ColumnarLogs(output_dir)
+        print(f"📚 Rows: {len(logs)}")
+        print(f"⏱️ Mean latency by model: {logs.group_mean('latency_ms', 'model')}")
+        print(f"📏 Mean prompt length by category: {logs.group_mean('prompt_length', 'prompt_category')}")
@@ -0,0 +1,319 @@
+"""
+Direct Elasticsearch shipping for LLMLogger, replacing file tailing through Logstash.
+
+ElasticsearchSink computes the fields logstash.conf derives per event (prompt_length,
+response_length, total_length, hour_of_day, @timestamp) in Python and sends entries with
+the _bulk API over keep-alive connections from a small pool. Failed requests are retried
+with exponential backoff; when the cluster stays unavailable the batch is appended to a
+local spool file and replayed before the next successful batch.
+
+Example:
+    from llm_logger import LLMLogger
+    from es_shipper import ElasticsearchSink
+
+    logger = LLMLogger(async_mode=True, sinks=[ElasticsearchSink("http://localhost:9200")])
+"""
+
+import base64
+import http.client
+import itertools
+import json
+import queue
+import random
+import shutil
+import socket
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+# Bulk item statuses worth retrying; other item failures (e.g. mapping errors) are dropped.
+# A non-2xx response to the whole request is always retried and then spooled.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def enrich(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of the entry with the fields logstash.conf computes.
+
+    Args:
+        entry: Log entry as written by LLMLogger
+
+    Returns:
+        dict: Entry plus prompt_length, response_length, total_length, hour_of_day, @timestamp
+    """
+    doc = dict(entry)
+    # Texts removed or cut by a LogPolicy carry their real length separately
+    prompt_length = entry.get("prompt_original_length", len(str(entry.get("prompt") or "")))
+    response_length = entry.get("response_original_length", len(str(entry.get("response") or "")))
+    doc["prompt_length"] = prompt_length
+    doc["response_length"] = response_length
+    doc["total_length"] = prompt_length + response_length
+
+    timestamp = entry.get("timestamp")
+    if timestamp:
+        try:
+            moment = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return doc
+        doc["hour_of_day"] = moment.hour
+        # LLMLogger writes naive UTC timestamps; keep ones that carry a zone or offset as they are
+        doc["@timestamp"] = timestamp + "Z" if moment.tzinfo is None else timestamp
+    return doc
+
+
+class ElasticsearchSink:
+    """
+    LLMLogger sink that indexes entries through the Elasticsearch _bulk API.
+    """
+
+    def __init__(
+        self,
+        url: str = "http://localhost:9200",
+        index_pattern: str = "llm-logs-%Y.%m.%d",
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        pool_size: int = 2,
+        timeout: float = 10.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        spool_file: Optional[str] = "logs/es_spool.jsonl"
+    ):
+        """
+        Initialize the sink.
+
+        Args:
+            url: Elasticsearch base URL
+            index_pattern: strftime pattern applied to each entry's timestamp (Logstash's llm-logs-%{+YYYY.MM.dd})
+            username: Basic auth user (for the secure stack)
+            password: Basic auth password
+            pool_size: Number of keep-alive connections shared by concurrent callers
+            timeout: Socket timeout per request in seconds
+            max_retries: Retries per batch before it is spooled
+            backoff: Initial retry delay in seconds (doubled each attempt, with jitter)
+            max_backoff: Upper bound of the retry delay
+            spool_file: Where undeliverable entries are kept for later replay (None to drop them)
+        """
+        parsed = urlparse(url)
+        self._scheme = parsed.scheme or "http"
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port or (443 if self._scheme == "https" else 9200)
+        self._path = parsed.path.rstrip("/") + "/_bulk"
+        self.index_pattern = index_pattern
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.spool_file = Path(spool_file) if spool_file else None
+        self._headers = {"Content-Type": "application/x-ndjson"}
+        if username is not None:
+            token = base64.b64encode(f"{username}:{password or ''}".encode()).decode()
+            self._headers["Authorization"] = f"Basic {token}"
+
+        self._pool = queue.LifoQueue()
+        for _ in range(max(1, pool_size)):
+            self._pool.put(None)  # connections are opened lazily
+        self._spool_lock = threading.Lock()
+        self._replaying = False
+        self._stats_lock = threading.Lock()
+
+        self.shipped = 0
+        self.dropped = 0
+        self.spooled = 0
+        self.corrupt = 0
+        self.retries = 0
+        self.requests = 0
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Ship a batch of entries; never raises on delivery failure (the batch is spooled instead).
+
+        Args:
+            entries: Log entries as produced by LLMLogger
+        """
+        if not entries:
+            return
+        undelivered = self._deliver(entries)
+        if undelivered:
+            self._spool(undelivered)
+        else:
+            self._replay_spool()
+
+    def stats(self) -> Dict[str, int]:
+        """Delivery counters for monitoring."""
+        with self._stats_lock:
+            return {
+                "shipped": self.shipped,
+                "dropped": self.dropped,
+                "spooled": self.spooled,
+                "corrupt": self.corrupt,
+                "retries": self.retries,
+                "requests": self.requests,
+            }
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                conn.close()
+
+    def _index_name(self, entry: Dict[str, Any]) -> str:
+        try:
+            moment = datetime.fromisoformat(entry["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            moment = datetime.utcnow()
+        return moment.strftime(self.index_pattern)
+
+    def _bulk_body(self, entries: List[Dict[str, Any]]) -> bytes:
+        lines = []
+        for entry in entries:
+            lines.append(json.dumps({"index": {"_index": self._index_name(entry)}}))
+            lines.append(json.dumps(enrich(entry), ensure_ascii=False))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _deliver(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send entries, retrying failed requests and retryable items; return what could not be delivered."""
+        pending = entries
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                with self._stats_lock:
+                    self.retries += 1
+            try:
+                status, body = self._post(self._bulk_body(pending))
+            except (OSError, http.client.HTTPException):
+                continue
+            if status >= 300:
+                # The whole request failed (overload, outage, expired credentials...): keep the
+                # entries; only per-document failures below are dropped
+                continue
+
+            retry, failed = self._split_failures(pending, body)
+            with self._stats_lock:
+                self.shipped += len(pending) - len(retry) - failed
+                self.dropped += failed
+            if not retry:
+                return []
+            pending = retry
+        return pending
+
+    @staticmethod
+    def _split_failures(entries: List[Dict[str, Any]], body: bytes) -> Tuple[List[Dict[str, Any]], int]:
+        """Return (entries to retry, number of permanently failed entries) from a bulk response."""
+        try:
+            result = json.loads(body)
+        except ValueError:
+            return [], 0
+        if not result.get("errors"):
+            return [], 0
+        retry, failed = [], 0
+        for entry, item in zip(entries, result.get("items", [])):
+            status = next(iter(item.values()), {}).get("status", 200)
+            if status in RETRYABLE_STATUSES:
+                retry.append(entry)
+            elif status >= 300:
+                failed += 1
+        return retry, failed
+
+    def _post(self, body: bytes) -> Tuple[int, bytes]:
+        conn = self._pool.get()
+        try:
+            if conn is None:
+                cls = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+                conn = cls(self._host, self._port, timeout=self.timeout)
+                conn.connect()
+                # Headers and body go out in separate writes; don't let Nagle hold the body back
+                conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._stats_lock:
+                self.requests += 1
+            conn.request("POST", self._path, body=body, headers=self._headers)
+            response = conn.getresponse()
+            data = response.read()
+            if response.will_close:
+                conn.close()
+                conn = None
+            return response.status, data
+        except (OSError, http.client.HTTPException):
+            if conn is not None:
+                conn.close()
+            conn = None
+            raise
+        finally:
+            self._pool.put(conn)
+
+    def _spool(self, entries: List[Dict[str, Any]]) -> None:
+        if self.spool_file is None:
+            with self._stats_lock:
+                self.dropped += len(entries)
+            return
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        with self._spool_lock:
+            self.spool_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spool_file, "a", encoding="utf-8") as f:
+                f.write(data)
+        with self._stats_lock:
+            self.spooled += len(entries)
+
+    def _replay_spool(self, batch_size: int = 1000) -> None:
+        """Re-send spooled entries once the cluster accepts requests again."""
+        if self.spool_file is None:
+            return
+        replaying = self.spool_file.with_name(self.spool_file.name + ".replay")
+        with self._spool_lock:
+            if self._replaying or not (self.spool_file.exists() or replaying.exists()):
+                return
+            self._replaying = True
+            # A .replay file left by a crashed run is replayed together with the spool
+            if self.spool_file.exists():
+                with open(self.spool_file, "rb") as src, open(replaying, "ab") as dst:
+                    shutil.copyfileobj(src, dst)
+                self.spool_file.unlink()
+
+        try:
+            # Stream the file one bulk request at a time; the spool can outgrow memory during a long outage
+            with open(replaying, "r", encoding="utf-8") as f:
+                while True:
+                    lines = list(itertools.islice(f, batch_size))
+                    if not lines:
+                        break
+                    entries = self._parse_spool_lines(lines)
+                    if not entries:
+                        continue
+                    with self._stats_lock:
+                        self.spooled -= min(self.spooled, len(entries))
+                    undelivered = self._deliver(entries)
+                    if undelivered:
+                        self._spool(undelivered)
+                        self._spool_rest(f)
+                        break
+            replaying.unlink()
+        finally:
+            self._replaying = False
+
+    def _parse_spool_lines(self, lines: List[str]) -> List[Dict[str, Any]]:
+        """Decode spooled lines, skipping (and counting) lines cut short by a crash."""
+        entries = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                with self._stats_lock:
+                    self.corrupt += 1
+        return entries
+
+    def _spool_rest(self, f) -> None:
+        """Move the unread part of a replay file back to the spool without loading it."""
+        with self._spool_lock:
+            with open(self.spool_file, "a", encoding="utf-8") as dst:
+                shutil.copyfileobj(f, dst)
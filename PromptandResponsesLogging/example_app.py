@@ -3,18 +3,64 @@ Example LLM Application with ELK Stack Logging
 This demonstrates how to integrate LLM logging with the ELK stack.
 """
 
+import asyncio
+import inspect
+import math
 import time
 import random
 import uuid
-from datetime import datetime
+from typing import Callable
 from llm_logger import LLMLogger, LLMTimer, log_llm_interaction
 
 
+def latency_sampler(spec: str) -> Callable[[], float]:
+    """
+    Build a function returning simulated latencies in seconds from a spec string.
+    
+    Supported specs:
+        fixed:S               always S seconds
+        uniform:LOW,HIGH      uniformly distributed (the default is uniform:0.1,0.5)
+        normal:MEAN,STDEV     normal, clipped at 0
+        lognormal:MEDIAN,SIGMA
+        exponential:MEAN
+    """
+    name, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(",")] if params else []
+        if name == "fixed":
+            (seconds,) = values
+            return lambda: seconds
+        if name == "uniform":
+            low, high = values
+            return lambda: random.uniform(low, high)
+        if name == "normal":
+            mean, stdev = values
+            return lambda: max(0.0, random.gauss(mean, stdev))
+        if name == "lognormal":
+            median, sigma = values
+            mu = math.log(median)
+            return lambda: random.lognormvariate(mu, sigma)
+        if name == "exponential":
+            (mean,) = values
+            return lambda: random.expovariate(1 / mean)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec {spec!r} (e.g. fixed:0.2, uniform:0.1,0.5, lognormal:0.3,0.5)")
+
+
 class MockLLM:
     """Mock LLM for demonstration purposes."""
     
-    def __init__(self, model_name: str = "mock-gpt-3.5"):
+    def __init__(self, model_name: str = "mock-gpt-3.5", latency: str = "uniform:0.1,0.5", error_rate: float = 0.0):
+        """
+        Args:
+            model_name: Model name reported in the logs
+            latency: Simulated latency distribution (see latency_sampler)
+            error_rate: Fraction of calls that raise a simulated upstream error
+        """
         self.model_name = model_name
+        self.error_rate = error_rate
+        self._latency = latency_sampler(latency)
     
     def generate(self, prompt: str) -> tuple:
         """
@@ -24,7 +70,17 @@ class MockLLM:
             tuple: (response, tokens_used)
         """
         # Simulate API latency
-        time.sleep(random.uniform(0.1, 0.5))
+        time.sleep(self._latency())
+        return self._respond(prompt)
+    
+    async def agenerate(self, prompt: str) -> tuple:
+        """Async variant of generate() that sleeps without blocking the event loop."""
+        await asyncio.sleep(self._latency())
+        return self._respond(prompt)
+    
+    def _respond(self, prompt: str) -> tuple:
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("Simulated upstream error")
         
         # Mock responses based on prompt keywords
         if "capital" in prompt.lower():
@@ -45,9 +101,9 @@ class MockLLM:
 class LLMApplication:
     """Example application that uses LLM with comprehensive logging."""
     
-    def __init__(self):
-        self.llm = MockLLM()
-        self.logger = LLMLogger()
+    def __init__(self, logger: LLMLogger = None, llm: MockLLM = None):
+        self.llm = llm or MockLLM()
+        self.logger = logger or LLMLogger()
         self.session_id = str(uuid.uuid4())
     
     def chat(self, prompt: str, user_id: str = "demo_user") -> str:
@@ -61,46 +117,74 @@ class LLMApplication:
         Returns:
             str: LLM response
         """
-        start_time = datetime.utcnow()
+        start_ns = time.perf_counter_ns()
         
         try:
             # Generate response using LLM
             response, tokens_used = self.llm.generate(prompt)
-            
-            # Calculate latency
-            end_time = datetime.utcnow()
-            latency_ms = (end_time - start_time).total_seconds() * 1000
-            
-            # Log the successful interaction
-            self.logger.log_interaction(
-                prompt=prompt,
-                response=response,
-                model=self.llm.model_name,
-                user_id=user_id,
-                session_id=self.session_id,
-                tokens_used=tokens_used,
-                latency_ms=latency_ms,
-                success=True,
-                prompt_category=self._categorize_prompt(prompt)
-            )
-            
-            return response
-            
         except Exception as e:
             # Log any errors that occur
-            end_time = datetime.utcnow()
-            latency_ms = (end_time - start_time).total_seconds() * 1000
-            
-            self.logger.log_error(
-                error_message=str(e),
-                prompt=prompt,
-                error_type=type(e).__name__,
-                user_id=user_id,
-                session_id=self.session_id,
-                latency_ms=latency_ms
-            )
-            
+            self._log_error(e, prompt, user_id, start_ns)
+            raise
+        
+        # Log the successful interaction
+        self._log_success(prompt, response, tokens_used, user_id, start_ns)
+        return response
+    
+    async def achat(self, prompt: str, user_id: str = "demo_user") -> str:
+        """
+        Async variant of chat() for asyncio servers; works with LLMLogger and AsyncLLMLogger.
+        
+        AsyncLLMLogger is awaited on the event loop. A synchronous logger writes the file (or
+        waits for room in its queue) on the calling thread, so it runs in a worker thread.
+        """
+        start_ns = time.perf_counter_ns()
+        
+        try:
+            response, tokens_used = await self.llm.agenerate(prompt)
+        except Exception as e:
+            await self._alog(self.logger.log_error, self._error_fields(e, prompt, user_id, start_ns))
             raise
+        
+        await self._alog(self.logger.log_interaction,
+                         self._success_fields(prompt, response, tokens_used, user_id, start_ns))
+        return response
+    
+    @staticmethod
+    async def _alog(method: Callable, fields: dict) -> None:
+        if inspect.iscoroutinefunction(method):
+            await method(**fields)
+        else:
+            await asyncio.to_thread(method, **fields)
+    
+    def _log_success(self, prompt: str, response: str, tokens_used: int, user_id: str, start_ns: int):
+        return self.logger.log_interaction(**self._success_fields(prompt, response, tokens_used, user_id, start_ns))
+    
+    def _log_error(self, error: Exception, prompt: str, user_id: str, start_ns: int):
+        return self.logger.log_error(**self._error_fields(error, prompt, user_id, start_ns))
+    
+    def _success_fields(self, prompt: str, response: str, tokens_used: int, user_id: str, start_ns: int) -> dict:
+        return dict(
+            prompt=prompt,
+            response=response,
+            model=self.llm.model_name,
+            user_id=user_id,
+            session_id=self.session_id,
+            tokens_used=tokens_used,
+            latency_ms=(time.perf_counter_ns() - start_ns) / 1e6,
+            success=True,
+            prompt_category=self._categorize_prompt(prompt)
+        )
+    
+    def _error_fields(self, error: Exception, prompt: str, user_id: str, start_ns: int) -> dict:
+        return dict(
+            error_message=str(error),
+            prompt=prompt,
+            error_type=type(error).__name__,
+            user_id=user_id,
+            session_id=self.session_id,
+            latency_ms=(time.perf_counter_ns() - start_ns) / 1e6
+        )
     
     def _categorize_prompt(self, prompt: str) -> str:
         """Categorize the prompt for analytics."""
@@ -1,28 +1,577 @@
+import asyncio
+import atexit
+import functools
 import json
 import os
+import queue
 import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional
 from pathlib import Path
 
+from log_rotation import LogRotator
+from multiprocess_logs import worker_log_file
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional fast encoder
+    msgspec = None
+
+
+# What the background writer does when its queue is full:
+#   block  - the caller waits for space (no entries are lost)
+#   drop   - the new entry is discarded immediately
+#   sample - a 1-in-N sample of the overflow is kept (waiting for space), the rest is dropped
+BACKPRESSURE_POLICIES = ("block", "drop", "sample")
+
+ENCODERS = ("auto", "orjson", "msgspec", "json")
+
+_STOP = object()
+
+
+def get_encoder(name: str = "auto") -> Callable[[Dict[str, Any]], bytes]:
+    """
+    Return a function that serializes a log entry to UTF-8 JSON bytes (without newline).
+    
+    Args:
+        name: "orjson", "msgspec", "json" (stdlib) or "auto" for the fastest one installed
+    """
+    if name == "auto":
+        name = "orjson" if orjson is not None else "msgspec" if msgspec is not None else "json"
+    if name == "orjson":
+        if orjson is None:
+            raise ImportError("The orjson encoder requires: pip install orjson")
+        return orjson.dumps
+    if name == "msgspec":
+        if msgspec is None:
+            raise ImportError("The msgspec encoder requires: pip install msgspec")
+        return msgspec.json.Encoder().encode
+    if name == "json":
+        # json.dumps(..., ensure_ascii=False) builds a new JSONEncoder on every call; reuse one
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        return lambda entry: encode(entry).encode("utf-8")
+    raise ValueError(f"encoder must be one of {ENCODERS}, got {name!r}")
+
+
+class TimestampCache:
+    """
+    UTC ISO-8601 timestamps with the date/time part formatted once per second.
+    """
+    
+    __slots__ = ("_cached",)
+    
+    def __init__(self):
+        self._cached = (None, "")
+    
+    def now(self) -> str:
+        """Current UTC time as "YYYY-MM-DDTHH:MM:SS.ffffff"."""
+        t = time.time()
+        second = int(t)
+        cached_second, prefix = self._cached
+        if second != cached_second:
+            prefix = datetime.utcfromtimestamp(second).strftime("%Y-%m-%dT%H:%M:%S.")
+            # Single tuple assignment so concurrent callers never see a mismatched pair
+            self._cached = (second, prefix)
+        return f"{prefix}{int((t - second) * 1_000_000):06d}"
+
+
+_clock = TimestampCache()
+
+
+class InteractionRecord:
+    """
+    Fixed fields of an interaction entry.
+    
+    In async mode the record is queued as-is and only turned into a dict on the writer
+    thread, keeping the caller's work to a single small allocation.
+    """
+    
+    __slots__ = (
+        "timestamp", "prompt", "response", "model", "user_id",
+        "session_id", "tokens_used", "latency_ms", "extra",
+    )
+    
+    def __init__(
+        self,
+        timestamp: str,
+        prompt: str,
+        response: str,
+        model: Optional[str] = None,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        tokens_used: Optional[int] = None,
+        latency_ms: Optional[float] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ):
+        self.timestamp = timestamp
+        self.prompt = prompt
+        self.response = response
+        self.model = model
+        self.user_id = user_id
+        self.session_id = session_id
+        self.tokens_used = tokens_used
+        self.latency_ms = latency_ms
+        self.extra = extra
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the log entry, leaving out None values."""
+        entry = {"timestamp": self.timestamp}
+        if self.prompt is not None:
+            entry["prompt"] = self.prompt
+        if self.response is not None:
+            entry["response"] = self.response
+        if self.model is not None:
+            entry["model"] = self.model
+        if self.user_id is not None:
+            entry["user_id"] = self.user_id
+        if self.session_id is not None:
+            entry["session_id"] = self.session_id
+        if self.tokens_used is not None:
+            entry["tokens_used"] = self.tokens_used
+        if self.latency_ms is not None:
+            entry["latency_ms"] = self.latency_ms
+        if self.extra:
+            for key, value in self.extra.items():
+                if value is not None:
+                    entry[key] = value
+        return entry
+
+
+def _error_entry(
+    error_message: str,
+    prompt: Optional[str],
+    error_type: Optional[str],
+    additional_metadata: Dict[str, Any]
+) -> Dict[str, Any]:
+    log_entry = {
+        "timestamp": _clock.now(),
+        "event_type": "error",
+        "error_message": error_message,
+        "prompt": prompt,
+        "error_type": error_type,
+        **additional_metadata
+    }
+    
+    # Remove None values
+    return {k: v for k, v in log_entry.items() if v is not None}
+
+
+def _as_dict(entry: Any) -> Dict[str, Any]:
+    return entry.as_dict() if isinstance(entry, InteractionRecord) else entry
+
+
+class BackgroundWriter:
+    """
+    Bounded queue drained by a dedicated thread that writes log entries in batches.
+    """
+    
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], None],
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        backpressure: str = "block",
+        sample_rate: float = 0.1,
+        name: str = "llm-log-writer"
+    ):
+        """
+        Start the writer thread.
+        
+        Args:
+            write_batch: Callable that persists a list of entries (runs on the writer thread)
+            queue_size: Maximum number of entries waiting to be written
+            batch_size: Maximum number of entries written per batch
+            flush_interval: Maximum seconds an entry waits for its batch to fill up
+            backpressure: Policy applied when the queue is full (see BACKPRESSURE_POLICIES)
+            sample_rate: Fraction of overflow entries kept under the "sample" policy
+        """
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {BACKPRESSURE_POLICIES}, got {backpressure!r}")
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self._sample_every = max(1, round(1 / sample_rate))
+        self._write_batch = write_batch
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats_lock = threading.Lock()
+        self._overflow = 0
+        self._closed = False
+        
+        self.dropped_entries = 0
+        self.written_entries = 0
+        self.write_errors = 0
+        self.last_error: Optional[str] = None
+        
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of entries waiting to be written."""
+        return self._queue.qsize()
+    
+    def submit(self, entry: Dict[str, Any]) -> bool:
+        """
+        Enqueue an entry according to the backpressure policy.
+        
+        Returns:
+            bool: True if the entry was queued, False if it was dropped
+        """
+        if self._closed:
+            self._count_drop()
+            return False
+        
+        if self.backpressure == "block":
+            self._queue.put(entry)
+            return True
+        
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            pass
+        
+        if self.backpressure == "sample":
+            with self._stats_lock:
+                self._overflow += 1
+                keep = self._overflow % self._sample_every == 0
+            if keep:
+                self._queue.put(entry)
+                return True
+        
+        self._count_drop()
+        return False
+    
+    def offer(self, entry: Any) -> bool:
+        """
+        Enqueue an entry only if that is possible without waiting.
+        
+        Returns:
+            bool: True if the entry was queued; False if the queue is full or closed
+            (nothing is counted as dropped, the caller decides what to do)
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            return False
+    
+    def flush(self) -> None:
+        """Block until every entry queued so far has been written."""
+        self._queue.join()
+    
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting entries, drain the queue and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+    
+    def _count_drop(self) -> None:
+        with self._stats_lock:
+            self.dropped_entries += 1
+    
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            
+            try:
+                self._write_batch(batch)
+                self.written_entries += len(batch)
+            except Exception as e:
+                # Never let a disk error kill the writer thread
+                self.write_errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
 
 class LLMLogger:
     """
     Enhanced logger for LLM prompts and responses with thread safety and flexible output options.
     """
     
-    def __init__(self, log_file: str = "llm_logs.json", log_dir: str = "logs"):
+    def __init__(
+        self,
+        log_file: str = "llm_logs.json",
+        log_dir: str = "logs",
+        async_mode: bool = False,
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        backpressure: str = "block",
+        sample_rate: float = 0.1,
+        rotate_bytes: Optional[int] = None,
+        rotate_interval: Optional[str] = None,
+        compression: Optional[str] = "gzip",
+        retention_bytes: Optional[int] = None,
+        sinks: Optional[List[Any]] = None,
+        write_file: bool = True,
+        encoder: str = "auto",
+        policy: Optional[Any] = None,
+        per_process: bool = False
+    ):
         """
         Initialize the LLM logger.
         
         Args:
             log_file: Name of the log file
             log_dir: Directory to store log files
+            async_mode: Hand entries to a background writer thread instead of writing inline
+            queue_size: Maximum number of queued entries (async mode)
+            batch_size: Maximum number of entries written per batch (async mode)
+            flush_interval: Maximum seconds before a partial batch is written (async mode)
+            backpressure: "block", "drop" or "sample" when the queue is full (async mode)
+            sample_rate: Fraction of overflow entries kept by the "sample" policy (async mode)
+            rotate_bytes: Rotate the log file once it would exceed this many bytes
+            rotate_interval: Rotate the log file every "hour" or "day" (UTC)
+            compression: Compress rotated segments with "gzip", "zstd" or not at all (None)
+            retention_bytes: Delete the oldest rotated segments beyond this total size
+            sinks: Extra destinations with a write(entries) method, e.g. es_shipper.ElasticsearchSink
+                (requires async_mode, so retries and backoff never run on the caller's thread)
+            write_file: Set to False to only send entries to the sinks
+            encoder: JSON encoder: "auto" (orjson/msgspec when installed), "orjson", "msgspec" or "json"
+            policy: log_policies.LogPolicy applied to each entry before it is written
+            per_process: Write to a per-process file (llm_logs.<host>-<pid>.json) so several
+                worker processes never append to the same file; see multiprocess_logs
         """
+        if sinks and not async_mode:
+            # A sink may block for a long time (ElasticsearchSink retries for ~15 s during an
+            # outage); inline, that would stall every request thread that logs
+            raise ValueError("sinks require async_mode=True")
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
-        self.log_file = self.log_dir / log_file
+        self.shared_log_file = self.log_dir / log_file
+        self.log_file = worker_log_file(self.shared_log_file) if per_process else self.shared_log_file
+        self.per_process = per_process
         self._lock = threading.Lock()
+        self.sinks = list(sinks or [])
+        self.write_file = write_file
+        self._encode = get_encoder(encoder)
+        self.policy = policy
+        self._handle = None
+        self._writer = None
+        self._rotator = None
+        
+        self._rotation_options = None
+        self._writer_options = None
+        
+        if rotate_bytes is not None or rotate_interval is not None:
+            self._rotation_options = dict(
+                max_bytes=rotate_bytes,
+                interval=rotate_interval,
+                compression=compression,
+                retention_bytes=retention_bytes
+            )
+            self._rotator = LogRotator(self.log_file, **self._rotation_options)
+        
+        if async_mode:
+            self._writer_options = dict(
+                queue_size=queue_size,
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+                backpressure=backpressure,
+                sample_rate=sample_rate
+            )
+            self._writer = BackgroundWriter(self._write_batch, **self._writer_options)
+            atexit.register(self.close)
+        
+        if per_process and hasattr(os, "register_at_fork"):
+            # gunicorn --preload creates the logger before forking workers
+            os.register_at_fork(after_in_child=self._after_fork)
+    
+    @property
+    def async_mode(self) -> bool:
+        """Whether entries are written by a background thread."""
+        return self._writer is not None
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of entries waiting for the background writer (0 in sync mode)."""
+        return self._writer.queue_depth if self._writer else 0
+    
+    @property
+    def dropped_entries(self) -> int:
+        """Number of entries discarded by the backpressure policy (0 in sync mode)."""
+        return self._writer.dropped_entries if self._writer else 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return writer statistics for monitoring."""
+        stats: Dict[str, Any] = {"async_mode": self._writer is not None}
+        if self.policy is not None:
+            stats["policy"] = self.policy.stats()
+        if self.sinks:
+            stats["sinks"] = [sink.stats() for sink in self.sinks if hasattr(sink, "stats")]
+        if self._writer is None:
+            return stats
+        return {
+            **stats,
+            "backpressure": self._writer.backpressure,
+            "queue_depth": self._writer.queue_depth,
+            "dropped_entries": self._writer.dropped_entries,
+            "written_entries": self._writer.written_entries,
+            "write_errors": self._writer.write_errors,
+            "last_error": self._writer.last_error,
+        }
+    
+    def flush(self) -> None:
+        """Wait until all queued entries are on disk (no-op in sync mode)."""
+        if self._writer is not None:
+            self._writer.flush()
+    
+    def rotate(self) -> Optional[Path]:
+        """
+        Force a rotation of the log file (requires rotate_bytes or rotate_interval).
+        
+        Returns:
+            Path: The new segment, or None if the log file was empty
+        """
+        if self._rotator is None:
+            raise RuntimeError("Rotation is not enabled for this logger")
+        self.flush()
+        with self._lock:
+            return self._rotate()
+    
+    def segments(self) -> List[Dict[str, Any]]:
+        """Return the manifest of rotated segments, oldest first."""
+        return self._rotator.segments() if self._rotator else []
+    
+    def close(self) -> None:
+        """Drain the background writer and close the log file. Safe to call more than once."""
+        if self._writer is not None:
+            self._writer.close()
+        with self._lock:
+            self._close_handle()
+        if self._rotator is not None:
+            self._rotator.close()
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+    
+    def _emit(self, log_entry: Any) -> None:
+        """Write an entry (dict or InteractionRecord) inline or hand it to the background writer."""
+        if self._writer is not None:
+            self._writer.submit(log_entry)
+            return
+        self._write_batch([log_entry])
+    
+    def _write_batch(self, entries: List[Any]) -> None:
+        """Serialize and append a batch (inline in sync mode, through a long-lived handle on the writer thread)."""
+        entries = [_as_dict(entry) for entry in entries]
+        try:
+            if self.policy is not None:
+                # The policy runs under the same lock as the append: deduplication decides which
+                # entry carries a text, so that must be the order the entries reach the file
+                with self._lock:
+                    entries = self._apply_policy(entries)
+                    if self.write_file:
+                        encode = self._encode
+                        self._append(b"".join([encode(entry) + b"\n" for entry in entries]), entries)
+            elif self.write_file:
+                encode = self._encode
+                data = b"".join([encode(entry) + b"\n" for entry in entries])
+                with self._lock:
+                    self._append(data, entries)
+        finally:
+            for sink in self.sinks:
+                sink.write(entries)
+    
+    def _apply_policy(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply the policy to entries about to be appended. Caller holds the lock."""
+        if self._dedup and self._rotator is not None and self._rotator.should_rotate(0):
+            # Rotate before deduplicating, so no entry in the new file refers to a text that was
+            # written to the previous segment (the batch may take the file past rotate_bytes)
+            self._rotate()
+        return [self.policy.apply(entry) for entry in entries]
+    
+    @property
+    def _dedup(self) -> bool:
+        return self.policy is not None and self.policy.dedup
+    
+    def _rotate(self) -> Optional[Path]:
+        """Rotate the hot file. Caller holds the lock."""
+        self._close_handle()
+        segment = self._rotator.rotate()
+        if self._dedup:
+            # Every file then holds the first occurrence of each text it refers to, so a segment
+            # can be expanded on its own and retention can delete old ones without losing texts
+            self.policy.reset_dedup()
+        return segment
+    
+    def _append(self, data: bytes, entries: List[Dict[str, Any]]) -> None:
+        """Append serialized entries to the log file, rotating first if needed. Caller holds the lock."""
+        # With deduplication, _apply_policy already rotated if needed
+        if self._rotator is not None and not self._dedup and self._rotator.should_rotate(len(data)):
+            self._rotate()
+        
+        if self._writer is None:
+            with open(self.log_file, "ab") as f:
+                f.write(data)
+        else:
+            if self._handle is None:
+                self._handle = open(self.log_file, "ab")
+            self._handle.write(data)
+            self._handle.flush()
+        
+        if self._rotator is not None:
+            self._rotator.record(
+                len(data),
+                len(entries),
+                entries[0].get("timestamp"),
+                entries[-1].get("timestamp")
+            )
+    
+    def _after_fork(self) -> None:
+        """Give a forked worker its own file, lock, rotator and writer thread."""
+        # Threads do not survive fork and the parent's lock may have been held
+        self._lock = threading.Lock()
+        self._handle = None
+        self.log_file = worker_log_file(self.shared_log_file)
+        if self._rotation_options is not None:
+            self._rotator = LogRotator(self.log_file, **self._rotation_options)
+        if self._dedup:
+            # The worker's file must not refer to texts written to the parent's file
+            self.policy.reset_dedup()
+        if self._writer_options is not None:
+            # Entries queued before the fork are written by the parent
+            self._writer = BackgroundWriter(self._write_batch, **self._writer_options)
+    
+    def _close_handle(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
     
     def log_interaction(
         self,
@@ -48,24 +597,18 @@ class LLMLogger:
             latency_ms: Response latency in milliseconds
             **additional_metadata: Any additional metadata to log
         """
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "prompt": prompt,
-            "response": response,
-            "model": model,
-            "user_id": user_id,
-            "session_id": session_id,
-            "tokens_used": tokens_used,
-            "latency_ms": latency_ms,
-            **additional_metadata
-        }
-        
-        # Remove None values to keep logs clean
-        log_entry = {k: v for k, v in log_entry.items() if v is not None}
-        
-        with self._lock:
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+        # None values are left out when the record becomes a dict
+        self._emit(InteractionRecord(
+            _clock.now(),
+            prompt,
+            response,
+            model,
+            user_id,
+            session_id,
+            tokens_used,
+            latency_ms,
+            additional_metadata
+        ))
     
     def log_error(
         self,
@@ -83,21 +626,88 @@ class LLMLogger:
             error_type: Type/category of the error
             **additional_metadata: Any additional metadata to log
         """
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "event_type": "error",
-            "error_message": error_message,
-            "prompt": prompt,
-            "error_type": error_type,
-            **additional_metadata
-        }
-        
-        # Remove None values
-        log_entry = {k: v for k, v in log_entry.items() if v is not None}
+        self._emit(_error_entry(error_message, prompt, error_type, additional_metadata))
+
+
+class AsyncLLMLogger(LLMLogger):
+    """
+    LLMLogger for asyncio applications: logging methods are coroutines that never block the event loop.
+    
+    Entries always go through the background writer thread, so file and sink I/O happen off
+    the loop. Enqueueing is non-blocking; when the queue is full, "drop" discards the entry
+    right away while "block" and "sample" wait for space on a worker thread, not on the loop.
+    
+    Example:
+        logger = AsyncLLMLogger(backpressure="drop")
         
-        with self._lock:
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+        @app.post("/chat")
+        async def chat(request: ChatRequest):
+            async with LLMTimer(request.prompt, logger=logger, model="gpt-4") as timer:
+                timer.set_response(await call_llm(request.prompt))
+    """
+    
+    def __init__(self, log_file: str = "llm_logs.json", log_dir: str = "logs", **options):
+        """
+        Initialize the logger; accepts the same options as LLMLogger (async_mode is implied).
+        """
+        super().__init__(log_file, log_dir, async_mode=True, **options)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+    
+    async def aflush(self) -> None:
+        """Wait until every entry queued so far has been written, without blocking the loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+    
+    async def aclose(self) -> None:
+        """Drain the writer and close files and sinks, without blocking the loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+    
+    async def _aemit(self, log_entry: Any) -> bool:
+        writer = self._writer
+        if writer.offer(log_entry):
+            return True
+        if writer.backpressure == "drop":
+            return writer.submit(log_entry)
+        # Queue full: wait for space on a worker thread instead of the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, writer.submit, log_entry)
+    
+    async def log_interaction(
+        self,
+        prompt: str,
+        response: str,
+        model: Optional[str] = None,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        tokens_used: Optional[int] = None,
+        latency_ms: Optional[float] = None,
+        **additional_metadata
+    ) -> None:
+        """Log an LLM interaction (see LLMLogger.log_interaction)."""
+        await self._aemit(InteractionRecord(
+            _clock.now(),
+            prompt,
+            response,
+            model,
+            user_id,
+            session_id,
+            tokens_used,
+            latency_ms,
+            additional_metadata
+        ))
+    
+    async def log_error(
+        self,
+        error_message: str,
+        prompt: Optional[str] = None,
+        error_type: Optional[str] = None,
+        **additional_metadata
+    ) -> None:
+        """Log an error that occurred during LLM interaction (see LLMLogger.log_error)."""
+        await self._aemit(_error_entry(error_message, prompt, error_type, additional_metadata))
 
 
 # Legacy function for backward compatibility
@@ -151,46 +761,97 @@ def log_llm_error(
 
 # Context manager for timing LLM calls
 class LLMTimer:
-    """Context manager to automatically time and log LLM interactions."""
+    """
+    Context manager to automatically time and log LLM interactions.
+    
+    Use "with" for LLMLogger and "async with" in async code (required for AsyncLLMLogger).
+    For streaming responses, call add_chunk() for every chunk (or mark_first_token() once)
+    so the entry also carries time_to_first_token_ms.
+    """
     
     def __init__(self, prompt: str, logger: LLMLogger = None, **metadata):
         self.prompt = prompt
         self.logger = logger or default_logger
         self.metadata = metadata
-        self.start_time = None
+        self.start_ns = None
+        self.first_token_ns = None
         self.response = None
+        self._chunks: List[str] = []
     
     def __enter__(self):
-        self.start_time = datetime.utcnow()
+        if isinstance(self.logger, AsyncLLMLogger):
+            raise TypeError("AsyncLLMLogger requires 'async with LLMTimer(...)'")
+        self.start_ns = time.perf_counter_ns()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        end_time = datetime.utcnow()
-        latency_ms = (end_time - self.start_time).total_seconds() * 1000
+        log, kwargs = self._finish(exc_type, exc_val)
+        if log is not None:
+            log(**kwargs)
+    
+    async def __aenter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        log, kwargs = self._finish(exc_type, exc_val)
+        if log is None:
+            return
+        if isinstance(self.logger, AsyncLLMLogger):
+            await log(**kwargs)
+        else:
+            # A plain LLMLogger may write the file inline; keep that off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, functools.partial(log, **kwargs))
+    
+    def _finish(self, exc_type, exc_val):
+        """Compute latencies and return the logger method and arguments for this call."""
+        end_ns = time.perf_counter_ns()
+        metadata = dict(self.metadata)
+        metadata["latency_ms"] = (end_ns - self.start_ns) / 1e6
+        if self.first_token_ns is not None:
+            metadata["time_to_first_token_ms"] = (self.first_token_ns - self.start_ns) / 1e6
         
         if exc_type is not None:
             # An exception occurred
-            self.logger.log_error(
+            return self.logger.log_error, dict(
                 error_message=str(exc_val),
                 prompt=self.prompt,
                 error_type=exc_type.__name__,
-                latency_ms=latency_ms,
-                **self.metadata
+                **metadata
             )
-        elif self.response is not None:
+        if self.response is None and self._chunks:
+            self.response = "".join(self._chunks)
+        if self.response is not None:
             # Successful interaction
-            self.logger.log_interaction(
+            return self.logger.log_interaction, dict(
                 prompt=self.prompt,
                 response=self.response,
-                latency_ms=latency_ms,
-                **self.metadata
+                **metadata
             )
+        return None, None
+    
+    @property
+    def latency_ms(self) -> Optional[float]:
+        """Milliseconds elapsed since the timer started."""
+        if self.start_ns is None:
+            return None
+        return (time.perf_counter_ns() - self.start_ns) / 1e6
+    
+    def mark_first_token(self) -> None:
+        """Record the arrival of the first streamed token (later calls are ignored)."""
+        if self.first_token_ns is None:
+            self.first_token_ns = time.perf_counter_ns()
+    
+    def add_chunk(self, chunk: str) -> None:
+        """Append a streamed chunk to the response, marking the first token on the first non-empty chunk."""
+        if chunk:
+            self.mark_first_token()
+            self._chunks.append(chunk)
     
     def set_response(self, response: str):
         """Set the response received from the LLM."""
         self.response = response
 
-
 if __name__ == "__main__":
     # Example usage
     logger = LLMLogger()
@@ -0,0 +1,491 @@
+"""
+Load generator and benchmark harness for example_app.LLMApplication.
+
+Drives LLMApplication.chat (or achat in asyncio mode) against MockLLM with a configurable
+latency distribution, either closed-loop (a fixed number of concurrent callers) or
+open-loop at a target request rate, and reports:
+
+  throughput        completed requests per second
+  latency           p50/p90/p95/p99/max per request (open-loop latencies are measured from
+                    the scheduled start, so queueing delay is included)
+  logger overhead   time the request spends inside log_interaction/log_error
+  lock contention   acquisitions of the logger's file lock that had to wait, and for how long
+
+    python loadgen.py --mode thread --concurrency 32 --duration 10
+    python loadgen.py --mode asyncio --rps 500 --logger async --latency lognormal:0.2,0.5
+    python loadgen.py --mode process --processes 4 --concurrency 32 --json --output run.json
+    python loadgen.py --mode thread --concurrency 32 --baseline run.json   # exit 1 on regression
+"""
+
+import argparse
+import asyncio
+import functools
+import inspect
+import itertools
+import json
+import multiprocessing
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from example_app import LLMApplication, MockLLM
+from llm_logger import AsyncLLMLogger, LLMLogger
+
+PROMPTS = [
+    "What is the capital of Japan?",
+    "How's the weather today?",
+    "Write a Python function to sort a list",
+    "Explain quantum computing",
+    "What are the benefits of renewable energy?",
+    "Show me a JavaScript example",
+    "What is the capital of Brazil?",
+    "Tell me about machine learning",
+    "How do I debug Python code?",
+    "What's the current temperature?",
+]
+USERS = ["user1", "user2", "user3", "demo_user"]
+
+# Metrics compared against --baseline and whether higher values are better
+REGRESSION_METRICS = {
+    "throughput_rps": True,
+    "latency_ms.p99": False,
+    "logger_overhead_us.mean": False,
+}
+
+
+class ContentionLock:
+    """
+    Drop-in for the logger's threading.Lock that counts contended acquisitions.
+
+    Counters are only updated while the lock is held, so they need no extra locking.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_ns = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            self.acquisitions += 1
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter_ns()
+        if not self._lock.acquire(True, timeout):
+            return False
+        self.acquisitions += 1
+        self.contended += 1
+        self.wait_ns += time.perf_counter_ns() - start
+        return True
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"acquisitions": self.acquisitions, "contended": self.contended, "wait_ns": self.wait_ns}
+
+
+class TimedLogger:
+    """Proxy recording how long each log_interaction/log_error call takes the caller."""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.samples: List[int] = []
+        # Coroutine methods (AsyncLLMLogger) stay coroutine functions, so LLMApplication.achat
+        # still awaits them on the loop and hands synchronous loggers to a thread
+        timed = self._timed_async if inspect.iscoroutinefunction(logger.log_interaction) else self._timed
+        self.log_interaction = functools.partial(timed, logger.log_interaction)
+        self.log_error = functools.partial(timed, logger.log_error)
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter_ns()
+        result = method(*args, **kwargs)
+        self.samples.append(time.perf_counter_ns() - start)
+        return result
+
+    async def _timed_async(self, method, *args, **kwargs):
+        start = time.perf_counter_ns()
+        result = await method(*args, **kwargs)
+        self.samples.append(time.perf_counter_ns() - start)
+        return result
+
+
+class NullLogger:
+    """Logger that discards everything, to measure the application without logging."""
+
+    def log_interaction(self, *args, **kwargs) -> None:
+        pass
+
+    def log_error(self, *args, **kwargs) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+def make_logger(args, log_dir: str, per_process: bool = False):
+    if args.logger == "none":
+        return NullLogger()
+    options = dict(log_dir=log_dir, per_process=per_process, backpressure=args.backpressure)
+    if args.logger == "async" and args.mode == "asyncio":
+        return AsyncLLMLogger(**options)
+    return LLMLogger(async_mode=args.logger == "async", **options)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(values_ns: List[int], scale: float) -> Dict[str, float]:
+    values = sorted(v / scale for v in values_ns)
+    if not values:
+        return {}
+    return {
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p90": round(percentile(values, 90), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(values[-1], 3),
+    }
+
+
+class Recorder:
+    """Collects per-request results from worker threads."""
+
+    def __init__(self):
+        self.latencies: List[int] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency_ns: int, ok: bool) -> None:
+        with self._lock:
+            self.latencies.append(latency_ns)
+            if not ok:
+                self.errors += 1
+
+
+def _next_request(counter, args, stop_at: float) -> Optional[int]:
+    n = next(counter)
+    if args.requests is not None and n >= args.requests:
+        return None
+    if time.perf_counter() >= stop_at:
+        return None
+    return n
+
+
+def _call(app: LLMApplication, n: int) -> bool:
+    try:
+        app.chat(PROMPTS[n % len(PROMPTS)], user_id=USERS[n % len(USERS)])
+        return True
+    except Exception:
+        return False
+
+
+def run_threads(app: LLMApplication, args, recorder: Recorder) -> None:
+    """
+    Closed loop: `concurrency` threads each send the next request when the last finishes.
+    Open loop (--rps): requests are released on schedule into a pool of `concurrency` threads.
+    """
+    counter = itertools.count()
+    start = time.perf_counter()
+    stop_at = start + args.duration
+
+    if args.rps is None:
+        def caller():
+            while True:
+                n = _next_request(counter, args, stop_at)
+                if n is None:
+                    return
+                t0 = time.perf_counter_ns()
+                ok = _call(app, n)
+                recorder.record(time.perf_counter_ns() - t0, ok)
+
+        threads = [threading.Thread(target=caller) for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return
+
+    def scheduled(n: int, intended_ns: int) -> None:
+        ok = _call(app, n)
+        recorder.record(time.perf_counter_ns() - intended_ns, ok)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        start_ns = time.perf_counter_ns()
+        interval_ns = int(1e9 / args.rps)
+        while True:
+            n = _next_request(counter, args, stop_at)
+            if n is None:
+                break
+            intended_ns = start_ns + n * interval_ns
+            delay = (intended_ns - time.perf_counter_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(scheduled, n, intended_ns)
+
+
+async def run_asyncio(app: LLMApplication, args, recorder: Recorder) -> None:
+    """Same load models as run_threads, with tasks calling LLMApplication.achat."""
+    counter = itertools.count()
+    stop_at = time.perf_counter() + args.duration
+
+    async def call(n: int, started_ns: int, limit: Optional[asyncio.Semaphore] = None) -> None:
+        ok = True
+        try:
+            if limit is None:
+                await app.achat(PROMPTS[n % len(PROMPTS)], user_id=USERS[n % len(USERS)])
+            else:
+                async with limit:
+                    await app.achat(PROMPTS[n % len(PROMPTS)], user_id=USERS[n % len(USERS)])
+        except Exception:
+            ok = False
+        recorder.record(time.perf_counter_ns() - started_ns, ok)
+
+    if args.rps is None:
+        async def caller():
+            while True:
+                n = _next_request(counter, args, stop_at)
+                if n is None:
+                    return
+                await call(n, time.perf_counter_ns())
+
+        await asyncio.gather(*(caller() for _ in range(args.concurrency)))
+        return
+
+    limit = asyncio.Semaphore(args.concurrency)
+    tasks = []
+    start_ns = time.perf_counter_ns()
+    interval_ns = int(1e9 / args.rps)
+    while True:
+        n = _next_request(counter, args, stop_at)
+        if n is None:
+            break
+        intended_ns = start_ns + n * interval_ns
+        delay = (intended_ns - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(call(n, intended_ns, limit)))
+    await asyncio.gather(*tasks)
+
+
+def run_worker(args, log_dir: str) -> Dict[str, Any]:
+    """Run the load in this process and return raw measurements."""
+    logger = make_logger(args, log_dir, per_process=args.mode == "process")
+    lock = None
+    if isinstance(logger, LLMLogger):
+        lock = logger._lock = ContentionLock()
+    timed = TimedLogger(logger)
+    app = LLMApplication(logger=timed, llm=MockLLM(latency=args.latency, error_rate=args.error_rate))
+    recorder = Recorder()
+
+    start = time.perf_counter()
+    if args.mode == "asyncio":
+        asyncio.run(run_asyncio(app, args, recorder))
+    else:
+        run_threads(app, args, recorder)
+    elapsed = time.perf_counter() - start
+
+    stats = logger.stats()
+    drain_start = time.perf_counter()
+    if isinstance(logger, AsyncLLMLogger):
+        asyncio.run(logger.aclose())
+    else:
+        logger.close()
+    return {
+        "seconds": elapsed,
+        "drain_seconds": time.perf_counter() - drain_start,
+        "latencies": recorder.latencies,
+        "errors": recorder.errors,
+        "overhead": timed.samples,
+        "lock": lock.stats() if lock else None,
+        "logger": stats,
+    }
+
+
+def _process_worker(payload) -> Dict[str, Any]:
+    args, log_dir = payload
+    return run_worker(args, log_dir)
+
+
+def run(args) -> Dict[str, Any]:
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix="loadgen_logs_")
+    try:
+        if args.mode == "process":
+            share = argparse.Namespace(**vars(args))
+            share.concurrency = max(1, args.concurrency // args.processes)
+            share.rps = args.rps / args.processes if args.rps else None
+            share.requests = -(-args.requests // args.processes) if args.requests else None
+            with multiprocessing.get_context("fork").Pool(args.processes) as pool:
+                parts = pool.map(_process_worker, [(share, log_dir)] * args.processes)
+        else:
+            parts = [run_worker(args, log_dir)]
+    finally:
+        if not args.log_dir:
+            shutil.rmtree(log_dir, ignore_errors=True)
+    return report(args, parts)
+
+
+def report(args, parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = [v for part in parts for v in part["latencies"]]
+    overhead = [v for part in parts for v in part["overhead"]]
+    seconds = max(part["seconds"] for part in parts)
+    locks = [part["lock"] for part in parts if part["lock"]]
+
+    result: Dict[str, Any] = {
+        "config": {
+            **{k: v for k, v in vars(args).items() if k not in ("json", "output", "baseline")},
+            "python": platform.python_version(),
+            "git_rev": git_revision(),
+            "started_at": datetime.utcnow().isoformat(),
+        },
+        "requests": len(latencies),
+        "errors": sum(part["errors"] for part in parts),
+        "seconds": round(seconds, 3),
+        "drain_seconds": round(max(part["drain_seconds"] for part in parts), 3),
+        "throughput_rps": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "latency_ms": summarize(latencies, 1e6),
+        "logger_overhead_us": summarize(overhead, 1e3),
+        "logger": [part["logger"] for part in parts],
+    }
+    if latencies and overhead:
+        result["logger_overhead_us"]["share_of_latency"] = round(sum(overhead) / sum(latencies), 5)
+    if locks:
+        acquisitions = sum(lock["acquisitions"] for lock in locks)
+        contended = sum(lock["contended"] for lock in locks)
+        wait_ns = sum(lock["wait_ns"] for lock in locks)
+        result["lock"] = {
+            "acquisitions": acquisitions,
+            "contended": contended,
+            "contention_ratio": round(contended / acquisitions, 4) if acquisitions else 0.0,
+            "wait_ms_total": round(wait_ns / 1e6, 3),
+            "wait_us_per_acquisition": round(wait_ns / 1e3 / acquisitions, 3) if acquisitions else 0.0,
+        }
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metric(result: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = result
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(
+    result: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    metrics: Optional[Dict[str, bool]] = None
+) -> List[str]:
+    """Return a description of every metric that is worse than the baseline beyond the tolerance."""
+    regressions = []
+    for path, higher_is_better in (metrics or REGRESSION_METRICS).items():
+        current, previous = _metric(result, path), _metric(baseline, path)
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{path}: {previous} -> {current} ({change:+.1%})")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    config = result["config"]
+    load = f"{config['rps']} rps" if config["rps"] else f"concurrency {config['concurrency']}"
+    print(f"📊 {config['mode']} mode, {load}, logger={config['logger']}, latency={config['latency']}")
+    print(f"  {result['requests']} requests ({result['errors']} errors) in {result['seconds']}s "
+          f"-> {result['throughput_rps']} req/s")
+    latency = result["latency_ms"]
+    if latency:
+        print(f"  latency ms    p50 {latency['p50']:.1f}  p90 {latency['p90']:.1f}  p95 {latency['p95']:.1f}  "
+              f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    overhead = result["logger_overhead_us"]
+    if overhead:
+        print(f"  logger us     mean {overhead['mean']:.1f}  p50 {overhead['p50']:.1f}  p99 {overhead['p99']:.1f}  "
+              f"max {overhead['max']:.1f}  ({overhead.get('share_of_latency', 0):.2%} of latency)")
+    lock = result.get("lock")
+    if lock:
+        print(f"  lock          {lock['contended']}/{lock['acquisitions']} contended "
+              f"({lock['contention_ratio']:.2%}), {lock['wait_ms_total']:.1f}ms waiting")
+    print(f"  drain         {result['drain_seconds']}s to flush the logger after the run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLMApplication.chat and its logging under load")
+    parser.add_argument("--mode", choices=["thread", "process", "asyncio"], default="thread")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent callers (closed loop) or pool size (open loop)")
+    parser.add_argument("--rps", type=float, default=None, help="Target request rate (open loop); omit for closed loop")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to generate load")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(), help="Worker processes (process mode)")
+    parser.add_argument("--latency", default="uniform:0.1,0.5", help="MockLLM latency distribution, e.g. fixed:0.05")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of MockLLM calls that fail")
+    parser.add_argument("--logger", choices=["sync", "async", "none"], default="sync")
+    parser.add_argument("--backpressure", choices=["block", "drop", "sample"], default="block")
+    parser.add_argument("--log-dir", default=None, help="Keep the logs here (default: temporary directory)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression vs. the baseline")
+    args = parser.parse_args()
+
+    result = run(args)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+        if args.baseline:
+            print("❌ Regressions vs. baseline:" if regressions else "✅ No regressions vs. baseline")
+            for line in regressions:
+                print(f"   {line}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,576 @@
+"""
+Indexed queries over the JSONL interaction logs without the ELK stack.
+
+Each log segment (the hot llm_logs.json plus every rotated segment listed in the
+manifest, and the same for each per-worker file of LLMLogger(per_process=True)) gets a sidecar index under logs/.index/<segment>/: one binary column per
+indexed field plus a meta.json holding the dictionaries for string fields and the
+number of bytes already indexed. Lines are parsed once, when they are first indexed;
+filters and aggregations afterwards only touch the columns. Appends to the hot file
+are picked up incrementally by refresh().
+
+Example:
+    from log_index import LogIndex
+
+    index = LogIndex("logs")
+    index.latency_percentiles(by=("model",))
+    index.sum("tokens_used", by=("model", "hour"), start="2025-10-11T00:00:00")
+    for entry in index.scan(user_id="user3", prompt_category="coding"):
+        print(entry["prompt"])
+"""
+
+import json
+import math
+import mmap
+import os
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from log_rotation import open_segment, read_manifest
+from multiprocess_logs import worker_files
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, speeds up filters and aggregations
+    np = None
+
+
+# String fields stored as dictionary codes (0 means "missing")
+DICT_FIELDS = ("user_id", "session_id", "model", "prompt_category")
+
+# Numeric columns: name -> array typecode (also understood by numpy)
+NUMERIC_COLUMNS = {
+    "offset": "Q",
+    "ts": "d",
+    "latency_ms": "d",
+    "tokens_used": "q",
+    "is_error": "B",
+}
+
+TIME_BUCKETS = {
+    "hour": 3600,
+    "day": 86400,
+}
+
+TimeBound = Optional[Union[str, datetime, float]]
+
+
+def _to_epoch(value: TimeBound) -> Optional[float]:
+    """Convert an ISO string, naive UTC datetime or epoch seconds to epoch seconds."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _bucket_label(ts: float, bucket: str) -> Optional[str]:
+    if math.isnan(ts):
+        return None
+    start = datetime.fromtimestamp(ts - ts % TIME_BUCKETS[bucket], tz=timezone.utc)
+    return start.strftime("%Y-%m-%dT%H:00" if bucket == "hour" else "%Y-%m-%d")
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted sequence (numpy's default method)."""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class SegmentIndex:
+    """
+    Column index for a single log segment, stored in a sidecar directory.
+    """
+
+    def __init__(self, segment: Path, index_dir: Path):
+        """
+        Args:
+            segment: Path of the log segment (plain, .gz or .zst)
+            index_dir: Sidecar directory holding this segment's columns
+        """
+        self.segment = Path(segment)
+        self.index_dir = Path(index_dir)
+        self.compressed = self.segment.suffix in (".gz", ".zst")
+        self.indexed_bytes = 0
+        self.rows = 0
+        self.dicts: Dict[str, List[Optional[str]]] = {field: [None] for field in DICT_FIELDS}
+        self._codes: Dict[str, Dict[str, int]] = {field: {} for field in DICT_FIELDS}
+        self.columns: Dict[str, array] = {}
+        self._np_columns: Optional[Dict[str, Any]] = None
+        self._identity: Optional[List[int]] = None
+        self._load()
+
+    def refresh(self) -> int:
+        """
+        Index any lines appended since the last refresh.
+
+        Returns:
+            int: Number of newly indexed rows
+        """
+        if not self.segment.exists():
+            return 0
+        stat = self.segment.stat()
+        identity = [stat.st_dev, stat.st_ino]
+        truncated = not self.compressed and stat.st_size < self.indexed_bytes
+        if self._identity != identity or truncated:
+            # The file was replaced or truncated: start over
+            self._reset()
+            self._identity = identity
+        if stat.st_size == self.indexed_bytes or (self.compressed and self.indexed_bytes):
+            return 0
+
+        new_columns = {name: array(typecode) for name, typecode in NUMERIC_COLUMNS.items()}
+        new_columns.update({field: array("I") for field in DICT_FIELDS})
+
+        if self.compressed:
+            with open_segment(self.segment) as f:
+                consumed = self._parse(f.read(), 0, new_columns)
+        else:
+            with open(self.segment, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    consumed = self._parse(data, self.indexed_bytes, new_columns)
+
+        added = len(new_columns["offset"])
+        if consumed == self.indexed_bytes:
+            return 0
+        self._np_columns = None
+        self._append_columns(new_columns)
+        self.indexed_bytes = consumed
+        self.rows += added
+        self._write_meta()
+        return added
+
+    def arrays(self) -> Dict[str, Any]:
+        """Return the columns, as zero-copy NumPy arrays when NumPy is installed."""
+        if np is None:
+            return self.columns
+        if self._np_columns is None:
+            self._np_columns = {
+                name: np.frombuffer(column, dtype=column.typecode) if len(column) else np.empty(0, dtype=column.typecode)
+                for name, column in self.columns.items()
+            }
+        return self._np_columns
+
+    def read_lines(self, rows: Sequence[int]) -> Iterator[Dict[str, Any]]:
+        """Parse the log lines for the given row numbers (ascending)."""
+        if not len(rows):
+            return
+        offsets = self.columns["offset"]
+        if self.compressed:
+            with open_segment(self.segment) as f:
+                data = f.read()
+            for row in rows:
+                start = offsets[row]
+                stop = data.find(b"\n", start)
+                yield json.loads(data[start:stop if stop != -1 else len(data)])
+            return
+        with open(self.segment, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for row in rows:
+                    start = offsets[row]
+                    yield json.loads(data[start:data.find(b"\n", start)])
+
+    def _parse(self, data, start: int, columns: Dict[str, array]) -> int:
+        """Parse complete lines from data[start:] into columns; return the new indexed byte count."""
+        end = data.rfind(b"\n", start) + 1 if not self.compressed else len(data)
+        position = start
+        while position < end:
+            newline = data.find(b"\n", position, end)
+            if newline == -1:
+                newline = end
+            line = data[position:newline]
+            if line.strip():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if isinstance(entry, dict):
+                    self._add_row(entry, position, columns)
+            position = newline + 1
+        return max(end, start)
+
+    def _add_row(self, entry: Dict[str, Any], offset: int, columns: Dict[str, array]) -> None:
+        try:
+            ts = _to_epoch(entry.get("timestamp")) if entry.get("timestamp") else math.nan
+        except ValueError:
+            ts = math.nan
+        latency = entry.get("latency_ms")
+        tokens = entry.get("tokens_used")
+
+        columns["offset"].append(offset)
+        columns["ts"].append(ts)
+        columns["latency_ms"].append(float(latency) if isinstance(latency, (int, float)) else math.nan)
+        columns["tokens_used"].append(int(tokens) if isinstance(tokens, (int, float)) else -1)
+        columns["is_error"].append(1 if entry.get("event_type") == "error" else 0)
+        for field in DICT_FIELDS:
+            columns[field].append(self._code(field, entry.get(field)))
+
+    def _code(self, field: str, value: Any) -> int:
+        if value is None:
+            return 0
+        value = str(value)
+        code = self._codes[field].get(value)
+        if code is None:
+            code = len(self.dicts[field])
+            self.dicts[field].append(value)
+            self._codes[field][value] = code
+        return code
+
+    def _append_columns(self, new_columns: Dict[str, array]) -> None:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        for name, column in new_columns.items():
+            with open(self.index_dir / f"{name}.bin", "ab") as f:
+                column.tofile(f)
+            try:
+                self.columns[name].extend(column)
+            except BufferError:
+                # A NumPy view handed out by arrays() is still alive; grow a copy instead
+                self.columns[name] = array(column.typecode, self.columns[name]) + column
+
+    def _write_meta(self) -> None:
+        meta = {
+            "segment": self.segment.name,
+            "identity": self._identity,
+            "indexed_bytes": self.indexed_bytes,
+            "rows": self.rows,
+            "dicts": self.dicts,
+        }
+        tmp = self.index_dir / "meta.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.index_dir / "meta.json")
+
+    def _load(self) -> None:
+        self._reset(remove_files=False)
+        meta_file = self.index_dir / "meta.json"
+        if not meta_file.exists():
+            return
+        with open(meta_file, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        rows = meta["rows"]
+        # Columns may hold extra rows if a refresh was interrupted; meta.json is authoritative
+        for name, column in self.columns.items():
+            path = self.index_dir / f"{name}.bin"
+            available = path.stat().st_size // column.itemsize if path.exists() else 0
+            if available < rows:
+                self._reset()
+                return
+            with open(path, "rb") as f:
+                column.fromfile(f, rows)
+            if available > rows:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * column.itemsize)
+        self._identity = meta["identity"]
+        self.indexed_bytes = meta["indexed_bytes"]
+        self.rows = rows
+        self.dicts = meta["dicts"]
+        self._codes = {field: {value: code for code, value in enumerate(values) if code} for field, values in self.dicts.items()}
+
+    def _reset(self, remove_files: bool = True) -> None:
+        self.indexed_bytes = 0
+        self.rows = 0
+        self.dicts = {field: [None] for field in DICT_FIELDS}
+        self._codes = {field: {} for field in DICT_FIELDS}
+        self.columns = {name: array(typecode) for name, typecode in NUMERIC_COLUMNS.items()}
+        self.columns.update({field: array("I") for field in DICT_FIELDS})
+        self._np_columns = None
+        if remove_files and self.index_dir.exists():
+            for path in self.index_dir.glob("*.bin"):
+                path.unlink()
+
+
+class LogIndex:
+    """
+    Query engine over the hot log file, the per-worker files and their rotated segments.
+    """
+
+    def __init__(self, log_dir: str = "logs", log_file: str = "llm_logs.json", index_dir: Optional[str] = None):
+        """
+        Open (and incrementally update) the index for a log file.
+
+        Args:
+            log_dir: Directory holding the log file, its segments and manifest
+            log_file: Name of the hot log file (per-worker files derived from it are included)
+            index_dir: Where sidecar indexes are stored (defaults to <log_dir>/.index)
+        """
+        self.log_dir = Path(log_dir)
+        self.log_file = self.log_dir / log_file
+        self.index_dir = Path(index_dir) if index_dir else self.log_dir / ".index"
+        self._segments: Dict[str, SegmentIndex] = {}
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Pick up new segments and lines appended since the last refresh.
+
+        Returns:
+            int: Number of newly indexed rows
+        """
+        names = []
+        for log_file in [self.log_file] + worker_files(self.log_dir, self.log_file.name):
+            names.extend(
+                segment["segment"] for segment in read_manifest(log_file) if segment.get("status") != "compacted"
+            )
+            names.append(log_file.name)
+
+        present = {}
+        for name in names:
+            path = self.log_dir / name
+            if not path.exists():
+                continue
+            present[name] = self._segments.get(name) or SegmentIndex(path, self.index_dir / name)
+        self._segments = present
+
+        # Drop sidecars of segments that were pruned by retention
+        if self.index_dir.exists():
+            for stale in self.index_dir.iterdir():
+                if stale.is_dir() and stale.name not in present:
+                    for path in stale.iterdir():
+                        path.unlink()
+                    stale.rmdir()
+
+        return sum(segment.refresh() for segment in present.values())
+
+    @property
+    def rows(self) -> int:
+        """Total number of indexed entries."""
+        return sum(segment.rows for segment in self._segments.values())
+
+    def count(self, **filters) -> int:
+        """Count entries matching the filters (see select() for the supported filters)."""
+        return sum(len(rows) for _, rows in self._select(**filters))
+
+    def scan(self, limit: Optional[int] = None, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the full log entries matching the filters, in file order.
+
+        Args:
+            limit: Stop after this many entries
+            **filters: See select()
+        """
+        remaining = limit
+        for segment, rows in self._select(**filters):
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            yield from segment.read_lines(rows)
+            if remaining is not None and remaining <= 0:
+                return
+
+    def latency_percentiles(
+        self,
+        percentiles: Sequence[float] = (50, 95, 99),
+        by: Sequence[str] = (),
+        **filters
+    ) -> Dict[Any, Dict[str, float]]:
+        """
+        Compute latency_ms percentiles, optionally per group.
+
+        Args:
+            percentiles: Percentiles to compute (0-100)
+            by: Group keys: any of "model", "user_id", "session_id", "prompt_category", "hour", "day"
+            **filters: See select()
+
+        Returns:
+            dict: {group: {"count": n, "p50": ..., ...}}; the group is () when by is empty.
+                Groups without any latency value are left out.
+        """
+        groups = self._grouped_values("latency_ms", by, filters)
+        result = {}
+        for group, values in groups.items():
+            if not any(len(chunk) for chunk in values):
+                continue
+            if np is not None:
+                values = np.sort(np.concatenate(values))
+                stats = {f"p{q:g}": float(np.percentile(values, q)) for q in percentiles}
+            else:
+                values = sorted(value for chunk in values for value in chunk)
+                stats = {f"p{q:g}": _percentile(values, q) for q in percentiles}
+            result[group] = {"count": len(values), **stats}
+        return result
+
+    def sum(self, field: str = "tokens_used", by: Sequence[str] = ("model", "hour"), **filters) -> Dict[Any, float]:
+        """
+        Sum tokens_used or latency_ms per group.
+
+        Args:
+            field: "tokens_used" or "latency_ms"
+            by: Group keys (see latency_percentiles())
+            **filters: See select()
+
+        Returns:
+            dict: {group tuple: total}
+        """
+        totals = {}
+        for group, values in self._grouped_values(field, by, filters).items():
+            if np is not None:
+                totals[group] = sum(chunk.sum().item() for chunk in values)
+            else:
+                totals[group] = sum(sum(chunk) for chunk in values)
+        return totals
+
+    def select(self, **filters) -> List[Tuple[str, Sequence[int]]]:
+        """
+        Return (segment name, row numbers) for entries matching all filters.
+
+        Supported filters:
+            start / end: Time bounds (ISO string, naive UTC datetime or epoch seconds), end exclusive
+            user_id, session_id, model, prompt_category: Exact value, or a list of values
+            errors: True for error events only, False to exclude them
+        """
+        return [(segment.segment.name, rows) for segment, rows in self._select(**filters)]
+
+    def _select(
+        self,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        errors: Optional[bool] = None,
+        **equals
+    ) -> Iterator[Tuple[SegmentIndex, Sequence[int]]]:
+        unknown = set(equals) - set(DICT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported filters: {sorted(unknown)}")
+        start, end = _to_epoch(start), _to_epoch(end)
+
+        for segment in self._segments.values():
+            if not segment.rows:
+                continue
+            codes = {}
+            for field, wanted in equals.items():
+                if wanted is None:
+                    continue
+                values = [wanted] if isinstance(wanted, str) else wanted
+                codes[field] = [segment._codes[field][v] for v in values if v in segment._codes[field]]
+                if not codes[field]:
+                    break
+            else:
+                rows = self._match(segment, start, end, errors, codes)
+                if len(rows):
+                    yield segment, rows
+
+    @staticmethod
+    def _match(segment: SegmentIndex, start, end, errors, codes) -> Sequence[int]:
+        cols = segment.arrays()
+        if np is not None:
+            mask = np.ones(segment.rows, dtype=bool)
+            if start is not None:
+                mask &= cols["ts"] >= start
+            if end is not None:
+                mask &= cols["ts"] < end
+            if errors is not None:
+                mask &= cols["is_error"] == (1 if errors else 0)
+            for field, wanted in codes.items():
+                mask &= np.isin(cols[field], wanted)
+            return np.flatnonzero(mask)
+
+        rows = range(segment.rows)
+        if start is not None:
+            rows = [r for r in rows if cols["ts"][r] >= start]
+        if end is not None:
+            rows = [r for r in rows if cols["ts"][r] < end]
+        if errors is not None:
+            rows = [r for r in rows if cols["is_error"][r] == (1 if errors else 0)]
+        for field, wanted in codes.items():
+            wanted = set(wanted)
+            rows = [r for r in rows if cols[field][r] in wanted]
+        return list(rows)
+
+    def _grouped_values(self, field: str, by: Sequence[str], filters: Dict[str, Any]) -> Dict[Any, list]:
+        if field not in ("latency_ms", "tokens_used"):
+            raise ValueError(f"Cannot aggregate {field!r}")
+        for key in by:
+            if key not in DICT_FIELDS and key not in TIME_BUCKETS:
+                raise ValueError(f"Cannot group by {key!r}")
+
+        groups: Dict[Any, list] = {}
+        for segment, rows in self._select(**filters):
+            cols = segment.arrays()
+            if np is not None:
+                values = cols[field][rows]
+                valid = ~np.isnan(values) if field == "latency_ms" else values >= 0
+                rows, values = rows[valid], values[valid]
+                if not len(values):
+                    # Matching rows without a value (e.g. error events): nothing to group
+                    continue
+                if not by:
+                    groups.setdefault((), []).append(values)
+                    continue
+                # Pack each row's group key into one integer so grouping is a 1-D unique
+                distinct, packed, shape = [], 0, []
+                for column in self._group_keys(segment, cols, rows, by).T:
+                    column_values, codes = np.unique(column, return_inverse=True)
+                    distinct.append(column_values)
+                    shape.append(len(column_values))
+                    packed = packed * len(column_values) + codes.reshape(-1)
+                unique, inverse = np.unique(packed, return_inverse=True)
+                inverse = inverse.reshape(-1)
+                # Split the values per group in one pass instead of one mask per group
+                order = np.argsort(inverse, kind="stable")
+                chunks = np.split(values[order], np.cumsum(np.bincount(inverse))[:-1])
+                unpacked = np.unravel_index(unique, shape)
+                for i, chunk in enumerate(chunks):
+                    key = [distinct[k][unpacked[k][i]] for k in range(len(by))]
+                    group = self._group_label(segment, by, key)
+                    groups.setdefault(group, []).append(chunk)
+                continue
+
+            for r in rows:
+                value = cols[field][r]
+                if value != value or value < 0:  # NaN or missing token count
+                    continue
+                key = self._group_keys(segment, cols, [r], by)[0] if by else ()
+                group = self._group_label(segment, by, key) if by else ()
+                groups.setdefault(group, [[]])[0].append(value)
+        return groups
+
+    @staticmethod
+    def _group_keys(segment: SegmentIndex, cols, rows, by):
+        """Per-row integer keys: dictionary codes, or the bucket start for time keys."""
+        if np is not None:
+            return np.stack([
+                (cols["ts"][rows] // TIME_BUCKETS[key] * TIME_BUCKETS[key]) if key in TIME_BUCKETS
+                else cols[key][rows].astype("float64")
+                for key in by
+            ], axis=1)
+        return [
+            tuple(
+                (cols["ts"][r] // TIME_BUCKETS[key] * TIME_BUCKETS[key]) if key in TIME_BUCKETS else cols[key][r]
+                for key in by
+            )
+            for r in rows
+        ]
+
+    @staticmethod
+    def _group_label(segment: SegmentIndex, by, key) -> Tuple:
+        label = []
+        for name, value in zip(by, key):
+            if name in TIME_BUCKETS:
+                label.append(_bucket_label(float(value), name))
+            else:
+                label.append(segment.dicts[name][int(value)])
+        return tuple(label)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query LLM interaction logs")
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--log-file", default="llm_logs.json")
+    parser.add_argument("--by", default="model", help="Comma-separated group keys, e.g. model,hour")
+    args = parser.parse_args()
+
+    index = LogIndex(args.log_dir, args.log_file)
+    by = tuple(key for key in args.by.split(",") if key)
+    print(f"📚 Indexed entries: {index.rows}")
+    print("\n⏱️ Latency percentiles (ms):")
+    for group, stats in sorted(index.latency_percentiles(by=by).items(), key=str):
+        print(f"  {group}: {stats}")
+    print("\n🔢 Tokens used:")
+    for group, total in sorted(index.sum("tokens_used", by=by).items(), key=str):
+        print(f"  {group}: {total:g}")
@@ -0,0 +1,197 @@
+"""
+Policies that shrink what LLMLogger writes while keeping metrics for every call.
+
+LogPolicy is applied to each entry right before it is serialized:
+
+  sampling       Per prompt_category / per model rates. Entries that are not sampled keep
+                 every field except the prompt/response text (so latency, tokens and
+                 counts stay complete) and are marked with "body_sampled": false.
+                 Errors from log_error are never sampled.
+  deduplication  Long prompt/response texts are hashed; the first occurrence is written
+                 with "<field>_hash", repeats only carry the hash. expand() restores
+                 the text when reading the logs back.
+  truncation     Texts longer than a limit are cut and flagged with "<field>_truncated".
+
+Whenever a text is not stored in full, "<field>_original_length" records its length.
+
+Example:
+    from llm_logger import LLMLogger
+    from log_policies import LogPolicy
+
+    policy = LogPolicy(
+        category_sample_rates={"general": 0.05},
+        model_sample_rates={"gpt-3.5-turbo": 0.2},
+        dedup=True,
+        max_response_chars=2000,
+    )
+    logger = LLMLogger(async_mode=True, policy=policy)
+"""
+
+import hashlib
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+TEXT_FIELDS = ("prompt", "response")
+
+
+def content_hash(text: str) -> str:
+    """Short, stable hash of a prompt/response body."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class LogPolicy:
+    """
+    Sampling, deduplication and truncation rules for log entries.
+    """
+
+    def __init__(
+        self,
+        default_sample_rate: float = 1.0,
+        category_sample_rates: Optional[Dict[str, float]] = None,
+        model_sample_rates: Optional[Dict[str, float]] = None,
+        dedup: bool = False,
+        dedup_min_chars: int = 64,
+        dedup_cache_size: int = 100_000,
+        max_prompt_chars: Optional[int] = None,
+        max_response_chars: Optional[int] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            default_sample_rate: Fraction of entries whose text is kept when no specific rate applies
+            category_sample_rates: Rates per prompt_category (take precedence over model rates)
+            model_sample_rates: Rates per model
+            dedup: Store repeated prompt/response texts once and reference them by hash
+            dedup_min_chars: Shorter texts are always written inline
+            dedup_cache_size: Number of recently seen hashes remembered (LRU)
+            max_prompt_chars: Truncate prompts beyond this many characters
+            max_response_chars: Truncate responses beyond this many characters
+            seed: Seed for the sampling RNG (for reproducible tests)
+        """
+        for rate in [default_sample_rate, *(category_sample_rates or {}).values(), *(model_sample_rates or {}).values()]:
+            if not 0 <= rate <= 1:
+                raise ValueError(f"Sample rates must be within [0, 1], got {rate}")
+        self.default_sample_rate = default_sample_rate
+        self.category_sample_rates = dict(category_sample_rates or {})
+        self.model_sample_rates = dict(model_sample_rates or {})
+        self.dedup = dedup
+        self.dedup_min_chars = dedup_min_chars
+        self.dedup_cache_size = dedup_cache_size
+        self.max_chars = {"prompt": max_prompt_chars, "response": max_response_chars}
+        self._random = random.Random(seed)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.entries = 0
+        self.sampled_out = 0
+        self.deduplicated = 0
+        self.truncated = 0
+
+    def sample_rate(self, entry: Dict[str, Any]) -> float:
+        """Return the sampling rate that applies to an entry."""
+        if entry.get("event_type") == "error":
+            return 1.0
+        category = entry.get("prompt_category")
+        if category in self.category_sample_rates:
+            return self.category_sample_rates[category]
+        model = entry.get("model")
+        if model in self.model_sample_rates:
+            return self.model_sample_rates[model]
+        return self.default_sample_rate
+
+    def apply(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the entry as it should be written (the input dict is modified in place).
+
+        Args:
+            entry: Log entry dict
+        """
+        with self._lock:
+            return self._apply(entry)
+
+    def _apply(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        self.entries += 1
+        is_error = entry.get("event_type") == "error"
+
+        rate = self.sample_rate(entry)
+        if rate < 1.0:
+            entry["sample_rate"] = rate
+            if self._random.random() >= rate:
+                entry["body_sampled"] = False
+                self.sampled_out += 1
+                for field in TEXT_FIELDS:
+                    text = entry.pop(field, None)
+                    if isinstance(text, str):
+                        entry[f"{field}_original_length"] = len(text)
+                return entry
+
+        for field in TEXT_FIELDS:
+            text = entry.get(field)
+            if not isinstance(text, str):
+                continue
+            if self.dedup and not is_error and len(text) >= self.dedup_min_chars:
+                digest = content_hash(text)
+                entry[f"{field}_hash"] = digest
+                if self._remember(digest):
+                    del entry[field]
+                    entry[f"{field}_original_length"] = len(text)
+                    self.deduplicated += 1
+                    continue
+            limit = self.max_chars[field]
+            if limit is not None and len(text) > limit:
+                entry[field] = text[:limit]
+                entry[f"{field}_truncated"] = True
+                entry[f"{field}_original_length"] = len(text)
+                self.truncated += 1
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring the effect of the policy."""
+        with self._lock:
+            return {
+                "entries": self.entries,
+                "sampled_out": self.sampled_out,
+                "deduplicated": self.deduplicated,
+                "truncated": self.truncated,
+            }
+
+    def reset_dedup(self) -> None:
+        """Forget every text seen so far; the next occurrence of each is written in full (e.g. in a new log file)."""
+        with self._lock:
+            self._seen.clear()
+
+    def _remember(self, digest: str) -> bool:
+        """Record a hash; return True if it was already seen."""
+        if digest in self._seen:
+            self._seen.move_to_end(digest)
+            return True
+        self._seen[digest] = None
+        if len(self._seen) > self.dedup_cache_size:
+            self._seen.popitem(last=False)
+        return False
+
+
+def expand(entries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Restore deduplicated prompt/response texts while reading entries in write order.
+
+    Texts whose first occurrence is not part of the iterable (e.g. it lives in a
+    segment that was not read) are left absent.
+    """
+    bodies: Dict[str, tuple] = {}
+    for entry in entries:
+        for field in TEXT_FIELDS:
+            digest = entry.get(f"{field}_hash")
+            if digest is None:
+                continue
+            if field in entry:
+                bodies[digest] = (entry[field], entry.get(f"{field}_truncated", False))
+            elif digest in bodies:
+                entry[field], truncated = bodies[digest]
+                if truncated:
+                    entry[f"{field}_truncated"] = True
+        yield entry
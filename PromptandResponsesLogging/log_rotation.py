@@ -0,0 +1,335 @@
+"""
+Size- and time-based rotation for LLM log files.
+
+The hot file (e.g. logs/llm_logs.json) is renamed to a timestamped segment when it
+exceeds a byte limit or when the hour/day changes. Segments are compressed by a
+background worker and described in a manifest (llm_logs.manifest.json) so readers can
+find the segments covering a time range without opening them.
+"""
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+ROTATION_INTERVALS = {
+    "hour": "%Y%m%d%H",
+    "day": "%Y%m%d",
+}
+
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+def manifest_path(log_file: Path) -> Path:
+    """Return the manifest path for a hot log file."""
+    return log_file.with_name(f"{log_file.stem}.manifest.json")
+
+
+def read_manifest(log_file: Path) -> List[Dict[str, Any]]:
+    """
+    Load the segment list for a hot log file, oldest first.
+
+    Args:
+        log_file: Path of the hot log file (not the manifest itself)
+
+    Returns:
+        list: Segment records ({"segment", "start", "end", "entries", "bytes", ...})
+    """
+    path = manifest_path(log_file)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("segments", [])
+
+
+def mark_compacted(log_file: Path, segment: str, output: str) -> bool:
+    """
+    Mark a segment as replaced by a columnar file before its JSONL file is deleted.
+
+    Readers skip compacted segments; a running LogRotator keeps the mark when it rewrites
+    the manifest.
+
+    Args:
+        log_file: Path of the hot log file whose manifest lists the segment
+        segment: Segment file name
+        output: Parquet file now holding the segment's entries, relative to the log directory
+
+    Returns:
+        bool: False if the manifest does not list the segment
+    """
+    path = manifest_path(log_file)
+    if not path.exists():
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for record in manifest.get("segments", []):
+        if record["segment"] == segment:
+            record["status"] = "compacted"
+            record["columnar"] = output
+            break
+    else:
+        return False
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+    return True
+
+
+def open_segment(path: Path, mode: str = "rb"):
+    """Open a plain, gzip or zstd log segment for reading."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode)
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise ImportError("Reading .zst segments requires: pip install zstandard")
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+class LogRotator:
+    """
+    Decides when the hot log file rotates and compresses closed segments in the background.
+
+    All methods except close() must be called while holding the owning logger's lock.
+    """
+
+    def __init__(
+        self,
+        log_file: Path,
+        max_bytes: Optional[int] = None,
+        interval: Optional[str] = None,
+        compression: Optional[str] = "gzip",
+        retention_bytes: Optional[int] = None
+    ):
+        """
+        Initialize the rotator.
+
+        Args:
+            log_file: Path of the hot log file
+            max_bytes: Rotate once the hot file would grow beyond this size
+            interval: Rotate when the UTC "hour" or "day" changes
+            compression: "gzip", "zstd" or None to keep segments uncompressed
+            retention_bytes: Delete the oldest segments once they use more than this on disk
+        """
+        if interval is not None and interval not in ROTATION_INTERVALS:
+            raise ValueError(f"interval must be one of {list(ROTATION_INTERVALS)}, got {interval!r}")
+        if compression is not None and compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"compression must be one of {list(COMPRESSION_SUFFIXES)}, got {compression!r}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires: pip install zstandard")
+
+        self.log_file = Path(log_file)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.compression = compression
+        self.retention_bytes = retention_bytes
+        self._manifest_path = manifest_path(self.log_file)
+        self._manifest_lock = threading.Lock()
+        self._segments = read_manifest(self.log_file)
+
+        # State of the hot file
+        self._size = self.log_file.stat().st_size if self.log_file.exists() else 0
+        self._entries = 0
+        self._start: Optional[str] = None
+        self._end: Optional[str] = None
+        self._period = self._period_key(
+            datetime.utcfromtimestamp(self.log_file.stat().st_mtime) if self._size else datetime.utcnow()
+        )
+        if self._size:
+            self._scan_existing()
+
+        self._jobs = queue.Queue()
+        self._worker = None
+        if compression is not None:
+            self._worker = threading.Thread(target=self._compress_loop, name="llm-log-compressor", daemon=True)
+            self._worker.start()
+            # Resume segments left uncompressed by a previous run
+            for segment in self._segments:
+                if segment.get("status") == "pending":
+                    self._jobs.put(segment["segment"])
+
+    def should_rotate(self, incoming_bytes: int, now: Optional[datetime] = None) -> bool:
+        """Return True if the hot file must be rotated before writing incoming_bytes."""
+        if self._size == 0:
+            return False
+        if self.max_bytes is not None and self._size + incoming_bytes > self.max_bytes:
+            return True
+        if self.interval is not None and self._period_key(now or datetime.utcnow()) != self._period:
+            return True
+        return False
+
+    def rotate(self) -> Optional[Path]:
+        """
+        Rename the hot file to a new segment and schedule its compression.
+
+        The caller must have closed any open handle on the hot file.
+
+        Returns:
+            Path: The new segment, or None if there was nothing to rotate
+        """
+        if not self.log_file.exists() or self._size == 0:
+            return None
+
+        rotated_at = datetime.utcnow()
+        segment = self.log_file.with_name(
+            f"{self.log_file.stem}.{rotated_at.strftime('%Y%m%dT%H%M%S%f')}{self.log_file.suffix}"
+        )
+        os.replace(self.log_file, segment)
+
+        record = {
+            "segment": segment.name,
+            "start": self._start,
+            "end": self._end,
+            "entries": self._entries,
+            "bytes": self._size,
+            "rotated_at": rotated_at.isoformat(),
+            "compression": self.compression,
+            "status": "pending" if self.compression else "closed",
+        }
+        with self._manifest_lock:
+            self._segments.append(record)
+            self._write_manifest()
+
+        self._size = 0
+        self._entries = 0
+        self._start = None
+        self._end = None
+        self._period = self._period_key(rotated_at)
+
+        if self._worker is not None:
+            self._jobs.put(segment.name)
+        else:
+            self._apply_retention()
+        return segment
+
+    def record(self, nbytes: int, count: int, start: Optional[str], end: Optional[str]) -> None:
+        """Account for entries just appended to the hot file."""
+        if self._size == 0:
+            self._period = self._period_key(datetime.utcnow())
+        self._size += nbytes
+        self._entries += count
+        if start is not None and (self._start is None or start < self._start):
+            self._start = start
+        if end is not None and (self._end is None or end > self._end):
+            self._end = end
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """Return a snapshot of the manifest records, oldest first."""
+        with self._manifest_lock:
+            return [dict(segment) for segment in self._segments]
+
+    def close(self) -> None:
+        """Wait for pending compression jobs to finish."""
+        if self._worker is not None and self._worker.is_alive():
+            self._jobs.put(None)
+            self._worker.join()
+
+    def _scan_existing(self) -> None:
+        """Recover the time range of a hot file left over from a previous run."""
+        with open(self.log_file, "rb") as f:
+            first = f.readline()
+            f.seek(0)
+            self._entries = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1024 * 1024), b""))
+            f.seek(max(0, self._size - 64 * 1024))
+            tail = f.read().splitlines()
+        for line, attr in ((first, "_start"), (tail[-1] if tail else b"", "_end")):
+            try:
+                setattr(self, attr, json.loads(line).get("timestamp"))
+            except ValueError:
+                pass
+
+    def _period_key(self, moment: datetime) -> Optional[str]:
+        if self.interval is None:
+            return None
+        return moment.strftime(ROTATION_INTERVALS[self.interval])
+
+    def _compress_loop(self) -> None:
+        while True:
+            name = self._jobs.get()
+            if name is None:
+                break
+            try:
+                self._compress(name)
+            except OSError as e:
+                with self._manifest_lock:
+                    for segment in self._segments:
+                        if segment["segment"] == name:
+                            segment["error"] = f"{type(e).__name__}: {e}"
+                    self._write_manifest()
+
+    def _compress(self, name: str) -> None:
+        source = self.log_file.with_name(name)
+        if not source.exists():
+            return
+        target = source.with_name(name + COMPRESSION_SUFFIXES[self.compression])
+        tmp = target.with_name(target.name + ".tmp")
+
+        with open(source, "rb") as src:
+            if self.compression == "gzip":
+                with gzip.open(tmp, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            else:
+                with open(tmp, "wb") as raw:
+                    with zstandard.ZstdCompressor(level=3).stream_writer(raw) as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp, target)
+        source.unlink()
+
+        with self._manifest_lock:
+            for segment in self._segments:
+                if segment["segment"] == name:
+                    segment["segment"] = target.name
+                    segment["compressed_bytes"] = target.stat().st_size
+                    segment["status"] = "compressed"
+            self._write_manifest()
+        self._apply_retention()
+
+    def _apply_retention(self) -> None:
+        if self.retention_bytes is None:
+            return
+        with self._manifest_lock:
+            def on_disk(segment):
+                if segment.get("status") == "compacted":
+                    return 0
+                return segment.get("compressed_bytes", segment["bytes"])
+
+            # Segments still waiting for compression are not counted (or deleted) yet
+            total = sum(on_disk(segment) for segment in self._segments if segment.get("status") != "pending")
+            while self._segments and total > self.retention_bytes:
+                oldest = self._segments[0]
+                if oldest.get("status") == "pending":
+                    break
+                self.log_file.with_name(oldest["segment"]).unlink(missing_ok=True)
+                total -= on_disk(oldest)
+                self._segments.pop(0)
+            self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        # Keep the marks columnar.compact(delete_source=True) made since the manifest was loaded
+        compacted = {
+            record["segment"]: record for record in read_manifest(self.log_file) if record.get("status") == "compacted"
+        }
+        for segment in self._segments:
+            if segment["segment"] in compacted and segment.get("status") != "compacted":
+                segment["status"] = "compacted"
+                segment["columnar"] = compacted[segment["segment"]].get("columnar")
+        tmp = self._manifest_path.with_name(self._manifest_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"log_file": self.log_file.name, "segments": self._segments}, f, indent=2)
+        os.replace(tmp, self._manifest_path)
@@ -0,0 +1,181 @@
+"""
+Per-worker log files for multi-process deployments (gunicorn/uvicorn workers).
+
+A threading.Lock only protects one process: several workers appending to the same
+llm_logs.json can interleave large lines. With LLMLogger(per_process=True) each worker
+writes its own file, llm_logs.<host>-<pid>.json (with its own rotation and manifest),
+and the files are merged by timestamp on read:
+
+    from multiprocess_logs import iter_merged
+
+    for entry in iter_merged("logs", "llm_logs.json"):
+        ...
+
+    python multiprocess_logs.py list
+    python multiprocess_logs.py merge --output logs/merged.json
+"""
+
+import argparse
+import heapq
+import json
+import os
+import re
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from log_rotation import open_segment, read_manifest
+
+
+def host_name() -> str:
+    """Short host name, safe to embed in a file name."""
+    return re.sub(r"[^A-Za-z0-9_]", "_", socket.gethostname().split(".")[0]) or "host"
+
+
+def worker_log_file(log_file: Path, host: Optional[str] = None, pid: Optional[int] = None) -> Path:
+    """
+    Return the per-worker file for a log file, e.g. logs/llm_logs.web1-4242.json.
+
+    Args:
+        log_file: Shared log file path
+        host: Host name (defaults to this host)
+        pid: Process id (defaults to the current process)
+    """
+    log_file = Path(log_file)
+    worker = f"{host or host_name()}-{pid if pid is not None else os.getpid()}"
+    return log_file.with_name(f"{log_file.stem}.{worker}{log_file.suffix}")
+
+
+def worker_files(log_dir: str = "logs", log_file: str = "llm_logs.json") -> List[Path]:
+    """
+    List the per-worker hot files written next to a log file.
+
+    Rotated segments and manifests are not included; iter_file() reads them through
+    each worker's manifest.
+    """
+    base = Path(log_file)
+    pattern = re.compile(rf"^{re.escape(base.stem)}\.[A-Za-z0-9_]+-\d+{re.escape(base.suffix)}$")
+    directory = Path(log_dir)
+    if not directory.is_dir():
+        return []
+    return sorted(path for path in directory.iterdir() if pattern.match(path.name))
+
+
+def iter_file(log_file: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the entries of one writer in write order: rotated segments first, then the hot file.
+
+    Lines that do not parse (e.g. a line still being written) are skipped.
+    """
+    log_file = Path(log_file)
+    # Segments compacted to Parquet (columnar.py --delete-source) are read with ColumnarLogs
+    paths = [
+        log_file.parent / segment["segment"]
+        for segment in read_manifest(log_file)
+        if segment.get("status") != "compacted"
+    ]
+    paths.append(log_file)
+    for path in paths:
+        if not path.exists():
+            continue
+        with open_segment(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def _timestamp(entry: Dict[str, Any]) -> str:
+    return entry.get("timestamp", "")
+
+
+def _reorder(entries: Iterator[Dict[str, Any]], window: int) -> Iterator[Dict[str, Any]]:
+    """
+    Sort a nearly sorted stream using a bounded buffer.
+
+    Threads of one process take their timestamp before acquiring the write lock (or
+    before waiting for space in the background writer's queue), so a file is only ordered
+    up to a few entries; any disorder smaller than the window is fixed.
+    """
+    heap: List[tuple] = []
+    for seq, entry in enumerate(entries):
+        item = (_timestamp(entry), seq, entry)
+        if len(heap) < window:
+            heapq.heappush(heap, item)
+        else:
+            yield heapq.heappushpop(heap, item)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def iter_merged(
+    log_dir: str = "logs",
+    log_file: str = "llm_logs.json",
+    include_shared: bool = True,
+    reorder_window: int = 1024
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the entries of every worker merged by timestamp.
+
+    Each writer's entries are (nearly) in timestamp order, so a streaming k-way merge is
+    enough; memory use does not depend on the size of the logs. Ordering is exact as long
+    as no entry is written more than reorder_window entries late, which a full "block"
+    queue with many threads can exceed.
+
+    Args:
+        log_dir: Directory holding the log files
+        log_file: Shared log file name the worker files derive from
+        include_shared: Also merge the shared file written by single-process loggers
+        reorder_window: Entries buffered per file to fix small out-of-order runs (0 to disable)
+    """
+    paths = worker_files(log_dir, log_file)
+    if include_shared:
+        paths.insert(0, Path(log_dir) / log_file)
+    streams = [iter_file(path) for path in paths]
+    if reorder_window > 0:
+        streams = [_reorder(stream, reorder_window) for stream in streams]
+    return heapq.merge(*streams, key=_timestamp)
+
+
+def merge(output: str, log_dir: str = "logs", log_file: str = "llm_logs.json") -> int:
+    """
+    Write the merged entries of every worker to one JSONL file.
+
+    Returns:
+        int: Number of entries written
+    """
+    count = 0
+    with open(output, "w", encoding="utf-8") as f:
+        for entry in iter_merged(log_dir, log_file):
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and merge per-worker LLM log files")
+    parser.add_argument("command", choices=["list", "merge"])
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--log-file", default="llm_logs.json")
+    parser.add_argument("--output", help="Merged JSONL file (merge)")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for path in worker_files(args.log_dir, args.log_file):
+            segments = read_manifest(path)
+            print(f"{path.name}: {path.stat().st_size} bytes hot, {len(segments)} rotated segment(s)")
+        return
+
+    if not args.output:
+        parser.error("merge requires --output")
+    inputs = [Path(args.log_dir) / args.log_file, *worker_files(args.log_dir, args.log_file)]
+    if Path(args.output).resolve() in [path.resolve() for path in inputs]:
+        sys.exit("❌ --output must not be one of the files being merged")
+    count = merge(args.output, args.log_dir, args.log_file)
+    print(f"✅ Merged {count} entries into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
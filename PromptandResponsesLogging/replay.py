@@ -0,0 +1,405 @@
+"""
+Replay logged production traffic against a /chat endpoint.
+
+Streams interaction entries written by LLMLogger (every worker file and rotated segment,
+merged by timestamp, or one JSONL/.gz/.zst segment given with --input) and re-issues each
+prompt to one of the workshop services:
+
+  token-monitor   llm-token-monitor        {"prompt", "model", "user_id"}
+  langfuse        langfuse-workshop        {"message", "user_id"}
+  qa              LLMSecOps/day02.py       {"question", "context"}
+
+Requests are sent with the original inter-arrival times (--speed 1), compressed by a
+factor (--speed 10) or as fast as --concurrency allows (--max-throughput). The new
+latencies are compared with the latency_ms logged for the same entries (timed replays
+only) and, with --baseline, with a previous replay; regressions beyond --tolerance are
+flagged and make the exit status 1.
+
+    python replay.py --target token-monitor --url http://localhost:8000/chat --speed 10
+    python replay.py --target qa --url http://localhost:8000/chat --max-throughput --concurrency 8
+    python replay.py --target langfuse --input logs/llm_logs.20251011.json.gz --json --output run.json
+    python replay.py --target langfuse --baseline run.json          # exit 1 on regression
+"""
+
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from loadgen import compare, git_revision, summarize
+from multiprocess_logs import iter_file, iter_merged
+
+
+def token_monitor_body(entry: Dict[str, Any], args) -> Dict[str, Any]:
+    body = {
+        "prompt": entry["prompt"],
+        "model": args.model or entry.get("model") or "gpt-4.1",
+        "user_id": entry.get("user_id") or "anonymous",
+    }
+    if args.no_cache:
+        body["cache"] = False
+    return body
+
+
+def langfuse_body(entry: Dict[str, Any], args) -> Dict[str, Any]:
+    body = {"message": entry["prompt"], "user_id": entry.get("user_id") or "anonymous"}
+    if args.no_cache:
+        body["cache"] = False
+    return body
+
+
+def qa_body(entry: Dict[str, Any], args) -> Dict[str, Any]:
+    # The logs hold no QA context; the logged response is text of realistic length to extract from
+    context = args.context or entry.get("context") or entry.get("response") or entry["prompt"]
+    return {"question": entry["prompt"], "context": context}
+
+
+# Target name -> function building the /chat request body from a log entry
+TARGETS: Dict[str, Callable[[Dict[str, Any], Any], Dict[str, Any]]] = {
+    "token-monitor": token_monitor_body,
+    "langfuse": langfuse_body,
+    "qa": qa_body,
+}
+
+# Metrics compared with the logged latencies and with --baseline, and whether higher is better
+LOGGED_METRICS = {
+    "latency_ms.p50": False,
+    "latency_ms.p95": False,
+}
+BASELINE_METRICS = {
+    "throughput_rps": True,
+    "latency_ms.p50": False,
+    "latency_ms.p95": False,
+    "latency_ms.p99": False,
+}
+
+# Allowed increase of the error rate (absolute), which is often 0 in the reference
+ERROR_RATE_TOLERANCE = 0.01
+
+
+def _entry_time(entry: Dict[str, Any]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def iter_entries(args) -> Iterator[Dict[str, Any]]:
+    """Yield the logged requests to replay, in timestamp order, without loading the logs."""
+    source = iter_file(Path(args.input)) if args.input else iter_merged(args.log_dir, args.log_file)
+    count = 0
+    for entry in source:
+        if not entry.get("prompt"):
+            continue
+        timestamp = entry.get("timestamp", "")
+        if args.start and timestamp < args.start:
+            continue
+        if args.end and timestamp >= args.end:
+            break
+        yield entry
+        count += 1
+        if args.limit is not None and count >= args.limit:
+            return
+
+
+# Errors meaning the server closed an idle keep-alive connection before reading the request
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class ChatClient:
+    """
+    Sends JSON POSTs to one URL over a keep-alive connection per thread.
+
+    A request on a reused connection that the server had closed while idle (e.g. during a
+    long gap in the replayed traffic) is retried once on a new connection. Other failures,
+    timeouts included, are not retried: /chat is not idempotent.
+    """
+
+    def __init__(self, url: str, timeout: float = 60.0, headers: Optional[Dict[str, str]] = None):
+        parsed = urlparse(url)
+        self._cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self._path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.connections = 0
+        self._local = threading.local()
+        self._open: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def post(self, body: Dict[str, Any]) -> Tuple[int, bytes]:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        while True:
+            conn = getattr(self._local, "conn", None)
+            fresh = conn is None
+            if fresh:
+                conn = self._local.conn = self._cls(self._host, self._port, timeout=self.timeout)
+                with self._lock:
+                    self.connections += 1
+                    self._open.append(conn)
+            try:
+                conn.request("POST", self._path, body=data, headers=self.headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                self._local.conn = None
+                if fresh:
+                    raise
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                self._local.conn = None
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._open:
+                conn.close()
+            self._open.clear()
+
+
+class ReplayRecorder:
+    """Collects per-request results from the sender threads."""
+
+    def __init__(self):
+        self.results: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self.results.append(result)
+
+
+def _send(client: ChatClient, recorder: ReplayRecorder, entry: Dict[str, Any], body: Dict[str, Any],
+          intended: float) -> None:
+    sent = time.perf_counter()
+    try:
+        status, _ = client.post(body)
+        error = None if 200 <= status < 300 else f"HTTP {status}"
+    except (OSError, http.client.HTTPException) as e:
+        status, error = 0, f"{type(e).__name__}: {e}"
+    done = time.perf_counter()
+    recorder.record({
+        "timestamp": entry.get("timestamp"),
+        "prompt": entry["prompt"],
+        "model": entry.get("model"),
+        "status": status,
+        "error": error,
+        # Measured from the scheduled send time, so time spent waiting for a free sender counts
+        "latency_ms": (done - intended) * 1000,
+        "send_lag_ms": (sent - intended) * 1000,
+        "logged_latency_ms": entry.get("latency_ms"),
+        "logged_error": entry.get("event_type") == "error" or entry.get("success") is False,
+    })
+
+
+def run(args) -> Dict[str, Any]:
+    build = TARGETS[args.target]
+    headers = dict(header.split(":", 1) for header in args.header)
+    client = ChatClient(args.url, timeout=args.timeout, headers={k.strip(): v.strip() for k, v in headers.items()})
+    recorder = ReplayRecorder()
+    # Max-throughput mode is closed loop: a new request only when a sender is free
+    slots = threading.BoundedSemaphore(args.concurrency) if args.max_throughput else None
+
+    def send(entry, body, intended):
+        try:
+            _send(client, recorder, entry, body, intended)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    start = time.perf_counter()
+    schedule = 0.0
+    previous_ts = None
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for entry in iter_entries(args):
+            body = build(entry, args)
+            if slots is not None:
+                slots.acquire()
+                intended = time.perf_counter()
+            else:
+                ts = _entry_time(entry)
+                if ts is not None and previous_ts is not None:
+                    gap = max(0.0, ts - previous_ts) / args.speed
+                    schedule += min(gap, args.max_gap) if args.max_gap is not None else gap
+                if ts is not None:
+                    previous_ts = ts
+                intended = start + schedule
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, entry, body, intended)
+    elapsed = time.perf_counter() - start
+    client.close()
+    return report(args, recorder.results, elapsed, client.connections)
+
+
+def _by_model(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        groups.setdefault(result["model"] or "unknown", []).append(result)
+    return {
+        model: {
+            "requests": len(group),
+            "latency_ms": summarize([r["latency_ms"] for r in group if not r["error"]], 1.0),
+            "logged_latency_ms": summarize(
+                [r["logged_latency_ms"] for r in group if r["logged_latency_ms"] is not None and not r["logged_error"]], 1.0
+            ),
+        }
+        for model, group in sorted(groups.items())
+    }
+
+
+def report(args, results: List[Dict[str, Any]], seconds: float, connections: int) -> Dict[str, Any]:
+    ok = [r for r in results if not r["error"]]
+    logged = [r for r in results if r["logged_latency_ms"] is not None and not r["logged_error"]]
+    paired = [r for r in ok if r["logged_latency_ms"] and not r["logged_error"]]
+    slower = [r for r in paired if r["latency_ms"] > r["logged_latency_ms"] * (1 + args.tolerance)]
+    slowest = sorted(paired, key=lambda r: r["latency_ms"] / r["logged_latency_ms"], reverse=True)[:5]
+
+    result: Dict[str, Any] = {
+        "config": {
+            **{k: v for k, v in vars(args).items() if k not in ("json", "output", "baseline", "header")},
+            "git_rev": git_revision(),
+            "started_at": datetime.utcnow().isoformat(),
+        },
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0.0,
+        "logged_error_rate": round(sum(r["logged_error"] for r in results) / len(results), 4) if results else 0.0,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(results) / seconds, 1) if seconds else 0.0,
+        "connections": connections,
+        "latency_ms": summarize([r["latency_ms"] for r in ok], 1.0),
+        "logged_latency_ms": summarize([r["logged_latency_ms"] for r in logged], 1.0),
+        "send_lag_ms": summarize([r["send_lag_ms"] for r in results], 1.0),
+        "slower_than_logged": len(slower),
+        "slowest": [
+            {"timestamp": r["timestamp"], "prompt": r["prompt"][:80], "latency_ms": round(r["latency_ms"], 1),
+             "logged_latency_ms": r["logged_latency_ms"]}
+            for r in slowest
+        ],
+        "by_model": _by_model(results),
+        "error_samples": sorted({r["error"] for r in results if r["error"]})[:5],
+    }
+    return result
+
+
+def find_regressions(result: Dict[str, Any], tolerance: float, baseline: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Compare the replay with the logged latencies (overall and per model) and with a previous replay."""
+    regressions = []
+    # A --max-throughput run saturates the service on purpose, so its latencies include queueing
+    # the logged (open-loop) traffic never saw; only a baseline replay is comparable then
+    if not result["config"]["max_throughput"]:
+        regressions += [
+            f"vs. logged {line}"
+            for line in compare(result, {"latency_ms": result["logged_latency_ms"]}, tolerance, LOGGED_METRICS)
+        ]
+        for model, stats in result["by_model"].items():
+            regressions += [
+                f"vs. logged [{model}] {line}"
+                for line in compare(stats, {"latency_ms": stats["logged_latency_ms"]}, tolerance, LOGGED_METRICS)
+            ]
+    if result["error_rate"] > result["logged_error_rate"] + ERROR_RATE_TOLERANCE:
+        regressions.append(f"vs. logged error_rate: {result['logged_error_rate']} -> {result['error_rate']}")
+
+    if baseline is not None:
+        metrics = dict(BASELINE_METRICS)
+        # A timed replay's throughput is set by the schedule, not by the service
+        if not (result["config"]["max_throughput"] and baseline.get("config", {}).get("max_throughput")):
+            del metrics["throughput_rps"]
+        regressions += [f"vs. baseline {line}" for line in compare(result, baseline, tolerance, metrics)]
+        if result["error_rate"] > baseline.get("error_rate", 0.0) + ERROR_RATE_TOLERANCE:
+            regressions.append(f"vs. baseline error_rate: {baseline.get('error_rate')} -> {result['error_rate']}")
+    return regressions
+
+
+def _latency_line(label: str, latency: Dict[str, float]) -> str:
+    if not latency:
+        return f"  {label:<13} -"
+    return (f"  {label:<13} p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  p99 {latency['p99']:.1f}  "
+            f"max {latency['max']:.1f}")
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    config = result["config"]
+    pace = "max throughput" if config["max_throughput"] else f"{config['speed']}x original timing"
+    print(f"🔁 {config['target']} at {config['url']}, {pace}, concurrency {config['concurrency']}")
+    print(f"  {result['requests']} requests ({result['errors']} errors, logged {result['logged_error_rate']:.1%}) "
+          f"in {result['seconds']}s -> {result['throughput_rps']} req/s over {result['connections']} connection(s)")
+    print(_latency_line("latency ms", result["latency_ms"]))
+    print(_latency_line("logged ms", result["logged_latency_ms"]))
+    print("  (replayed: whole HTTP request from its scheduled send time; logged: the LLM call inside the app)")
+    if config["max_throughput"]:
+        print("  latency not compared with the logged one: a max-throughput run is a saturation test")
+    lag = result["send_lag_ms"]
+    if lag and not config["max_throughput"]:
+        print(f"  send lag ms   p95 {lag['p95']:.1f}  max {lag['max']:.1f}  (how late requests went out vs. the schedule)")
+    print(f"  {result['slower_than_logged']} requests slower than logged by more than {config['tolerance']:.0%}")
+    for model, stats in result["by_model"].items():
+        new, old = stats["latency_ms"], stats["logged_latency_ms"]
+        if new and old:
+            print(f"    {model:<20} {stats['requests']:>6} req   p50 {old['p50']:.1f} -> {new['p50']:.1f}   "
+                  f"p95 {old['p95']:.1f} -> {new['p95']:.1f}")
+    for sample in result["error_samples"]:
+        print(f"  error: {sample}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged LLM traffic against a /chat endpoint")
+    parser.add_argument("--target", choices=sorted(TARGETS), required=True, help="Service the URL points at")
+    parser.add_argument("--url", default="http://localhost:8000/chat")
+    parser.add_argument("--input", help="One log segment to replay (plain, .gz or .zst)")
+    parser.add_argument("--log-dir", default="logs", help="Replay every log file here, merged by timestamp")
+    parser.add_argument("--log-file", default="llm_logs.json")
+    parser.add_argument("--start", help="First timestamp to replay (ISO, inclusive)")
+    parser.add_argument("--end", help="Stop at this timestamp (ISO, exclusive)")
+    parser.add_argument("--limit", type=int, default=None, help="Replay at most this many requests")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression: 10 replays ten times faster")
+    parser.add_argument("--max-gap", type=float, default=None, help="Cap idle gaps at this many seconds (after --speed)")
+    parser.add_argument("--max-throughput", action="store_true", help="Ignore timing, keep --concurrency requests in flight")
+    parser.add_argument("--concurrency", type=int, default=32, help="Sender threads (requests in flight at most)")
+    parser.add_argument("--model", help="Replace the logged model (token-monitor)")
+    parser.add_argument("--context", help="QA context for every question (qa; default: the logged response)")
+    parser.add_argument("--no-cache", action="store_true", help="Send cache=false (token-monitor, langfuse)")
+    parser.add_argument("--header", action="append", default=[], help="Extra request header, e.g. 'Authorization: Bearer x'")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative latency regression")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous replay to compare against")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive (use --max-throughput to ignore timing)")
+
+    result = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = find_regressions(result, args.tolerance, baseline)
+    result["regressions"] = regressions
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+        print("❌ Regressions:" if regressions else "✅ No regressions")
+        for line in regressions:
+            print(f"   {line}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Stress test for multi-process logging: N processes x M threads logging concurrently.
+
+Every line written is checked to parse as JSON and the number of entries is compared
+with the number logged, so interleaved or lost writes show up as failures. Reports the
+sustained entries/sec across all processes.
+
+    python stress_multiprocess.py --processes 8 --threads 4 --entries 2000
+    python stress_multiprocess.py --mode shared      # every process appends to one file
+    python stress_multiprocess.py --async-mode --preload --rotate-bytes 5000000 --json
+
+Exits with status 1 if any line fails to parse or entries are missing.
+"""
+
+import argparse
+import json
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from llm_logger import LLMLogger
+from multiprocess_logs import iter_merged, worker_files
+
+
+# Logger created before forking, like an app module imported by gunicorn --preload
+PRELOADED = None
+
+
+def make_logger(args, log_dir: str) -> LLMLogger:
+    return LLMLogger(
+        log_dir=log_dir,
+        async_mode=args.async_mode,
+        per_process=args.mode == "per-process",
+        rotate_bytes=args.rotate_bytes,
+        compression=None,
+    )
+
+
+def worker(args, log_dir: str, index: int, ready, start) -> None:
+    logger = PRELOADED or make_logger(args, log_dir)
+    # Large responses make partial writes (and thus interleaving) likely in shared mode
+    response = "x" * args.response_bytes
+
+    def log_many(thread: int) -> None:
+        for i in range(args.entries):
+            logger.log_interaction(
+                prompt=f"process {index} thread {thread} entry {i}",
+                response=response,
+                model="stress",
+                user_id=f"p{index}",
+                session_id=f"p{index}-t{thread}",
+                tokens_used=i,
+                latency_ms=1.0,
+            )
+
+    threads = [threading.Thread(target=log_many, args=(t,)) for t in range(args.threads)]
+    ready.wait()
+    start.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.close()
+
+
+def validate(log_dir: Path) -> dict:
+    files = [log_dir / "llm_logs.json", *worker_files(str(log_dir))]
+    # Rotated segments (uncompressed)
+    files += sorted(p for p in log_dir.glob("llm_logs.*.json") if p not in files and not p.name.endswith(".manifest.json"))
+    lines = bad = 0
+    for path in files:
+        if not path.exists():
+            continue
+        with open(path, "rb") as f:
+            for line in f:
+                lines += 1
+                try:
+                    json.loads(line)
+                except ValueError:
+                    bad += 1
+    return {"files": len([p for p in files if p.exists()]), "lines": lines, "corrupt_lines": bad}
+
+
+def run(args) -> dict:
+    log_dir = Path(tempfile.mkdtemp(prefix="stress_logs_"))
+    ctx = multiprocessing.get_context("fork")
+    global PRELOADED
+    if args.preload:
+        PRELOADED = make_logger(args, str(log_dir))
+    ready = ctx.Barrier(args.processes + 1)
+    start = ctx.Barrier(args.processes + 1)
+    processes = [
+        ctx.Process(target=worker, args=(args, str(log_dir), i, ready, start))
+        for i in range(args.processes)
+    ]
+    try:
+        for process in processes:
+            process.start()
+        ready.wait()
+        began = time.perf_counter()
+        start.wait()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - began
+
+        expected = args.processes * args.threads * args.entries
+        result = {
+            "mode": args.mode,
+            "async_mode": args.async_mode,
+            "processes": args.processes,
+            "threads": args.threads,
+            "response_bytes": args.response_bytes,
+            "expected_entries": expected,
+            "seconds": round(elapsed, 3),
+            "entries_per_sec": round(expected / elapsed),
+            **validate(log_dir),
+        }
+        if args.mode == "per-process":
+            timestamps = [entry.get("timestamp", "") for entry in iter_merged(str(log_dir))]
+            result["merged_entries"] = len(timestamps)
+            # Entries whose timestamp is older than the one before (beyond the reorder window)
+            result["merged_out_of_order"] = sum(a > b for a, b in zip(timestamps, timestamps[1:]))
+        result["ok"] = result["corrupt_lines"] == 0 and result["lines"] == expected
+        return result
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test LLMLogger with several processes and threads")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--entries", type=int, default=1000, help="Entries per thread")
+    parser.add_argument("--response-bytes", type=int, default=16384)
+    parser.add_argument("--mode", choices=["per-process", "shared"], default="per-process")
+    parser.add_argument("--async-mode", action="store_true", help="Use the background writer in each process")
+    parser.add_argument("--rotate-bytes", type=int, default=None)
+    parser.add_argument("--preload", action="store_true", help="Create the logger before forking the workers")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        status = "✅" if result["ok"] else "❌"
+        print(
+            f"{status} {args.mode}: {result['processes']} processes x {result['threads']} threads, "
+            f"{result['expected_entries']} entries in {result['seconds']}s "
+            f"({result['entries_per_sec']} entries/s)"
+        )
+        print(f"   {result['lines']} lines in {result['files']} file(s), {result['corrupt_lines']} corrupt")
+        if "merged_entries" in result:
+            print(f"   merged read: {result['merged_entries']} entries, {result['merged_out_of_order']} out of timestamp order")
+    sys.exit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+import log_index
+from log_index import LogIndex
+
+
+@pytest.fixture(params=["numpy", "pure-python"])
+def index_module(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(log_index, "np", None)
+    return log_index
+
+
+def write_log(log_dir, entries):
+    with open(log_dir / "llm_logs.json", "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def test_filter_matching_only_rows_without_values(tmp_path, index_module):
+    # Error events carry no latency_ms or tokens_used; aggregating only them must not fail
+    write_log(tmp_path, [
+        {"timestamp": "2025-10-11T03:40:55", "model": "gpt-4", "latency_ms": 120.0, "tokens_used": 30},
+        {"timestamp": "2025-10-11T03:41:10", "model": "gpt-4", "event_type": "error", "error_message": "boom"},
+        {"timestamp": "2025-10-11T04:02:00", "model": "gpt-3.5", "event_type": "error", "error_message": "boom"},
+    ])
+    index = LogIndex(str(tmp_path))
+
+    assert index.sum("tokens_used", by=("model", "hour"), errors=True) == {}
+    assert index.latency_percentiles(errors=True) == {}
+    assert index.latency_percentiles(by=("model",), errors=True) == {}
+    assert index.latency_percentiles(by=("model",)) == {("gpt-4",): {"count": 1, "p50": 120.0, "p95": 120.0, "p99": 120.0}}
@@ -0,0 +1,445 @@
+"""Run a promptfoo-style prompts x providers x tests matrix against local Ollama models.
+
+Reads the same config shape as promptfooconfig.yaml (prompts, providers, tests, defaultTest)
+and sends every (prompt, provider, test) call to Ollama concurrently, with a separate limit per
+provider so a slow model doesn't starve the others. Calls share one keep-alive connection pool,
+responses are streamed (time to first token is measured), and each test's assertions are
+checked as soon as its response is complete.
+
+    python ollama_stub.py --port 11435 &            # or a real `ollama serve`
+    OLLAMA_BASE_URL=http://localhost:11435 python matrix_runner.py \\
+        --providers ollama:gemma:2b,ollama:chat:llama3 --concurrency 4
+
+Providers: "ollama:<model>" and "ollama:completion:<model>" use /api/generate,
+"ollama:chat:<model>" uses /api/chat. A provider can also be {id: ..., config: {...}}: config
+keys go to Ollama as options (temperature, num_predict, ...), except max_concurrency.
+Other providers (openai:...) are skipped; --providers replaces the config's list.
+
+Assertions: equals, contains, icontains, contains-any, icontains-any, contains-all,
+icontains-all, starts-with, regex, is-json and javascript, each also with a "not-" prefix.
+javascript supports single expressions over `output` and `context.vars` (comparisons,
+arithmetic, && || !, .length, .includes(), .toLowerCase(), JSON.parse, Math.min/max/abs);
+a boolean result is pass/fail, a number is a score that passes when it is >= the assertion's
+threshold (or > 0 without one). Model-graded types such as llm-rubric are reported as skipped.
+
+Reports latency, time to first token, tokens/sec and pass rate per (prompt, provider) cell, and
+exits with status 1 if any test failed.
+"""
+import argparse
+import ast
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+import httpx
+import yaml
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+
+class UnsupportedAssertion(Exception):
+    pass
+
+
+# --- config -------------------------------------------------------------------------------
+
+def render(template, variables):
+    # The {{ var }} subset of promptfoo's Nunjucks templates
+    return re.sub(r"{{\s*(\w+)\s*}}", lambda m: str(variables.get(m.group(1), m.group(0))), template)
+
+
+def parse_provider(spec, default_concurrency):
+    if isinstance(spec, str):
+        spec = {"id": spec}
+    provider_id = spec.get("id", "")
+    parts = provider_id.split(":")
+    if parts[0] != "ollama" or len(parts) < 2:
+        return None
+    endpoint = "generate"
+    if parts[1] in ("chat", "completion"):
+        endpoint = "chat" if parts[1] == "chat" else "generate"
+        parts = parts[1:]
+    options = dict(spec.get("config") or {})
+    concurrency = int(options.pop("max_concurrency", default_concurrency))
+    return {
+        "id": provider_id,
+        "label": spec.get("label", provider_id),
+        "model": ":".join(parts[1:]),
+        "endpoint": endpoint,
+        "options": options,
+        "concurrency": concurrency,
+    }
+
+
+def load_matrix(config, provider_specs, default_concurrency, concurrency_overrides):
+    prompts = config.get("prompts", [])
+    default_test = config.get("defaultTest") or {}
+    tests = []
+    for test in config.get("tests", []):
+        tests.append({
+            "vars": {**(default_test.get("vars") or {}), **(test.get("vars") or {})},
+            "assert": list(default_test.get("assert") or []) + list(test.get("assert") or []),
+            "description": test.get("description"),
+        })
+    providers, skipped = [], []
+    for spec in provider_specs or config.get("providers", []):
+        provider = parse_provider(spec, default_concurrency)
+        if provider is None:
+            skipped.append(spec if isinstance(spec, str) else spec.get("id"))
+            continue
+        provider["concurrency"] = concurrency_overrides.get(provider["id"], provider["concurrency"])
+        providers.append(provider)
+    return prompts, providers, tests, skipped
+
+
+# --- assertions -----------------------------------------------------------------------------
+
+JS_STRING_LITERAL = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+JS_REPLACEMENTS = [
+    (r"===", "=="), (r"!==", "!="), (r"&&", " and "), (r"\|\|", " or "), (r"!(?!=)", " not "),
+    (r"\btrue\b", "True"), (r"\bfalse\b", "False"), (r"\bnull\b", "None"),
+]
+JS_STRING_METHODS = {
+    "includes": lambda s, x: x in s,
+    "toLowerCase": lambda s: s.lower(),
+    "toUpperCase": lambda s: s.upper(),
+    "trim": lambda s: s.strip(),
+    "startsWith": lambda s, x: s.startswith(x),
+    "endsWith": lambda s, x: s.endswith(x),
+    "indexOf": lambda s, x: s.find(x),
+    "split": lambda s, x: s.split(x),
+}
+JS_GLOBALS = {
+    ("JSON", "parse"): json.loads,
+    ("Math", "min"): min,
+    ("Math", "max"): max,
+    ("Math", "abs"): abs,
+}
+BIN_OPS = {ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+           ast.Div: lambda a, b: a / b, ast.Mod: lambda a, b: a % b}
+COMPARE_OPS = {ast.Eq: lambda a, b: a == b, ast.NotEq: lambda a, b: a != b, ast.Lt: lambda a, b: a < b,
+               ast.LtE: lambda a, b: a <= b, ast.Gt: lambda a, b: a > b, ast.GtE: lambda a, b: a >= b}
+
+
+def js_to_python(expression):
+    # Split off string literals (odd indices) so operators inside them, e.g. 'a && b', are kept
+    parts = JS_STRING_LITERAL.split(expression.strip().rstrip(";"))
+    for index in range(0, len(parts), 2):
+        if re.search(r"\breturn\b|=>|[{}?`]", parts[index]):
+            raise UnsupportedAssertion("only single javascript expressions are supported")
+        for pattern, replacement in JS_REPLACEMENTS:
+            parts[index] = re.sub(pattern, replacement, parts[index])
+    return "".join(parts)
+
+
+def js_eval(expression, output, variables):
+    # A JavaScript expression is rewritten into Python syntax and walked node by node;
+    # anything outside the whitelist is unsupported rather than executed
+    expression = js_to_python(expression)
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise UnsupportedAssertion(f"unsupported javascript: {e.msg}") from e
+    names = {"output": output, "context": {"vars": variables}}
+
+    def walk(node):
+        if isinstance(node, ast.Expression):
+            return walk(node.body)
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in names:
+            return names[node.id]
+        if isinstance(node, ast.BoolOp):
+            values = [walk(value) for value in node.values]
+            return all(values) if isinstance(node.op, ast.And) else any(values)
+        if isinstance(node, ast.UnaryOp):
+            value = walk(node.operand)
+            if isinstance(node.op, ast.Not):
+                return not value
+            if isinstance(node.op, ast.USub):
+                return -value
+            if isinstance(node.op, ast.UAdd):
+                return +value
+        if isinstance(node, ast.BinOp) and type(node.op) in BIN_OPS:
+            return BIN_OPS[type(node.op)](walk(node.left), walk(node.right))
+        if isinstance(node, ast.Compare):
+            left = walk(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = walk(comparator)
+                if type(op) not in COMPARE_OPS or not COMPARE_OPS[type(op)](left, right):
+                    return False
+                left = right
+            return True
+        if isinstance(node, ast.Attribute):
+            value = walk(node.value)
+            if node.attr == "length":
+                return len(value)
+            if isinstance(value, dict) and node.attr in value:
+                return value[node.attr]
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            args = [walk(arg) for arg in node.args]
+            if isinstance(node.func.value, ast.Name) and (node.func.value.id, node.func.attr) in JS_GLOBALS:
+                return JS_GLOBALS[(node.func.value.id, node.func.attr)](*args)
+            target = walk(node.func.value)
+            if isinstance(target, str) and node.func.attr in JS_STRING_METHODS:
+                return JS_STRING_METHODS[node.func.attr](target, *args)
+        raise UnsupportedAssertion(f"unsupported javascript: {ast.dump(node)[:60]}")
+
+    return walk(tree)
+
+
+def check_assertion(assertion, output, variables):
+    """Returns (passed, score); passed is None when the assertion type isn't supported."""
+    kind = assertion.get("type", "")
+    negate = kind.startswith("not-")
+    if negate:
+        kind = kind[len("not-"):]
+    value = assertion.get("value")
+    if isinstance(value, str):
+        value = render(value, variables)
+    elif isinstance(value, list):
+        value = [render(v, variables) if isinstance(v, str) else v for v in value]
+    lowered = output.lower()
+    score = None
+
+    try:
+        if kind == "equals":
+            passed = output.strip() == str(value).strip()
+        elif kind == "contains":
+            passed = str(value) in output
+        elif kind == "icontains":
+            passed = str(value).lower() in lowered
+        elif kind == "contains-any":
+            passed = any(str(v) in output for v in value)
+        elif kind == "icontains-any":
+            passed = any(str(v).lower() in lowered for v in value)
+        elif kind == "contains-all":
+            passed = all(str(v) in output for v in value)
+        elif kind == "icontains-all":
+            passed = all(str(v).lower() in lowered for v in value)
+        elif kind == "starts-with":
+            passed = output.startswith(str(value))
+        elif kind == "regex":
+            passed = re.search(str(value), output) is not None
+        elif kind == "is-json":
+            try:
+                json.loads(output)
+                passed = True
+            except ValueError:
+                passed = False
+        elif kind == "javascript":
+            result = js_eval(str(value), output, variables)
+            if isinstance(result, bool) or result is None:
+                passed = bool(result)
+            else:
+                score = float(result)
+                threshold = assertion.get("threshold")
+                passed = score >= threshold if threshold is not None else score > 0
+        else:
+            return None, None
+    except UnsupportedAssertion:
+        return None, None
+    except Exception:
+        # The expression itself failed on this output (e.g. JSON.parse on plain text)
+        passed = False
+    return (not passed if negate else passed), score
+
+
+# --- running --------------------------------------------------------------------------------
+
+async def stream_completion(client, base_url, provider, prompt):
+    if provider["endpoint"] == "chat":
+        url = f"{base_url}/api/chat"
+        payload = {"model": provider["model"], "messages": [{"role": "user", "content": prompt}], "stream": True}
+    else:
+        url = f"{base_url}/api/generate"
+        payload = {"model": provider["model"], "prompt": prompt, "stream": True}
+    if provider["options"]:
+        payload["options"] = provider["options"]
+
+    start = time.perf_counter()
+    first_token = None
+    pieces, chunks, final = [], 0, {}
+    async with client.stream("POST", url, json=payload) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise RuntimeError(chunk["error"])
+            text = chunk["message"].get("content", "") if "message" in chunk else chunk.get("response", "")
+            if text:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                pieces.append(text)
+                chunks += 1
+            if chunk.get("done"):
+                # No break: reading to the end of the stream returns the connection to the pool
+                final = chunk
+    end = time.perf_counter()
+
+    # Ollama reports generated tokens and their generation time in the final chunk
+    tokens = final.get("eval_count", chunks)
+    if final.get("eval_duration"):
+        generation_seconds = final["eval_duration"] / 1e9
+    else:
+        generation_seconds = end - (first_token or start)
+    return {
+        "output": "".join(pieces),
+        "latency_ms": (end - start) * 1000,
+        "ttft_ms": ((first_token or end) - start) * 1000,
+        "completion_tokens": tokens,
+        "tokens_per_second": tokens / generation_seconds if generation_seconds > 0 else 0.0,
+    }
+
+
+async def run_case(client, base_url, provider, semaphore, prompt_index, prompt, test, repeat, on_result):
+    rendered = render(prompt, test["vars"])
+    result = {"provider": provider["id"], "prompt_index": prompt_index, "vars": test["vars"], "repeat": repeat}
+    async with semaphore:
+        try:
+            result.update(await stream_completion(client, base_url, provider, rendered))
+            result["error"] = None
+        except (httpx.HTTPError, RuntimeError, ValueError) as e:
+            result.update({"output": "", "error": str(e) or type(e).__name__})
+
+    assertions = []
+    if result["error"] is None:
+        for assertion in test["assert"]:
+            passed, score = check_assertion(assertion, result["output"], test["vars"])
+            assertions.append({"type": assertion.get("type"), "passed": passed, "score": score})
+    result["assertions"] = assertions
+    result["passed"] = result["error"] is None and all(a["passed"] is not False for a in assertions)
+    on_result(result)
+    return result
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(prompts, providers, results):
+    cells = []
+    for provider in providers:
+        for prompt_index, prompt in enumerate(prompts):
+            cell = [r for r in results if r["provider"] == provider["id"] and r["prompt_index"] == prompt_index]
+            ok = [r for r in cell if r["error"] is None]
+            latencies = sorted(r["latency_ms"] for r in ok)
+            cells.append({
+                "provider": provider["id"],
+                "prompt": prompt,
+                "runs": len(cell),
+                "errors": len(cell) - len(ok),
+                "pass_rate": round(sum(r["passed"] for r in cell) / len(cell), 3) if cell else 0.0,
+                "skipped_assertions": sum(1 for r in cell for a in r["assertions"] if a["passed"] is None),
+                "latency_ms": {
+                    "mean": round(statistics.mean(latencies), 1) if latencies else 0.0,
+                    "p50": round(percentile(latencies, 50), 1),
+                    "p95": round(percentile(latencies, 95), 1),
+                },
+                "ttft_ms": round(statistics.mean(r["ttft_ms"] for r in ok), 1) if ok else 0.0,
+                "tokens_per_second": round(statistics.mean(r["tokens_per_second"] for r in ok), 1) if ok else 0.0,
+            })
+    return cells
+
+
+async def run(args):
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    provider_specs = args.providers.split(",") if args.providers else None
+    overrides = dict((item.rsplit("=", 1)[0], int(item.rsplit("=", 1)[1])) for item in args.provider_concurrency)
+    prompts, providers, tests, skipped = load_matrix(config, provider_specs, args.concurrency, overrides)
+    if skipped:
+        print(f"Skipping non-Ollama providers: {', '.join(skipped)}", file=sys.stderr)
+    if not providers:
+        raise SystemExit("No ollama: providers to run (use --providers ollama:<model>)")
+
+    total = len(prompts) * len(providers) * len(tests) * args.repeat
+    done = 0
+
+    def on_result(result):
+        # Printed as each response completes, not at the end of the run
+        nonlocal done
+        done += 1
+        if args.quiet:
+            return
+        status = "ERROR" if result["error"] else ("PASS" if result["passed"] else "FAIL")
+        timing = "" if result["error"] else f"{result['latency_ms']:.0f}ms  {result['tokens_per_second']:.1f} tok/s"
+        print(f"[{done}/{total}] {status:<5} {result['provider']}  prompt {result['prompt_index']}  "
+              f"{json.dumps(result['vars'])}  {timing}{result['error'] or ''}", file=sys.stderr)
+
+    base_url = (args.base_url or os.environ.get("OLLAMA_BASE_URL") or os.environ.get("OLLAMA_HOST")
+                or DEFAULT_OLLAMA_URL).rstrip("/")
+    if not base_url.startswith("http"):
+        base_url = f"http://{base_url}"
+    connections = sum(provider["concurrency"] for provider in providers)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    semaphores = {provider["id"]: asyncio.Semaphore(provider["concurrency"]) for provider in providers}
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(args.timeout, connect=10)) as client:
+        results = await asyncio.gather(*(
+            run_case(client, base_url, provider, semaphores[provider["id"]], prompt_index, prompt, test, repeat,
+                     on_result)
+            for repeat in range(args.repeat)
+            for provider in providers
+            for prompt_index, prompt in enumerate(prompts)
+            for test in tests
+        ))
+    elapsed = time.perf_counter() - start
+    return {
+        "base_url": base_url,
+        "elapsed_seconds": round(elapsed, 2),
+        "calls": len(results),
+        "passed": sum(r["passed"] for r in results),
+        "cells": summarize(prompts, providers, results),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a promptfoo-style matrix against local Ollama models")
+    parser.add_argument("--config", default="promptfooconfig.yaml")
+    parser.add_argument("--providers", help="Comma-separated provider ids replacing the config's, e.g. ollama:gemma:2b")
+    parser.add_argument("--concurrency", type=int, default=2, help="Calls in flight per provider")
+    parser.add_argument("--provider-concurrency", action="append", default=[], metavar="ID=N",
+                        help="Per-provider limit, e.g. ollama:gemma:2b=4 (repeatable)")
+    parser.add_argument("--repeat", type=int, default=1, help="Run every cell this many times")
+    parser.add_argument("--base-url", help=f"Ollama URL (default: $OLLAMA_BASE_URL, $OLLAMA_HOST or {DEFAULT_OLLAMA_URL})")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Write all results as JSON to this file")
+    parser.add_argument("--json", action="store_true", help="Print the per-cell summary as JSON")
+    parser.add_argument("--quiet", action="store_true", help="Don't print each result as it arrives")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps({k: v for k, v in report.items() if k != "results"}, indent=2))
+    else:
+        print(f"{report['passed']}/{report['calls']} passed in {report['elapsed_seconds']}s against {report['base_url']}")
+        for cell in report["cells"]:
+            latency = cell["latency_ms"]
+            prompt = cell["prompt"] if len(cell["prompt"]) <= 40 else cell["prompt"][:37] + "..."
+            skipped = f"   {cell['skipped_assertions']} skipped" if cell["skipped_assertions"] else ""
+            print(f"  {cell['provider']:<24} {prompt!r:<44} pass {cell['pass_rate'] * 100:5.1f}%   "
+                  f"latency {latency['mean']:>7}ms (p95 {latency['p95']})   ttft {cell['ttft_ms']:>6}ms   "
+                  f"{cell['tokens_per_second']:>6} tok/s   errors {cell['errors']}{skipped}")
+    if report["passed"] != report["calls"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Stand-in for a local Ollama server, for running matrix_runner.py without models.
+
+    python ollama_stub.py --port 11435 --ttft-ms 150 --token-ms 20
+    OLLAMA_BASE_URL=http://localhost:11435 python matrix_runner.py --providers ollama:gemma:2b
+
+Streams /api/generate and /api/chat as NDJSON the way Ollama does: one chunk per token, then
+a final chunk with done=true and the prompt_eval_count/eval_count/eval_duration counters.
+The answer repeats the prompt, so icontains assertions on prompt variables pass.
+GET /stub/stats reports requests and TCP connections (to check that clients reuse them).
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+stats = {"requests": 0, "connections": 0, "tokens": 0}
+stats_lock = threading.Lock()
+
+
+def count(**increments):
+    with stats_lock:
+        for key, value in increments.items():
+            stats[key] += value
+
+
+def answer_tokens(prompt, model, max_tokens):
+    words = f"Stub {model} says: {prompt}".split()
+    return [word + " " for word in words][:max_tokens]
+
+
+def make_handler(ttft, token_delay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, chunked streaming
+
+        def setup(self):
+            super().setup()
+            count(connections=1)
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, body):
+            data = (json.dumps(body) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/version":
+                self._send_json(200, {"version": "stub"})
+            elif self.path == "/api/tags":
+                self._send_json(200, {"models": []})
+            elif self.path == "/stub/stats":
+                with stats_lock:
+                    self._send_json(200, dict(stats))
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path not in ("/api/generate", "/api/chat"):
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": "invalid JSON"})
+                return
+            chat = self.path == "/api/chat"
+            model = body.get("model", "stub")
+            prompt = body["messages"][-1]["content"] if chat else body.get("prompt", "")
+            max_tokens = int((body.get("options") or {}).get("num_predict", 64))
+            if max_tokens < 0:
+                max_tokens = 64
+            tokens = answer_tokens(prompt, model, max_tokens)
+            count(requests=1, tokens=len(tokens))
+
+            def chunk(text, done, **extra):
+                base = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "done": done}
+                if chat:
+                    base["message"] = {"role": "assistant", "content": text}
+                else:
+                    base["response"] = text
+                return {**base, **extra}
+
+            start = time.perf_counter()
+            if not body.get("stream", True):
+                time.sleep(ttft + token_delay * len(tokens))
+                self._send_json(200, chunk("".join(tokens), True, prompt_eval_count=len(prompt.split()),
+                                           eval_count=len(tokens),
+                                           eval_duration=int(token_delay * len(tokens) * 1e9),
+                                           total_duration=int((time.perf_counter() - start) * 1e9)))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(ttft)
+            generation_start = time.perf_counter()
+            for token in tokens:
+                self._write_chunk(chunk(token, False))
+                time.sleep(token_delay)
+            self._write_chunk(chunk("", True, done_reason="stop", prompt_eval_count=len(prompt.split()),
+                                    eval_count=len(tokens),
+                                    eval_duration=int((time.perf_counter() - generation_start) * 1e9),
+                                    total_duration=int((time.perf_counter() - start) * 1e9)))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama server with streaming responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft-ms", type=float, default=100.0, help="Delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="Delay between tokens")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.ttft_ms / 1000, args.token_ms / 1000))
+    print(f"Stub Ollama on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+import yaml
+
+import matrix_runner
+import ollama_stub
+from matrix_runner import UnsupportedAssertion, js_eval
+
+# The stub stands in for `ollama serve`: it answers "Stub <model> says: <prompt>", so
+# assertions on the prompt's variables pass and assertions on anything else fail
+
+
+@pytest.fixture
+def stub_url():
+    with ollama_stub.stats_lock:
+        for key in ollama_stub.stats:
+            ollama_stub.stats[key] = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ollama_stub.make_handler(0.01, 0.001))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def stub_stats(url):
+    with urllib.request.urlopen(f"{url}/stub/stats") as response:
+        return json.load(response)
+
+
+def run_matrix(tmp_path, url, config, providers, concurrency=2, repeat=1):
+    path = tmp_path / "promptfooconfig.yaml"
+    path.write_text(yaml.safe_dump(config))
+    args = argparse.Namespace(config=str(path), providers=providers, concurrency=concurrency,
+                              provider_concurrency=[], repeat=repeat, base_url=url, timeout=30.0, quiet=True)
+    return asyncio.run(matrix_runner.run(args))
+
+
+@pytest.mark.parametrize("expression, output, expected", [
+    ("output.includes('a && b')", "x a && b", True),
+    ("output.includes('a || b')", "x a && b", False),
+    ("output.includes('!') && !output.includes('true')", "hi!", True),
+    ('output === "null"', "null", True),
+    ("output.includes('?') || output.length > 10", "why?", True),
+    ("output.length > 3 && output.toLowerCase().includes('x')", "aXbc", True),
+])
+def test_js_eval_keeps_string_literals(expression, output, expected):
+    assert js_eval(expression, output, {}) is expected
+
+
+def test_js_eval_rejects_statements():
+    with pytest.raises(UnsupportedAssertion):
+        js_eval("(() => { return true })()", "x", {})
+
+
+def test_matrix_against_stub(tmp_path, stub_url):
+    config = {
+        "prompts": ["Write a tweet about {{topic}}", "Write a funny tweet about {{topic}}"],
+        "providers": ["openai:gpt-5"],
+        "tests": [
+            {"vars": {"topic": "bananas"}, "assert": [{"type": "icontains", "value": "{{topic}}"}]},
+            {"vars": {"topic": "a && b"}, "assert": [{"type": "javascript", "value": "output.includes('a && b')"}]},
+            {"vars": {"topic": "pears"}, "assert": [{"type": "contains", "value": "apples"}]},
+        ],
+    }
+    report = run_matrix(tmp_path, stub_url, config, "ollama:gemma:2b,ollama:chat:llama3", concurrency=2, repeat=2)
+
+    assert report["calls"] == 2 * 2 * 3 * 2
+    assert report["passed"] == 2 * 2 * 2 * 2
+    assert len(report["cells"]) == 4
+    for cell in report["cells"]:
+        assert cell["errors"] == 0
+        assert cell["pass_rate"] == pytest.approx(2 / 3, abs=0.001)
+        assert cell["ttft_ms"] > 0 and cell["tokens_per_second"] > 0
+
+    # Calls share keep-alive connections: at most one per slot (2 providers x 2), not one per
+    # call; the stats request itself opens one more
+    stats = stub_stats(stub_url)
+    assert stats["requests"] == report["calls"]
+    assert stats["connections"] <= 4 + 1
@@ -0,0 +1,86 @@
+# bench_telemetry.py
+# Measure /chat latency of a running app and how its traces are exported.
+# Run it once against TELEMETRY_MODE=sync and once against TELEMETRY_MODE=background
+# (both pointed at src/fake_langfuse.py) to see the latency the SDK's background export saves;
+# --langfuse-url reads what actually reached the fake Langfuse.
+#
+#   python bench_telemetry.py --url http://localhost:4000 --requests 200 --concurrency 4
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def send(client, url, i):
+    start = time.perf_counter()
+    # Unique messages and cache bypass: every request takes the full upstream + tracing path
+    response = client.post(f'{url}/chat', json={'message': f'Benchmark question {i}', 'user_id': 'bench', 'cache': False})
+    return response.status_code == 200, (time.perf_counter() - start) * 1000
+
+
+def run(args):
+    with httpx.Client(timeout=args.timeout) as client:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda i: send(client, args.url, i), range(args.requests)))
+        elapsed = time.perf_counter() - start
+        if args.settle:
+            time.sleep(args.settle)  # let the SDK's background export catch up before reading the fake's counts
+        telemetry = client.get(f'{args.url}/telemetry/stats').json()
+        langfuse = client.get(f'{args.langfuse_url}/stats').json() if args.langfuse_url else None
+
+    latencies = sorted(ms for ok, ms in results if ok)
+    return {
+        'url': args.url,
+        'requests': len(latencies),
+        'errors': sum(1 for ok, _ in results if not ok),
+        'concurrency': args.concurrency,
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            'p50': round(percentile(latencies, 50), 1),
+            'p95': round(percentile(latencies, 95), 1),
+            'p99': round(percentile(latencies, 99), 1),
+        },
+        'telemetry': telemetry,
+        'langfuse': langfuse,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure /chat latency and trace export of the Langfuse app')
+    parser.add_argument('--url', default='http://localhost:4000')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--langfuse-url', help='fake_langfuse.py URL, e.g. http://localhost:3100, to report received traces')
+    parser.add_argument('--settle', type=float, default=3.0, help='Seconds to wait for the background export before reading stats')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable results')
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    latency = result['latency_ms']
+    telemetry = result['telemetry']
+    print(f"{result['url']} ({telemetry.get('mode')}): {result['requests']} ok, {result['errors']} errors, "
+          f"{result['requests_per_sec']} req/s")
+    print(f"  latency   mean {latency['mean']}ms   p50 {latency['p50']}ms   p95 {latency['p95']}ms   p99 {latency['p99']}ms")
+    if result['langfuse']:
+        langfuse = result['langfuse']
+        print(f"  langfuse  {langfuse['otel_requests']} OTLP requests ({langfuse['otel_bytes']} bytes), "
+              f"{langfuse['ingestion_events']} score events in {langfuse['ingestion_requests']} requests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# load_test.py
+# Compare requests/sec and latency of the Flask app (src/app.py) and the ASGI app
+# (src/asgi_app.py) under the same number of concurrent clients.
+#
+#   python load_test.py --flask-url http://localhost:4000 --asgi-url http://localhost:4001 --clients 50
+#   python load_test.py --asgi-url http://localhost:4001 --flask-url "" --clients 200 --json
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from bench_telemetry import percentile
+
+
+async def client_loop(client, url, deadline, worker, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        # Unique messages and cache bypass: every request goes to the model
+        payload = {'message': f'Load test question {worker}-{i}', 'user_id': 'load-test', 'cache': False}
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.post(f'{url}/chat', json=payload)
+            ok = response.status_code == 200 and 'trace_id' in response.json()
+        except (httpx.HTTPError, ValueError):
+            ok = False
+        (latencies if ok else errors).append((time.perf_counter() - start) * 1000)
+
+
+async def run_target(name, url, args):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            client_loop(client, url, deadline, worker, latencies, errors) for worker in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'name': name,
+        'url': url,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 1),
+            'p95': round(percentile(latencies, 95), 1),
+            'p99': round(percentile(latencies, 99), 1),
+            'max': round(latencies[-1], 1) if latencies else 0.0,
+        },
+    }
+
+
+async def run(args):
+    results = []
+    for name, url in (('flask', args.flask_url), ('asgi', args.asgi_url)):
+        if url:
+            results.append(await run_target(name, url, args))
+    return {'clients': args.clients, 'duration': args.duration, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Flask and ASGI /chat endpoints')
+    parser.add_argument('--flask-url', default='http://localhost:4000', help='Empty to skip')
+    parser.add_argument('--asgi-url', default='http://localhost:4001', help='Empty to skip')
+    parser.add_argument('--clients', type=int, default=50, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per target')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable results')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['clients']} clients, {result['duration']}s per target")
+    for r in result['results']:
+        latency = r['latency_ms']
+        print(f"  {r['name']:<6} {r['requests_per_sec']:>7} req/s   p50 {latency['p50']}ms   p95 {latency['p95']}ms   "
+              f"p99 {latency['p99']}ms   errors {r['errors']}")
+
+
+if __name__ == '__main__':
+    main()
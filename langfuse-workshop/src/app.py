@@ -16,7 +16,12 @@ import os
 from dotenv import load_dotenv
 from langfuse import Langfuse
 from langfuse import types as lf_types
+import openai
 from openai import OpenAI
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+from response_cache import ResponseCache
+import signal
+import sys
 
 # Load environment variables
 if os.path.exists('.env'):
@@ -24,17 +29,61 @@ if os.path.exists('.env'):
 elif os.path.exists('.env.template'):
     load_dotenv('.env.template')
 
+# Telemetry: 'background' leaves trace export to the Langfuse SDK's batching (a span
+# processor thread sends every TELEMETRY_FLUSH_AT spans or TELEMETRY_FLUSH_INTERVAL seconds),
+# 'sync' flushes to Langfuse inside every request (the old behavior, for comparison)
+TELEMETRY_MODE = os.environ.get('TELEMETRY_MODE', 'background')
+TELEMETRY_FLUSH_AT = int(os.environ.get('TELEMETRY_FLUSH_AT', '50'))
+TELEMETRY_FLUSH_INTERVAL = float(os.environ.get('TELEMETRY_FLUSH_INTERVAL', '2'))
+
 # Initialize clients
 lf = Langfuse(
     public_key=os.environ.get('LANGFUSE_PUBLIC_KEY'),
     secret_key=os.environ.get('LANGFUSE_SECRET_KEY'),
-    host=os.environ.get('LANGFUSE_HOST', 'https://cloud.langfuse.com')
+    host=os.environ.get('LANGFUSE_HOST', 'https://cloud.langfuse.com'),
+    flush_at=TELEMETRY_FLUSH_AT,
+    flush_interval=TELEMETRY_FLUSH_INTERVAL
 )
 
 client = OpenAI(
     api_key=os.environ.get('OPENAI_API_KEY')
 )
 
+# Response cache keyed by (model, normalized messages); send "cache": false to bypass it
+MODEL = 'gpt-4'
+CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+CACHE_EMBEDDING_MODEL = os.environ.get('CACHE_EMBEDDING_MODEL', 'text-embedding-3-small')
+cache = ResponseCache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '10000')),
+    ttl=float(os.environ.get('CACHE_TTL', '3600')),
+    disk_path=os.environ.get('CACHE_DISK_PATH') or None,
+    max_disk_entries=int(os.environ.get('CACHE_DISK_MAX_ENTRIES', '100000')),
+    similarity_threshold=float(os.environ.get('CACHE_SIMILARITY_THRESHOLD') or 0) or None,
+) if CACHE_ENABLED else None
+
+def embed(message):
+    # Embedding for the semantic cache tier; a failure only disables the near-duplicate lookup
+    try:
+        return client.embeddings.create(model=CACHE_EMBEDDING_MODEL, input=message).data[0].embedding
+    except openai.APIError:
+        return None
+
+def finish_trace(span, data, answer, cached):
+    """Fill in the span, trace and score of a /chat request; call inside its span."""
+    span.update(
+        name='response-cache' if cached else 'openai-completion',
+        output=answer,
+        metadata={'model': MODEL, 'response_preview': answer[:200] if answer else None, 'cached': cached}
+    )
+    span.update_trace(name='chat-endpoint', user_id=data.get('user_id', 'anonymous'),
+                      metadata={'request_message': data.get('message')})
+    span.score_trace(name='response_length', value=len(answer) if answer else 0)
+
+def telemetry_flush():
+    # Background mode: the SDK exports in batches off the request thread (and flushes at exit)
+    if TELEMETRY_MODE == 'sync':
+        lf.flush()
+
 app = Flask(__name__)
 
 @app.route('/chat', methods=['POST'])
@@ -43,17 +92,28 @@ def chat():
     if not data or 'message' not in data:
         return jsonify({'error': 'message is required'}), 400
 
+    messages = [{'role': 'user', 'content': data['message']}]
+    use_cache = cache is not None and data.get('cache', True)
+
     try:
-        # Create a trace id and set trace metadata
+        # Create a trace id; the span covers the cache lookup and the OpenAI call
         trace_id = lf.create_trace_id()
-        lf.update_current_trace(name='chat-endpoint', user_id=data.get('user_id', 'anonymous'), metadata={'request_message': data.get('message')})
-
-        # Use a span context manager for the OpenAI call
         trace_context = lf_types.TraceContext(trace_id=trace_id)
-        with lf.start_as_current_span(trace_context=trace_context, name='openai-completion') as span:
+        with lf.start_as_current_span(trace_context=trace_context, name='openai-completion', input=data['message']) as span:
+            embedding = None
+            if use_cache:
+                if cache.semantic:
+                    embedding = embed(data['message'])
+                cached = cache.get(MODEL, messages, embedding=embedding)
+                if cached is not None:
+                    answer = cached['response']
+                    finish_trace(span, data, answer, cached=True)
+                    telemetry_flush()
+                    return jsonify({'response': answer, 'trace_id': trace_id, 'cached': True})
+
             resp = client.chat.completions.create(
-                model='gpt-4',
-                messages=[{'role': 'user', 'content': data['message']}]
+                model=MODEL,
+                messages=messages
             )
 
             # Try to extract answer (supports multiple OpenAI SDK response shapes)
@@ -68,19 +128,52 @@ def chat():
                 if answer is None:
                     answer = str(resp)
 
-            # Update span with output and metadata (end() doesn't take parameters)
-            span.update(output=answer, metadata={'model': 'gpt-4', 'response_preview': answer[:200] if answer else None})
-            span.end()
+            if use_cache and answer is not None:
+                usage = getattr(resp, 'usage', None)
+                cache.put(MODEL, messages, {
+                    'response': answer,
+                    'usage': {'total_tokens': usage.total_tokens} if usage is not None else {}
+                }, embedding=embedding)
 
-        # Score and flush
-        lf.score_current_trace(name='response_length', value=len(answer) if answer else 0)
-        lf.flush()
+            finish_trace(span, data, answer, cached=False)
 
-        return jsonify({'response': answer, 'trace_id': trace_id})
+        telemetry_flush()
+        return jsonify({'response': answer, 'trace_id': trace_id, 'cached': False})
 
     except Exception as e:
+        # The span ended with the exception recorded on it
+        telemetry_flush()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/telemetry/stats', methods=['GET'])
+def telemetry_stats():
+    return jsonify({'mode': TELEMETRY_MODE, 'flush_at': TELEMETRY_FLUSH_AT, 'flush_interval': TELEMETRY_FLUSH_INTERVAL})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **cache.stats()})
+
+def metrics_payload():
+    # Cache hit/miss and tokens-saved counters (response_cache.py); with several gunicorn or
+    # uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory to aggregate them
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return metrics_payload(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+def stop(signum, frame):
+    # Exit normally on SIGTERM so the Langfuse SDK's atexit hook sends the buffered traces
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    sys.exit(0)
+
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, stop)
     debug_mode = os.environ.get('FLASK_DEBUG', 'true').lower() == 'true'
     app.run(host='0.0.0.0', port=4000, debug=debug_mode)
\ No newline at end of file
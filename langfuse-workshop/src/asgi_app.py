@@ -0,0 +1,135 @@
+# asgi_app.py
+# ASGI version of the /chat endpoint in app.py: same request/response, cache and Langfuse
+# trace/span/score, but the OpenAI call is awaited on a shared connection pool, so one worker
+# serves many requests while they wait for the model.
+#
+#   uvicorn asgi_app:app --app-dir src --port 4001 --workers 2
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+import openai
+from openai import AsyncOpenAI
+
+from langfuse import types as lf_types
+
+# Reuse the Langfuse client and cache (and their settings) of the Flask app
+from app import (CACHE_EMBEDDING_MODEL, CONTENT_TYPE_LATEST, MODEL, TELEMETRY_FLUSH_AT, TELEMETRY_FLUSH_INTERVAL,
+                 TELEMETRY_MODE, cache, finish_trace, lf, metrics_payload, telemetry_flush)
+
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', '100'))  # in-flight OpenAI calls per worker
+OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', '100'))
+OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', '60'))
+
+client: AsyncOpenAI = None
+openai_slots: asyncio.Semaphore = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, openai_slots
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_CONNECTIONS),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=5),
+    )
+    client = AsyncOpenAI(api_key=os.environ.get('OPENAI_API_KEY'), http_client=http_client)
+    openai_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    yield
+    await client.close()
+    await http_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def cache_call(method, *args, **kwargs):
+    # The disk tier and the similarity scan block, so keep them off the event loop
+    if cache.disk_path or cache.semantic:
+        return await asyncio.to_thread(method, *args, **kwargs)
+    return method(*args, **kwargs)
+
+
+async def embed(message):
+    # Embedding for the semantic cache tier; a failure only disables the near-duplicate lookup
+    try:
+        result = await client.embeddings.create(model=CACHE_EMBEDDING_MODEL, input=message)
+    except openai.APIError:
+        return None
+    return result.data[0].embedding
+
+
+async def flush():
+    if TELEMETRY_MODE == 'sync':
+        # Flush to Langfuse without blocking the event loop
+        await asyncio.to_thread(telemetry_flush)
+
+
+@app.post('/chat')
+async def chat(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data or 'message' not in data:
+        return JSONResponse({'error': 'message is required'}, status_code=400)
+
+    messages = [{'role': 'user', 'content': data['message']}]
+    use_cache = cache is not None and data.get('cache', True)
+
+    try:
+        # The span covers the cache lookup and the awaited OpenAI call. Its context lives in a
+        # contextvar, so concurrent requests on the event loop each keep their own current span.
+        trace_id = lf.create_trace_id()
+        trace_context = lf_types.TraceContext(trace_id=trace_id)
+        with lf.start_as_current_span(trace_context=trace_context, name='openai-completion', input=data['message']) as span:
+            embedding = None
+            if use_cache:
+                if cache.semantic:
+                    embedding = await embed(data['message'])
+                cached = await cache_call(cache.get, MODEL, messages, embedding=embedding)
+                if cached is not None:
+                    answer = cached['response']
+                    finish_trace(span, data, answer, cached=True)
+                    await flush()
+                    return {'response': answer, 'trace_id': trace_id, 'cached': True}
+
+            async with openai_slots:
+                resp = await client.chat.completions.create(model=MODEL, messages=messages)
+            answer = resp.choices[0].message.content
+
+            if use_cache and answer is not None:
+                usage = resp.usage
+                await cache_call(cache.put, MODEL, messages, {
+                    'response': answer,
+                    'usage': {'total_tokens': usage.total_tokens} if usage is not None else {}
+                }, embedding=embedding)
+
+            finish_trace(span, data, answer, cached=False)
+
+        await flush()
+        return {'response': answer, 'trace_id': trace_id, 'cached': False}
+
+    except Exception as e:
+        # The span ended with the exception recorded on it
+        await flush()
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.get('/telemetry/stats')
+def telemetry_stats():
+    return {'mode': TELEMETRY_MODE, 'flush_at': TELEMETRY_FLUSH_AT, 'flush_interval': TELEMETRY_FLUSH_INTERVAL}
+
+
+@app.get('/cache/stats')
+def cache_stats():
+    if cache is None:
+        return {'enabled': False}
+    return {'enabled': True, **cache.stats()}
+
+
+@app.get('/metrics')
+def metrics():
+    return Response(metrics_payload(), media_type=CONTENT_TYPE_LATEST)
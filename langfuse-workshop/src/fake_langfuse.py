@@ -0,0 +1,66 @@
+# fake_langfuse.py
+# Local stand-in for the Langfuse ingestion API (and an OpenAI-compatible chat endpoint) so the
+# cost of exporting traces can be measured without accounts, keys or network noise.
+#
+#   python src/fake_langfuse.py                  # listens on :3100
+#   LANGFUSE_HOST=http://localhost:3100 OPENAI_BASE_URL=http://localhost:3100/v1 python src/app.py
+#
+# FAKE_LANGFUSE_LATENCY_MS delays every ingestion request (a Langfuse round trip);
+# FAKE_OPENAI_LATENCY_MS delays every chat completion.
+from flask import Flask, request, jsonify
+import os
+import threading
+import time
+import uuid
+
+FAKE_LANGFUSE_LATENCY_MS = float(os.environ.get('FAKE_LANGFUSE_LATENCY_MS', '80'))
+FAKE_OPENAI_LATENCY_MS = float(os.environ.get('FAKE_OPENAI_LATENCY_MS', '200'))
+
+app = Flask(__name__)
+counts = {'otel_requests': 0, 'otel_bytes': 0, 'ingestion_requests': 0, 'ingestion_events': 0, 'completions': 0}
+counts_lock = threading.Lock()
+
+def count(**increments):
+    with counts_lock:
+        for key, value in increments.items():
+            counts[key] += value
+
+@app.route('/api/public/otel/v1/traces', methods=['POST'])
+def otel_traces():
+    # Spans arrive as OTLP protobuf; only their volume matters here
+    time.sleep(FAKE_LANGFUSE_LATENCY_MS / 1000)
+    count(otel_requests=1, otel_bytes=len(request.get_data()))
+    return '', 200
+
+@app.route('/api/public/ingestion', methods=['POST'])
+def ingestion():
+    # Scores and other events, answered like Langfuse does (207 with one status per event)
+    time.sleep(FAKE_LANGFUSE_LATENCY_MS / 1000)
+    batch = (request.get_json(silent=True) or {}).get('batch', [])
+    count(ingestion_requests=1, ingestion_events=len(batch))
+    return jsonify({'successes': [{'id': event.get('id'), 'status': 201} for event in batch], 'errors': []}), 207
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    time.sleep(FAKE_OPENAI_LATENCY_MS / 1000)
+    body = request.get_json(silent=True) or {}
+    prompt = ' '.join(str(message.get('content', '')) for message in body.get('messages', []))
+    prompt_tokens = max(1, len(prompt) // 4)
+    count(completions=1)
+    return jsonify({
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'fake'),
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': f'Fake answer to: {prompt[:80]}'},
+                     'finish_reason': 'stop'}],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 20, 'total_tokens': prompt_tokens + 20},
+    })
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    with counts_lock:
+        return jsonify(counts)
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get('FAKE_LANGFUSE_PORT', '3100')), threaded=True)
@@ -0,0 +1,269 @@
+# response_cache.py
+# Vendored copy of llm-token-monitor/app/response_cache.py, which is the source: make changes
+# there and copy the file here (cmp must report no difference below the header).
+# Response cache for chat completions, keyed by (model, normalized messages, params).
+#
+# Tiers, checked in order:
+#   memory    LRU with TTL, always on
+#   disk      optional SQLite file shared by workers and restarts (CACHE_DISK_PATH), capped
+#             at max_disk_entries least recently used rows; expired rows are deleted
+#   semantic  optional near-duplicate lookup: the caller passes an embedding of the
+#             messages and the most similar cached entry above a cosine threshold is used
+#
+# Prometheus counters are exported when prometheus_client is installed.
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional: faster semantic lookups
+    np = None
+
+try:
+    from prometheus_client import Counter
+except ImportError:  # optional: stats() still works without Prometheus
+    Counter = None
+
+if Counter is not None:
+    cache_hits = Counter("llm_cache_hits", "Responses served from the cache", ["tier"])
+    cache_misses = Counter("llm_cache_misses", "Cache lookups that went upstream")
+    cache_tokens_saved = Counter("llm_cache_tokens_saved", "Tokens not spent thanks to cache hits", ["model"])
+else:
+    cache_hits = cache_misses = cache_tokens_saved = None
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Trim and collapse whitespace so trivially different prompts share an entry."""
+    return [
+        {"role": message.get("role", "user"), "content": _WHITESPACE.sub(" ", str(message.get("content", ""))).strip()}
+        for message in messages
+    ]
+
+
+def cache_key(model: str, messages: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> str:
+    payload = {"model": model, "messages": normalize_messages(messages), "params": params or {}}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 3600,
+        disk_path: Optional[str] = None,
+        similarity_threshold: Optional[float] = None,
+        max_semantic_entries: int = 2000,
+        max_disk_entries: int = 100000,
+    ):
+        """
+        max_entries: entries kept in memory (least recently used are evicted)
+        ttl: seconds an entry stays valid, in every tier
+        disk_path: SQLite file for the on-disk tier (None to disable)
+        max_disk_entries: rows kept on disk; enforced every max_disk_entries / 10 writes, so the
+            file can briefly hold 10% more
+        similarity_threshold: cosine similarity needed for a semantic hit (None to disable)
+        max_semantic_entries: embeddings kept for the semantic lookup (a linear scan)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self.max_disk_entries = max_disk_entries
+        self._purge_every = max(1, max_disk_entries // 10)
+        self._disk_writes = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        # scope (model + params) -> OrderedDict[key, embedding]
+        self._embeddings: Dict[str, "OrderedDict[str, Sequence[float]]"] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = {"memory": 0, "disk": 0, "semantic": 0}
+        self.misses = 0
+        self.tokens_saved = 0
+
+        if disk_path:
+            with self._db() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses"
+                    " (key TEXT PRIMARY KEY, expires_at REAL, value TEXT, accessed_at REAL DEFAULT 0)"
+                )
+                columns = [row[1] for row in db.execute("PRAGMA table_info(responses)")]
+                if "accessed_at" not in columns:  # file written by an older version
+                    db.execute("ALTER TABLE responses ADD COLUMN accessed_at REAL DEFAULT 0")
+                db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+                self._purge_disk(db)
+
+    @property
+    def semantic(self) -> bool:
+        return self.similarity_threshold is not None
+
+    def get(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        params: Optional[Dict[str, Any]] = None,
+        embedding: Optional[Sequence[float]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return the cached value or None. Pass `embedding` to enable the semantic lookup."""
+        key = cache_key(model, messages, params)
+        value = self._get_memory(key)
+        tier = "memory"
+        if value is None and self.disk_path:
+            value = self._get_disk(key)
+            tier = "disk"
+            if value is not None:
+                self._put_memory(key, value)
+        if value is None and embedding is not None and self.semantic:
+            similar = self._most_similar(self._scope(model, params), embedding)
+            if similar is not None:
+                value = self._get_memory(similar)
+                tier = "semantic"
+        self._record(model, tier if value is not None else None, value)
+        return value
+
+    def put(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        value: Dict[str, Any],
+        params: Optional[Dict[str, Any]] = None,
+        embedding: Optional[Sequence[float]] = None,
+    ) -> None:
+        """Store a JSON-serializable value, e.g. {"response": ..., "usage": {...}}."""
+        key = cache_key(model, messages, params)
+        self._put_memory(key, value)
+        if self.disk_path:
+            now = time.time()
+            with self._db() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, expires_at, value, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, now + self.ttl, json.dumps(value), now),
+                )
+                with self._lock:
+                    self._disk_writes += 1
+                    purge = self._disk_writes % self._purge_every == 0
+                if purge:
+                    self._purge_disk(db)
+        if embedding is not None and self.semantic:
+            with self._lock:
+                vectors = self._embeddings.setdefault(self._scope(model, params), OrderedDict())
+                vectors[key] = np.asarray(embedding, dtype=np.float32) if np is not None else list(embedding)
+                vectors.move_to_end(key)
+                while len(vectors) > self.max_semantic_entries:
+                    vectors.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = sum(self.hits.values()) + self.misses
+            return {
+                "entries": len(self._memory),
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_ratio": round(sum(self.hits.values()) / lookups, 4) if lookups else 0.0,
+                "tokens_saved": self.tokens_saved,
+            }
+
+    def _record(self, model: str, tier: Optional[str], value: Optional[Dict[str, Any]]) -> None:
+        tokens = 0
+        if value is not None:
+            tokens = (value.get("usage") or {}).get("total_tokens") or 0
+        with self._lock:
+            if tier is None:
+                self.misses += 1
+            else:
+                self.hits[tier] += 1
+                self.tokens_saved += tokens
+        if cache_hits is None:
+            return
+        if tier is None:
+            cache_misses.inc()
+        else:
+            cache_hits.labels(tier=tier).inc()
+            cache_tokens_saved.labels(model=model).inc(tokens)
+
+    @staticmethod
+    def _scope(model: str, params: Optional[Dict[str, Any]]) -> str:
+        # Near-duplicates only match within the same model and parameters
+        return json.dumps([model, params or {}], sort_keys=True)
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _put_memory(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = (time.monotonic() + self.ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _get_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._db() as db:
+            row = db.execute("SELECT expires_at, value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[0] < now:
+                db.execute("DELETE FROM responses WHERE key = ? AND expires_at < ?", (key, now))
+                return None
+            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[1])
+
+    def _purge_disk(self, db: sqlite3.Connection) -> None:
+        """Delete expired rows, then the least recently used ones beyond max_disk_entries."""
+        db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        db.execute(
+            "DELETE FROM responses WHERE key IN"
+            " (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread; the `with` block commits
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.disk_path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def _most_similar(self, scope: str, embedding: Sequence[float]) -> Optional[str]:
+        with self._lock:
+            candidates = list(self._embeddings.get(scope, {}).items())
+        if not candidates:
+            return None
+        if np is not None:
+            matrix = np.stack([vector for _, vector in candidates])
+            query = np.asarray(embedding, dtype=np.float32)
+            scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+            best = int(np.argmax(scores))
+            return candidates[best][0] if scores[best] >= self.similarity_threshold else None
+        best_key, best_score = None, self.similarity_threshold
+        for key, vector in candidates:
+            score = _cosine(embedding, vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
@@ -1,11 +1,20 @@
 # main.py
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+import httpx
 import openai
+import json
 import os
-from prometheus_client import Counter, generate_latest
-from fastapi.responses import PlainTextResponse
+import time
+import weakref
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
+from response_cache import ResponseCache
+from rate_limit import TokenBudgetExceeded, TokenRateLimiter, encoding_loaded, estimate_prompt_tokens, warm_encoding
 
 # Load environment variables from .env file
 load_dotenv(dotenv_path="../.env")  # Look for .env in parent directory
@@ -18,44 +27,385 @@ openai.api_key = os.getenv("OPENAI_API_KEY", "your-api-key")
 api_key = os.getenv("OPENAI_API_KEY", "not-found")
 print(f"API Key loaded: {api_key[:10]}..." if len(api_key) > 10 else f"API Key: {api_key}")
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=openai.api_key)
+# Upstream settings (e.g. OPENAI_BASE_URL=http://localhost:8100/v1 for app/mock_upstream.py)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "60"))            # seconds per completion
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "200"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "100"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "100"))  # in-flight upstream calls per worker
+QUEUE_TIMEOUT = float(os.getenv("QUEUE_TIMEOUT", "10"))                  # max wait for a free slot
+
+# Response cache (see app/response_cache.py), opt-in; streamed requests are never cached
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_DISK_PATH = os.getenv("CACHE_DISK_PATH") or None                   # SQLite file shared by workers
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("CACHE_DISK_MAX_ENTRIES", "100000"))  # LRU cap of the SQLite file
+CACHE_SIMILARITY_THRESHOLD = float(os.getenv("CACHE_SIMILARITY_THRESHOLD") or 0) or None  # e.g. 0.95
+CACHE_EMBEDDING_MODEL = os.getenv("CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Token budget per (user_id, model) and worker; 0 disables it (see app/rate_limit.py)
+RATE_LIMIT_TOKENS_PER_MINUTE = float(os.getenv("RATE_LIMIT_TOKENS_PER_MINUTE") or 0)
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST") or 0) or None       # default: one minute's budget
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "0"))        # seconds to queue before 429
+RATE_LIMIT_COMPLETION_TOKENS = int(os.getenv("RATE_LIMIT_COMPLETION_TOKENS", "256"))  # reserved per request
+# Models whose tokenizer is loaded at startup, so the first request doesn't wait for a download
+RATE_LIMIT_MODELS = [m.strip() for m in os.getenv("RATE_LIMIT_MODELS", "gpt-4.1").split(",") if m.strip()]
+TOKENIZER_WARMUP_TIMEOUT = float(os.getenv("TOKENIZER_WARMUP_TIMEOUT", "30"))
+# Longer prompts are counted on a worker thread instead of the event loop
+INLINE_TOKEN_COUNT_CHARS = 4000
+
+# Shared HTTP connection pool and async OpenAI client, created per worker at startup
+http_client: httpx.AsyncClient = None
+client: openai.AsyncOpenAI = None
+upstream_slots: asyncio.Semaphore = None
+response_cache = ResponseCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl=CACHE_TTL,
+    disk_path=CACHE_DISK_PATH,
+    similarity_threshold=CACHE_SIMILARITY_THRESHOLD,
+    max_disk_entries=CACHE_DISK_MAX_ENTRIES,
+) if CACHE_ENABLED else None
+rate_limiter = TokenRateLimiter(
+    RATE_LIMIT_TOKENS_PER_MINUTE,
+    burst=RATE_LIMIT_BURST,
+    max_wait=RATE_LIMIT_MAX_WAIT,
+) if RATE_LIMIT_TOKENS_PER_MINUTE > 0 else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client, client, upstream_slots
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            keepalive_expiry=30,
+        ),
+        timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+    )
+    client = openai.AsyncOpenAI(
+        api_key=openai.api_key,
+        base_url=OPENAI_BASE_URL,
+        http_client=http_client,
+        max_retries=UPSTREAM_MAX_RETRIES,
+    )
+    upstream_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    if rate_limiter is not None:
+        for model in RATE_LIMIT_MODELS:
+            try:
+                await asyncio.wait_for(asyncio.to_thread(warm_encoding, model), timeout=TOKENIZER_WARMUP_TIMEOUT)
+            except asyncio.TimeoutError:
+                # Requests for this model count their tokens off the event loop until it is loaded
+                print(f"Tokenizer for {model} not loaded after {TOKENIZER_WARMUP_TIMEOUT}s; continuing")
+    yield
+    await client.close()
+    await http_client.aclose()
+
 
 # FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Prometheus metrics
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR (an empty directory) before
+# starting them; each worker then writes its samples there and /metrics aggregates them.
 token_counter_total = Counter("llm_tokens_total", "Total tokens used", ["model"])
 token_counter_prompt = Counter("llm_tokens_prompt", "Prompt tokens used", ["model"])
 token_counter_completion = Counter("llm_tokens_completion", "Completion tokens used", ["model"])
 
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+request_latency = Histogram(
+    "llm_request_duration_seconds", "End-to-end /chat latency", ["model", "status"], buckets=LATENCY_BUCKETS
+)
+upstream_latency = Histogram(
+    "llm_upstream_duration_seconds", "Time spent waiting for the upstream completion", ["model"], buckets=LATENCY_BUCKETS
+)
+tokens_per_second = Histogram(
+    "llm_completion_tokens_per_second", "Completion tokens per second of upstream time", ["model"],
+    buckets=(1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 300, 500)
+)
+requests_in_flight = Gauge(
+    "llm_requests_in_flight", "Requests currently being processed", multiprocess_mode="livesum"
+)
+request_errors = Counter("llm_request_errors", "Failed /chat requests", ["model", "error_type"])
+time_to_first_token = Histogram(
+    "llm_time_to_first_token_seconds", "Time from request to the first streamed token", ["model"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4, 8, 15)
+)
+rate_limit_wait = Histogram(
+    "llm_rate_limit_wait_seconds", "Time requests queued for their token budget", ["model"], buckets=LATENCY_BUCKETS
+)
+prompt_estimate_error = Histogram(
+    "llm_prompt_token_estimate_ratio", "Locally estimated / actual prompt tokens", ["model"],
+    buckets=(0.5, 0.8, 0.9, 0.95, 1, 1.05, 1.1, 1.25, 1.5, 2)
+)
+
 class PromptRequest(BaseModel):
     prompt: str
     model: str = "gpt-4.1"
+    stream: bool = False
+    cache: bool = True  # set to false to always call the upstream model
+    user_id: str = "anonymous"  # token budgets are tracked per user_id and model
 
-@app.post("/chat")
-async def chat(request: PromptRequest):
-    response = client.chat.completions.create(
-        model=request.model,
-        messages=[{"role": "user", "content": request.prompt}],
-    )
-    
-    usage = response.usage
-    
+def fail(model: str, error_type: str, status_code: int, detail: str, headers: dict = None) -> HTTPException:
+    request_errors.labels(model=model, error_type=error_type).inc()
+    return HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+def record_usage(model: str, usage, generation_seconds: float):
     # Update Prometheus metrics
-    token_counter_prompt.labels(model=request.model).inc(usage.prompt_tokens)
-    token_counter_completion.labels(model=request.model).inc(usage.completion_tokens)
-    token_counter_total.labels(model=request.model).inc(usage.total_tokens)
-    
+    token_counter_prompt.labels(model=model).inc(usage.prompt_tokens)
+    token_counter_completion.labels(model=model).inc(usage.completion_tokens)
+    token_counter_total.labels(model=model).inc(usage.total_tokens)
+    if generation_seconds > 0:
+        tokens_per_second.labels(model=model).observe(usage.completion_tokens / generation_seconds)
+
+def usage_dict(usage) -> dict:
     return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens
+    }
+
+async def acquire_slot(model: str):
+    # Bound in-flight upstream calls; shed load instead of queueing forever
+    try:
+        await asyncio.wait_for(upstream_slots.acquire(), timeout=QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise fail(model, "QueueTimeout", 503, "Too many concurrent requests")
+
+def messages_for(request: PromptRequest) -> list:
+    return [{"role": "user", "content": request.prompt}]
+
+async def reserve_tokens(request: PromptRequest) -> dict:
+    """Charge the estimated cost to the caller's budget before going upstream (429 when over it)."""
+    if rate_limiter is None:
+        return {}
+    messages = messages_for(request)
+    if encoding_loaded(request.model) and len(request.prompt) <= INLINE_TOKEN_COUNT_CHARS:
+        prompt_tokens = estimate_prompt_tokens(messages, request.model)
+    else:
+        # The first use of a model may download its BPE file; long prompts take a while to encode
+        prompt_tokens = await asyncio.to_thread(estimate_prompt_tokens, messages, request.model)
+    reserved = prompt_tokens + RATE_LIMIT_COMPLETION_TOKENS
+    try:
+        waited = await rate_limiter.acquire(request.user_id, request.model, reserved)
+    except TokenBudgetExceeded as e:
+        raise fail(request.model, "TokenBudgetExceeded", 429, str(e), headers=TokenRateLimiter.retry_after_header(e))
+    rate_limit_wait.labels(model=request.model).observe(waited)
+    return {"prompt_tokens": prompt_tokens, "reserved": reserved}
+
+def settle_tokens(request: PromptRequest, reservation: dict, usage):
+    # Replace the estimate with what the upstream reports; refund it all if nothing was generated
+    if not reservation:
+        return
+    if usage is not None and usage.prompt_tokens:
+        prompt_estimate_error.labels(model=request.model).observe(reservation["prompt_tokens"] / usage.prompt_tokens)
+    actual = usage.total_tokens if usage is not None else 0
+    rate_limiter.reconcile(request.user_id, request.model, reservation["reserved"], actual)
+
+async def create_completion(request: PromptRequest, **options):
+    try:
+        return await client.chat.completions.create(
+            model=request.model,
+            messages=messages_for(request),
+            **options
+        )
+    except openai.APITimeoutError as e:
+        raise fail(request.model, type(e).__name__, 504, "Upstream timed out")
+    except openai.RateLimitError as e:
+        raise fail(request.model, type(e).__name__, 429, str(e))
+    except openai.APIError as e:
+        raise fail(request.model, type(e).__name__, 502, f"Upstream error: {e}")
+
+@app.post("/chat")
+async def chat(request: PromptRequest):
+    if request.stream:
+        return await stream_chat(request)
+    start = time.perf_counter()
+    status = "200"
+    requests_in_flight.inc()
+    try:
+        return await complete(request)
+    except HTTPException as e:
+        status = str(e.status_code)
+        raise
+    except Exception as e:
+        status = "500"
+        request_errors.labels(model=request.model, error_type=type(e).__name__).inc()
+        raise
+    finally:
+        requests_in_flight.dec()
+        request_latency.labels(model=request.model, status=status).observe(time.perf_counter() - start)
+
+async def embed(request: PromptRequest):
+    # Embedding for the semantic cache tier; a failure only disables the near-duplicate lookup
+    try:
+        result = await client.embeddings.create(model=CACHE_EMBEDDING_MODEL, input=request.prompt)
+    except openai.APIError as e:
+        request_errors.labels(model=CACHE_EMBEDDING_MODEL, error_type=type(e).__name__).inc()
+        return None
+    return result.data[0].embedding
+
+async def cache_call(method, *args, **kwargs):
+    # The disk tier and the similarity scan block, so keep them off the event loop
+    if response_cache.disk_path or response_cache.semantic:
+        return await asyncio.to_thread(method, *args, **kwargs)
+    return method(*args, **kwargs)
+
+async def complete(request: PromptRequest):
+    use_cache = response_cache is not None and request.cache
+    embedding = None
+    if use_cache:
+        if response_cache.semantic:
+            embedding = await embed(request)
+        cached = await cache_call(response_cache.get, request.model, messages_for(request), embedding=embedding)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+    reservation = await reserve_tokens(request)
+    usage = None
+    try:
+        await acquire_slot(request.model)
+        upstream_start = time.perf_counter()
+        try:
+            response = await create_completion(request)
+        finally:
+            upstream_slots.release()
+            upstream_seconds = time.perf_counter() - upstream_start
+            upstream_latency.labels(model=request.model).observe(upstream_seconds)
+        usage = response.usage
+    finally:
+        settle_tokens(request, reservation, usage)
+
+    record_usage(request.model, usage, upstream_seconds)
+
+    result = {
         "response": response.choices[0].message.content,
-        "usage": {
-            "prompt_tokens": usage.prompt_tokens,
-            "completion_tokens": usage.completion_tokens,
-            "total_tokens": usage.total_tokens
-        }
+        "usage": usage_dict(usage)
     }
+    if use_cache:
+        await cache_call(response_cache.put, request.model, messages_for(request), result, embedding=embedding)
+    return {**result, "cached": False}
+
+class StreamCleanup:
+    """
+    Releases what a streaming request holds exactly once: the upstream slot, the token
+    reservation, the in-flight gauge and the upstream stream.
+
+    Called from the event generator's finally, from the response's background task, and when
+    the generator is garbage-collected without ever having started (the client went away
+    before the body was sent), whichever comes first.
+    """
+
+    def __init__(self, request: PromptRequest, start: float):
+        self.request = request
+        self.start = start
+        self.reservation = {}
+        self.upstream_start = None  # set once the upstream slot is held
+        self.stream = None
+        self.started = False
+        self.usage = None
+        self.released = False
+
+    def release(self, status: str = "499"):
+        if self.released:
+            return
+        self.released = True
+        model = self.request.model
+        if self.upstream_start is not None:
+            upstream_slots.release()
+            upstream_latency.labels(model=model).observe(time.perf_counter() - self.upstream_start)
+        if self.usage is not None or not self.started:
+            # Without usage mid-stream (error or disconnect) the reservation stays charged;
+            # nothing was generated for the client if the events never started
+            settle_tokens(self.request, self.reservation, self.usage)
+        requests_in_flight.dec()
+        request_latency.labels(model=model, status=status).observe(time.perf_counter() - self.start)
+        if self.stream is not None and not self.started:
+            # No await possible from a finalizer: close the upstream connection in the background
+            try:
+                asyncio.get_running_loop().create_task(self.stream.close())
+            except RuntimeError:
+                pass
+
+    async def aclose(self, status: str = "499"):
+        self.release(status)
+        if self.stream is not None:
+            await self.stream.close()
+
+async def stream_chat(request: PromptRequest):
+    """
+    Forward tokens as Server-Sent Events while they are generated.
+
+    Events: {"delta": "..."} per chunk, then {"usage": {...}} and [DONE]. Errors before the
+    first byte are returned as regular HTTP errors; later ones as an {"error": "..."} event.
+    """
+    cleanup = StreamCleanup(request, time.perf_counter())
+    requests_in_flight.inc()
+    try:
+        cleanup.reservation = await reserve_tokens(request)
+        await acquire_slot(request.model)
+        cleanup.upstream_start = time.perf_counter()
+        cleanup.stream = await create_completion(request, stream=True, stream_options={"include_usage": True})
+        events = sse_events(request, cleanup)
+        weakref.finalize(events, cleanup.release)
+        return StreamingResponse(
+            events,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            background=BackgroundTask(cleanup.aclose),
+        )
+    except HTTPException as e:
+        await cleanup.aclose(str(e.status_code))
+        raise
+    except asyncio.CancelledError:
+        # Client disconnected while waiting for a slot or the upstream
+        await cleanup.aclose("499")
+        raise
+    except Exception as e:
+        request_errors.labels(model=request.model, error_type=type(e).__name__).inc()
+        await cleanup.aclose("500")
+        raise
+
+def sse(payload) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def sse_events(request: PromptRequest, cleanup: StreamCleanup):
+    cleanup.started = True
+    status = "200"
+    first_token_at = None
+    try:
+        async for chunk in cleanup.stream:
+            if chunk.usage is not None:
+                # With include_usage the last chunk carries the usage and no choices
+                cleanup.usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    time_to_first_token.labels(model=request.model).observe(first_token_at - cleanup.start)
+                yield sse({"delta": chunk.choices[0].delta.content})
+        if cleanup.usage is not None:
+            record_usage(request.model, cleanup.usage, time.perf_counter() - cleanup.upstream_start)
+            yield sse({"usage": usage_dict(cleanup.usage)})
+        yield "data: [DONE]\n\n"
+    except openai.APIError as e:
+        status = "502"
+        request_errors.labels(model=request.model, error_type=type(e).__name__).inc()
+        yield sse({"error": f"Upstream error: {e}"})
+    except asyncio.CancelledError:
+        # Client disconnected
+        status = "499"
+        raise
+    finally:
+        await cleanup.aclose(status)
 
 @app.get("/metrics", response_class=PlainTextResponse)
 def metrics():
-    return generate_latest()
\ No newline at end of file
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Aggregate the samples of every worker process
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
@@ -0,0 +1,121 @@
+# mock_upstream.py
+# OpenAI-compatible mock of POST /v1/chat/completions and /v1/embeddings for benchmarking
+# without an API key.
+#
+#   uvicorn mock_upstream:app --port 8100
+#   OPENAI_BASE_URL=http://localhost:8100/v1 uvicorn main:app --port 8000
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+MOCK_LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "300"))   # mean completion latency
+MOCK_JITTER_MS = float(os.getenv("MOCK_JITTER_MS", "100"))     # +/- uniform jitter
+MOCK_COMPLETION_TOKENS = int(os.getenv("MOCK_COMPLETION_TOKENS", "60"))
+# Streaming: delay before the first chunk and between chunks
+MOCK_TTFT_MS = float(os.getenv("MOCK_TTFT_MS", "150"))
+MOCK_TOKEN_MS = float(os.getenv("MOCK_TOKEN_MS", "10"))
+MOCK_EMBEDDING_DIM = int(os.getenv("MOCK_EMBEDDING_DIM", "256"))
+
+app = FastAPI()
+
+
+def count_tokens(text: str) -> int:
+    # Close enough for a mock: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+def embed_text(text: str) -> list:
+    # Hashed bag of words: prompts sharing most words get a high cosine similarity
+    vector = [0.0] * MOCK_EMBEDDING_DIM
+    for word in text.lower().split():
+        digest = hashlib.md5(word.strip(".,!?;:'\"").encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % MOCK_EMBEDDING_DIM] += 1.0
+    return vector
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input", "")
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    data = [{"object": "embedding", "index": i, "embedding": embed_text(text)} for i, text in enumerate(inputs)]
+    tokens = sum(count_tokens(text) for text in inputs)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "mock-embedding"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if body.get("stream"):
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        return StreamingResponse(stream_chunks(body, include_usage), media_type="text/event-stream")
+    await asyncio.sleep(max(0.0, MOCK_LATENCY_MS + random.uniform(-MOCK_JITTER_MS, MOCK_JITTER_MS)) / 1000)
+
+    prompt = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+    prompt_tokens = count_tokens(prompt)
+    completion_tokens = MOCK_COMPLETION_TOKENS
+    content = " ".join(["token"] * completion_tokens)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+async def stream_chunks(body: dict, include_usage: bool):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "mock")
+
+    def chunk(choices, usage=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": choices,
+        }
+        if usage is not None:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    await asyncio.sleep(MOCK_TTFT_MS / 1000)
+    yield chunk([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+    for i in range(MOCK_COMPLETION_TOKENS):
+        if i:
+            await asyncio.sleep(MOCK_TOKEN_MS / 1000)
+        yield chunk([{"index": 0, "delta": {"content": "token" if i == 0 else " token"}, "finish_reason": None}])
+    yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+
+    if include_usage:
+        prompt = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+        prompt_tokens = count_tokens(prompt)
+        yield chunk([], {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": MOCK_COMPLETION_TOKENS,
+            "total_tokens": prompt_tokens + MOCK_COMPLETION_TOKENS,
+        })
+    yield "data: [DONE]\n\n"
@@ -0,0 +1,183 @@
+# rate_limit.py
+# Per-user/per-model token buckets checked before calling the upstream model.
+#
+# A request reserves its estimated cost (prompt tokens counted locally + expected completion
+# tokens). Once the upstream usage is known, reconcile() refunds or charges the difference,
+# so a bucket tracks what was actually spent. Buckets live in the worker process: with N
+# workers a user can spend up to N times the configured rate.
+import asyncio
+import functools
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to ~4 characters per token
+    tiktoken = None
+
+FALLBACK_ENCODING = "o200k_base"
+# Chat formatting overhead per message and per reply (OpenAI cookbook figures)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class TokenBudgetExceeded(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    # Loading an encoding reads (and on first use downloads) its BPE ranks: do it once per model
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception:
+        return None
+    try:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception:
+        return None
+
+
+def encoding_loaded(model: str) -> bool:
+    """Whether _encoding(model) has already run, i.e. calling it again can't block on a download."""
+    return model in _loaded_models
+
+
+def warm_encoding(model: str) -> None:
+    _encoding(model)
+    _loaded_models.add(model)
+
+
+_loaded_models = set()
+
+
+def count_tokens(text: str, model: str) -> int:
+    warm_encoding(model)
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]], model: str) -> int:
+    """Prompt tokens as the upstream will count them, without calling it."""
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(str(message.get("content", "")), model) for message in messages
+    )
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waiters = asyncio.Lock()  # queued requests are served first come, first served
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def try_take(self, tokens: float) -> bool:
+        self._refill()
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def take(self, tokens: float) -> None:
+        self._refill()
+        self.tokens -= tokens
+
+    def wait_time(self, tokens: float) -> float:
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.refill_per_second
+
+    def adjust(self, tokens: float) -> None:
+        # Positive refunds, negative charges; a bucket may go into debt until it refills
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    @property
+    def idle_and_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity and not self.waiters.locked()
+
+
+class TokenRateLimiter:
+    def __init__(
+        self,
+        tokens_per_minute: float,
+        burst: Optional[float] = None,
+        max_wait: float = 0.0,
+        max_buckets: int = 10000,
+    ):
+        """
+        tokens_per_minute: sustained budget of each (user, model) pair
+        burst: bucket size, i.e. tokens that can be spent at once (default: one minute's budget)
+        max_wait: seconds a request may queue for its budget before it is rejected (0 rejects at once)
+        max_buckets: full, idle buckets are dropped beyond this many
+        """
+        self.capacity = burst or tokens_per_minute
+        self.refill_per_second = tokens_per_minute / 60.0
+        self.max_wait = max_wait
+        self.max_buckets = max_buckets
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, user: str, model: str) -> TokenBucket:
+        key = (user, model)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                # A full bucket holds no state worth keeping
+                for stale in [k for k, b in self._buckets.items() if b.idle_and_full]:
+                    del self._buckets[stale]
+            bucket = self._buckets[key] = TokenBucket(self.capacity, self.refill_per_second)
+        return bucket
+
+    async def acquire(self, user: str, model: str, tokens: int) -> float:
+        """Reserve `tokens` for (user, model); return the seconds spent queueing."""
+        bucket = self.bucket(user, model)
+        if tokens > bucket.capacity:
+            raise TokenBudgetExceeded(f"Request needs ~{tokens} tokens, above the budget of {int(bucket.capacity)}")
+        if not bucket.waiters.locked() and bucket.try_take(tokens):
+            return 0.0
+        if self.max_wait <= 0:
+            raise TokenBudgetExceeded("Token budget exceeded", retry_after=bucket.wait_time(tokens))
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(bucket.waiters.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            raise TokenBudgetExceeded("Token budget exceeded", retry_after=bucket.wait_time(tokens))
+        try:
+            wait = bucket.wait_time(tokens)
+            if time.monotonic() - start + wait > self.max_wait:
+                raise TokenBudgetExceeded("Token budget exceeded", retry_after=wait)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            bucket.take(tokens)
+        finally:
+            bucket.waiters.release()
+        return time.monotonic() - start
+
+    def reconcile(self, user: str, model: str, reserved: int, actual: int) -> None:
+        """Refund or charge the difference between the reservation and the real usage."""
+        if actual != reserved:
+            self.bucket(user, model).adjust(reserved - actual)
+
+    @staticmethod
+    def retry_after_header(error: TokenBudgetExceeded) -> Dict[str, str]:
+        if error.retry_after is None:
+            return {}
+        return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
@@ -0,0 +1,124 @@
+# bench_cache.py
+# Replay the prompts of a JSONL log against /chat with the response cache bypassed and
+# then enabled, and compare latency, hit ratio and upstream tokens saved.
+#
+#   python bench_cache.py --log ../PromptandResponsesLogging/logs/llm_logs.json --repeat 5
+#   python bench_cache.py --clients 8 --model gpt-4.1 --json > cache.json
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from bench_chat import summary
+
+
+def load_requests(path, model=None):
+    requests = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("prompt"):
+                requests.append({"prompt": entry["prompt"], "model": model or entry.get("model") or "gpt-4.1"})
+    return requests
+
+
+async def replay(client, args, requests, use_cache):
+    queue = asyncio.Queue()
+    for _ in range(args.repeat):
+        for request in requests:
+            queue.put_nowait({**request, "cache": use_cache})
+    latencies, errors = [], 0
+    hits = tokens_upstream = tokens_saved = 0
+
+    async def worker():
+        nonlocal errors, hits, tokens_upstream, tokens_saved
+        while not queue.empty():
+            payload = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.post(args.url, json=payload)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if response.status_code != 200:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            body = response.json()
+            tokens = body.get("usage", {}).get("total_tokens", 0)
+            if body.get("cached"):
+                hits += 1
+                tokens_saved += tokens
+            else:
+                tokens_upstream += tokens
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "cache": use_cache,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": summary(latencies),
+        "hit_ratio": round(hits / len(latencies), 4) if latencies else 0.0,
+        "tokens_upstream": tokens_upstream,
+        "tokens_saved": tokens_saved,
+    }
+
+
+async def run(args):
+    requests = load_requests(args.log, args.model)
+    if not requests:
+        raise SystemExit(f"No prompts found in {args.log}")
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        # Bypass first: it neither reads nor fills the cache
+        bypass = await replay(client, args, requests, use_cache=False)
+        cached = await replay(client, args, requests, use_cache=True)
+    return {
+        "log": args.log,
+        "prompts": len(requests),
+        "unique_prompts": len({(r["model"], r["prompt"]) for r in requests}),
+        "repeat": args.repeat,
+        "clients": args.clients,
+        "bypass": bypass,
+        "cached": cached,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a prompt log against /chat with and without the response cache")
+    parser.add_argument("--url", default="http://localhost:8000/chat")
+    parser.add_argument("--log", default="../PromptandResponsesLogging/logs/llm_logs.json", help="JSONL log with a 'prompt' field")
+    parser.add_argument("--model", default=None, help="Override the model recorded in the log")
+    parser.add_argument("--repeat", type=int, default=3, help="Times to replay the log in each pass")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['prompts']} prompts ({result['unique_prompts']} unique) x {result['repeat']}, "
+          f"{result['clients']} clients")
+    for name in ("bypass", "cached"):
+        p = result[name]
+        latency = p["latency_ms"]
+        print(f"  {name:<7} {p['requests_per_sec']} req/s   p50 {latency['p50']}ms   p95 {latency['p95']}ms   "
+              f"hit ratio {p['hit_ratio']:.0%}   tokens upstream {p['tokens_upstream']}   saved {p['tokens_saved']}"
+              + (f"   errors {p['errors']}" if p["errors"] else ""))
+
+
+if __name__ == "__main__":
+    main()
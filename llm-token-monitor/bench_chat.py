@@ -0,0 +1,122 @@
+# bench_chat.py
+# Concurrent load test for the /chat endpoint: requests/sec and latency percentiles.
+#
+#   python bench_chat.py --url http://localhost:8000/chat --clients 100 --duration 30
+#   python bench_chat.py --clients 200 --json > after.json
+#   python bench_chat.py --clients 100 --stream          # also reports time to first byte
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+PROMPTS = [
+    "Hello! How are you?",
+    "Summarize the benefits of observability for LLM services.",
+    "Write a haiku about Prometheus metrics.",
+    "Explain token usage in one paragraph.",
+]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def send(client, args, payload, first_bytes):
+    if not args.stream:
+        response = await client.post(args.url, json=payload)
+        return response.status_code == 200
+    payload["stream"] = True
+    start = time.perf_counter()
+    async with client.stream("POST", args.url, json=payload) as response:
+        first = True
+        async for _ in response.aiter_bytes():
+            if first:
+                first_bytes.append((time.perf_counter() - start) * 1000)
+                first = False
+        return response.status_code == 200
+
+
+async def client_loop(client, args, deadline, latencies, errors, first_bytes):
+    i = 0
+    while time.perf_counter() < deadline:
+        payload = {"prompt": PROMPTS[i % len(PROMPTS)], "model": args.model}
+        i += 1
+        start = time.perf_counter()
+        try:
+            ok = await send(client, args, payload, first_bytes)
+        except httpx.HTTPError:
+            ok = False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if ok:
+            latencies.append(elapsed_ms)
+        else:
+            errors.append(elapsed_ms)
+
+
+def summary(values):
+    values = sorted(values)
+    return {
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(values[-1], 1) if values else 0.0,
+    }
+
+
+async def run(args):
+    latencies, errors, first_bytes = [], [], []
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            client_loop(client, args, deadline, latencies, errors, first_bytes) for _ in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - start
+
+    result = {
+        "url": args.url,
+        "clients": args.clients,
+        "stream": args.stream,
+        "seconds": round(elapsed, 3),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "latency_ms": summary(latencies),
+    }
+    if args.stream:
+        result["first_byte_ms"] = summary(first_bytes)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the token monitor /chat endpoint")
+    parser.add_argument("--url", default="http://localhost:8000/chat")
+    parser.add_argument("--model", default="gpt-4.1")
+    parser.add_argument("--clients", type=int, default=100, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout")
+    parser.add_argument("--stream", action="store_true", help="Request streamed responses and measure time to first byte")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    latency = result["latency_ms"]
+    print(f"{result['clients']} clients, {result['seconds']}s: {result['requests']} ok, {result['errors']} errors")
+    print(f"  {result['requests_per_sec']} req/s   p50 {latency['p50']}ms   p95 {latency['p95']}ms   "
+          f"p99 {latency['p99']}ms   max {latency['max']}ms")
+    if args.stream:
+        first = result["first_byte_ms"]
+        print(f"  first byte   p50 {first['p50']}ms   p95 {first['p95']}ms   p99 {first['p99']}ms")
+
+
+if __name__ == "__main__":
+    main()